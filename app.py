@@ -3,21 +3,35 @@ Utility Municipalization Monitor - With PostgreSQL Database
 Persistent storage that survives restarts and refreshes
 """
 
-from flask import Flask, jsonify, request
+from flask import (Flask, Response, g, has_request_context, jsonify, request, send_from_directory,
+                   stream_with_context)
 from flask_cors import CORS
 from datetime import datetime, timedelta
+import contextvars
+import hashlib
 import json
 import os
 import logging
+import queue
+import re
+import threading
+import time
+import zlib
 import psycopg
 from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
 from urllib.parse import urlparse
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+import logging_setup
+import metrics
+import profiling
+from crawler import (CLASSIFIER_VERSION, UTILITY_ALIASES, CrawlCheckpoint, enrich_mentions, run_crawl,
+                     url_digest)
+from gazetteer import gazetteer_status
+from records import MENTION_COLUMNS, Mention
+from scoring import score_mentions
+
+logging_setup.configure()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
@@ -26,22 +40,651 @@ CORS(app)
 # Database connection
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
-def get_db_connection():
-    """Get database connection"""
+# Optional read replicas (comma-separated URLs) for read-only routes; a replica
+# lagging more than REPLICA_MAX_LAG_SECONDS behind is skipped for the primary
+REPLICA_DATABASE_URLS = [url.strip() for url in os.environ.get('REPLICA_DATABASE_URL', '').split(',')
+                         if url.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 10))
+REPLICA_CHECK_SECONDS = 5  # how long a replica's measured lag (or failure) is trusted
+
+# After a write, the session's reads stay on the primary until a replica has
+# replayed past this WAL position
+WRITE_LSN_COOKIE = 'write_lsn'
+WRITE_LSN_MAX_AGE = 300
+
+# Interrupted crawls started within this window are resumed instead of restarted
+CRAWL_RESUME_HOURS = int(os.environ.get('CRAWL_RESUME_HOURS', 24))
+
+# Wall-clock budget for a crawl request, kept under gunicorn's --timeout (see Procfile);
+# what is not crawled in time is picked up by the next crawl with the same parameters
+CRAWL_BUDGET_SECONDS = float(os.environ.get('CRAWL_BUDGET_SECONDS', 240))
+
+# Advisory lock namespace for crawl runs, so one run is only resumed by one worker
+CRAWL_LOCK_NAMESPACE = 4201
+
+# Monthly mentions partitions are created this far ahead of the current month
+PARTITION_MONTHS_AHEAD = int(os.environ.get('PARTITION_MONTHS_AHEAD', 2))
+# Advisory lock namespace serializing partition creation
+PARTITION_LOCK_NAMESPACE = 4202
+# crawler_state key marking the one-time repair of mentions_archive.url_hash
+ARCHIVE_HASH_REPAIRED_KEY = 'archive_url_hash_repaired'
+
+# Fetch full articles for new mentions after each crawl and reclassify them
+ENRICH_ARTICLES = os.environ.get('ENRICH_ARTICLES', 'False').lower() == 'true'
+# A failed article fetch is retried after ARTICLE_RETRY_SECONDS, doubling each time, up to
+# ARTICLE_MAX_ATTEMPTS fetches; each enrichment run retries up to ENRICH_RETRY_BATCH due ones
+ARTICLE_RETRY_SECONDS = int(os.environ.get('ARTICLE_RETRY_SECONDS', 3600))
+ARTICLE_MAX_ATTEMPTS = int(os.environ.get('ARTICLE_MAX_ATTEMPTS', 5))
+ENRICH_RETRY_BATCH = 100
+
+# Entity kind -> its id column on mentions (see create_entities); mention_details
+# has the names back under the kinds' names
+ENTITY_COLUMNS = {
+    'source': 'source_id',
+    'location': 'location_id',
+    'utility': 'utility_id',
+    'utility_type': 'utility_type_id',
+    'stage': 'stage_id',
+}
+
+# Dimensions of mention_rollups, maintained by triggers on mentions; /api/analytics reads it.
+# Entity dimensions are stored as ids, 0 for none
+ROLLUP_DIMENSIONS = ['location', 'utility', 'stage', 'utility_type', 'status']
+ROLLUP_COLUMNS = [ENTITY_COLUMNS.get(dimension, dimension) for dimension in ROLLUP_DIMENSIONS]
+# Set (SET LOCAL ... = 'on') by retention's deletes, which leave the rollups as they are
+ROLLUP_ARCHIVING_SETTING = 'mention_rollups.archiving'
+ANALYTICS_DEFAULT_DAYS = 90
+ANALYTICS_INTERVALS = ('day', 'week', 'month')
+
+# /api/mentions orderings; score and publication order are served by
+# idx_mentions_status_score and idx_mentions_status_published
+MENTION_SORTS = {
+    'captured_at': 'captured_at DESC',
+    'score': 'score DESC NULLS LAST, captured_at DESC',
+    'published_at': 'published_at DESC NULLS LAST, captured_at DESC',
+}
+MENTIONS_MAX_LIMIT = 1000
+
+# /api/facets: frontend field name -> mentions column or entity kind, counted with one
+# GROUPING SETS query
+FACET_FIELDS = {'source': 'source', 'location': 'location', 'priority': 'priority',
+                'utilityType': 'utility_type'}
+FACET_DEFAULT_LIMIT = 100
+FACET_MAX_LIMIT = 1000
+
+# Live changes for /api/events: mention_events rows, announced with NOTIFY
+EVENTS_CHANNEL = 'mention_events'
+# Updates are only recorded when one of these columns changes
+EVENT_COLUMNS = ['title', 'snippet', 'source_id', 'location_id', 'utility_id', 'utility_type_id', 'stage_id',
+                 'priority', 'status', 'tags', 'notes', 'score']
+EVENTS_POLL_SECONDS = 5  # the broadcaster also reads new events this often without a NOTIFY
+EVENTS_HEARTBEAT_SECONDS = 15  # keeps idle streams open through proxies
+# A missing event id may still be committing; delivery waits this long after a later id is seen
+EVENTS_GAP_SECONDS = 10
+EVENTS_BATCH_ROWS = 500
+EVENTS_CATCHUP_LIMIT = int(os.environ.get('EVENTS_CATCHUP_LIMIT', 2000))  # beyond this a client reloads
+EVENTS_CLIENT_QUEUE = 1000
+# Each stream holds a worker thread: cap how many are open, and close each after a while so
+# EventSource reconnects (with Last-Event-ID) and threads turn over
+EVENTS_MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS', 8))
+EVENTS_STREAM_SECONDS = int(os.environ.get('EVENTS_STREAM_SECONDS', 300))
+EVENTS_RETRY_MS = 3000  # how long EventSource waits before reconnecting
+
+# /api/export reads this many rows per server-side cursor fetch and yields ~64 KB chunks
+EXPORT_BATCH_ROWS = 2000
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_COLUMNS = ['id', 'title', 'url', 'snippet', 'source', 'location', 'utility', 'utility_type',
+                  'stage', 'priority', 'status', 'tags', 'notes', 'captured_at', 'updated_at',
+                  'classifier_version', 'score', 'published_at']
+
+# API instrumentation, exposed at /api/metrics
+REQUEST_SECONDS = metrics.histogram(
+    'api_request_seconds', 'API request latency by route, method and status',
+    ('route', 'method', 'status'))
+DB_CONNECT_SECONDS = metrics.histogram(
+    'api_db_connect_seconds', 'Time to acquire a database connection by route',
+    ('route',))
+DB_QUERY_SECONDS = metrics.histogram(
+    'api_db_query_seconds', 'Database query execution time by route',
+    ('route',))
+DB_ROWS = metrics.histogram(
+    'api_db_rows', 'Rows returned per query by route',
+    ('route',), buckets=metrics.ROW_BUCKETS)
+SERIALIZE_SECONDS = metrics.histogram(
+    'api_serialize_seconds', 'Time spent converting rows and encoding JSON by route',
+    ('route',))
+DB_READ_TARGETS = metrics.counter(
+    'api_db_read_connections_total', 'Read-only connections by target (replica or primary) and reason',
+    ('target', 'reason'))
+
+def current_route():
+    """Metrics label for the code path making a database call"""
+    if has_request_context():
+        return request.endpoint or 'unknown'
+    return 'background'
+
+def connect(url):
+    # Render provides postgres:// but psycopg needs postgresql://
+    url = url.replace('postgres://', 'postgresql://', 1)
+    with DB_CONNECT_SECONDS.time(route=current_route()):
+        return psycopg.connect(url, row_factory=dict_row)
+
+class ReplicaRouter:
+    """Hands out read-only connections from the replicas that are keeping up
+    
+    Replicas are tried round-robin. Each one's lag is measured on a
+    connection at most every REPLICA_CHECK_SECONDS, and a replica that
+    lags, or fails to connect, is skipped until it is checked again.
+    """
+    
+    def __init__(self, urls):
+        self.urls = urls
+        self.lock = threading.Lock()
+        self.turn = 0
+        self.health = {}  # url -> (checked_at, lag seconds or None if unreachable)
+    
+    def lag_query(self, conn, min_lsn):
+        """Replay lag in seconds, and whether the replica has replayed min_lsn"""
+        row = conn.execute("""
+            SELECT CASE
+                       WHEN NOT pg_is_in_recovery() THEN 0
+                       WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                       ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                   END AS lag,
+                   %s::pg_lsn IS NULL
+                       OR COALESCE(pg_last_wal_replay_lsn() >= %s::pg_lsn, false) AS replayed
+        """, (min_lsn, min_lsn)).fetchone()
+        conn.commit()
+        return float(row['lag']), row['replayed']
+    
+    def connect(self, min_lsn=None):
+        """A replica connection, or None with the reason to use the primary
+        
+        min_lsn is the session's last write; only a replica that has
+        replayed it is used.
+        """
+        with self.lock:
+            start = self.turn
+            self.turn = (self.turn + 1) % len(self.urls)
+        
+        reason = 'lagging'
+        for offset in range(len(self.urls)):
+            url = self.urls[(start + offset) % len(self.urls)]
+            checked_at, lag = self.health.get(url, (0, 0))
+            fresh = time.monotonic() - checked_at < REPLICA_CHECK_SECONDS
+            if fresh and (lag is None or lag > REPLICA_MAX_LAG_SECONDS):
+                continue
+            
+            try:
+                conn = connect(url)
+            except Exception as e:
+                logger.warning(f"Replica {offset} unavailable: {e}")
+                self.health[url] = (time.monotonic(), None)
+                reason = 'unavailable'
+                continue
+            
+            if fresh and min_lsn is None:
+                return conn, None
+            
+            try:
+                lag, replayed = self.lag_query(conn, min_lsn)
+            except Exception as e:
+                logger.warning(f"Replica lag check failed: {e}")
+                conn.close()
+                self.health[url] = (time.monotonic(), None)
+                reason = 'unavailable'
+                continue
+            
+            self.health[url] = (time.monotonic(), lag)
+            if lag <= REPLICA_MAX_LAG_SECONDS and replayed:
+                return conn, None
+            conn.close()
+            reason = 'lagging' if lag > REPLICA_MAX_LAG_SECONDS else 'read_your_writes'
+        
+        return None, reason
+    
+    def status(self):
+        """Last measured lag per replica, for /api/health"""
+        return [{'lag_seconds': self.health.get(url, (0, 0))[1]} for url in self.urls]
+
+REPLICAS = ReplicaRouter(REPLICA_DATABASE_URLS)
+
+def session_write_lsn():
+    """WAL position of this session's last write, from its cookie"""
+    if not has_request_context():
+        return None
+    value = request.cookies.get(WRITE_LSN_COOKIE, '')
+    return value if re.fullmatch(r'[0-9A-F]{1,8}/[0-9A-F]{1,8}', value) else None
+
+def remember_write(conn):
+    """Keep this session's reads on the primary until a replica has its write
+    
+    Call after committing; the WAL position goes into a cookie.
+    """
+    if REPLICA_DATABASE_URLS and has_request_context():
+        g.write_lsn = conn.execute("SELECT pg_current_wal_lsn()::text AS lsn").fetchone()['lsn']
+
+def get_db_connection(readonly=False):
+    """Get database connection
+    
+    readonly=True may return a replica connection (see ReplicaRouter); use
+    it only for statements that never write.
+    """
     if not DATABASE_URL:
         logger.error("DATABASE_URL not set!")
         return None
     
-    # Parse database URL (Render provides postgres:// but psycopg2 needs postgresql://)
-    url = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
+    if readonly and REPLICA_DATABASE_URLS:
+        conn, reason = REPLICAS.connect(session_write_lsn())
+        if conn:
+            DB_READ_TARGETS.inc(target='replica', reason='healthy')
+            return conn
+        DB_READ_TARGETS.inc(target='primary', reason=reason)
     
     try:
-        conn = psycopg.connect(url, row_factory=dict_row)
-        return conn
+        return connect(DATABASE_URL)
     except Exception as e:
         logger.error(f"Database connection error: {e}")
         return None
 
+def run_query(cur, query, params=None):
+    """Execute a statement, recording its time under the current route"""
+    with DB_QUERY_SECONDS.time(route=current_route()):
+        cur.execute(query, params)
+
+def fetch_all(cur, query, params=None):
+    """Execute a query and fetch all rows, recording time and row count"""
+    route = current_route()
+    with DB_QUERY_SECONDS.time(route=route):
+        cur.execute(query, params)
+        rows = cur.fetchall()
+    DB_ROWS.observe(len(rows), route=route)
+    return rows
+
+def fetch_one(cur, query, params=None):
+    """Execute a query and fetch one row, recording time and row count"""
+    route = current_route()
+    with DB_QUERY_SECONDS.time(route=route):
+        cur.execute(query, params)
+        row = cur.fetchone()
+    DB_ROWS.observe(1 if row else 0, route=route)
+    return row
+
+def month_start(value, months=0):
+    """First day of value's month, shifted by months"""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_names(cur):
+    """Names of the partitions currently attached to mentions"""
+    cur.execute("""
+        SELECT child.relname AS name FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = 'mentions'::regclass
+    """)
+    return {row['name'] for row in cur.fetchall()}
+
+def ensure_partitions(cur, start=None, end=None):
+    """Create monthly mentions partitions from start through end (caller commits)
+    
+    Defaults to this month through PARTITION_MONTHS_AHEAD months ahead. Rows
+    that already landed in the default partition for a new month are moved
+    into it. Creation holds a transaction-level advisory lock, so two crawls
+    starting at a month boundary don't both create the same partition.
+    """
+    first = month_start(start or datetime.now())
+    last = month_start(end or datetime.now(), PARTITION_MONTHS_AHEAD)
+    
+    months = []
+    month = first
+    while month <= last:
+        months.append(month)
+        month = month_start(month, 1)
+    names = {month: f"mentions_p{month.strftime('%Y%m')}" for month in months}
+    
+    existing = partition_names(cur)
+    if all(name in existing for name in names.values()):
+        return
+    
+    # Held until the caller commits; partitions another caller created meanwhile are seen after it
+    cur.execute("SELECT pg_advisory_xact_lock(%s, 0)", (PARTITION_LOCK_NAMESPACE,))
+    existing = partition_names(cur)
+    
+    for month in months:
+        name = names[month]
+        upper = month_start(month, 1)
+        if name not in existing:
+            cur.execute(f"CREATE TABLE {name} (LIKE mentions INCLUDING DEFAULTS)")
+            cur.execute(f"""
+                WITH moved AS (
+                    DELETE FROM mentions_default
+                    WHERE captured_at >= %s AND captured_at < %s
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            """, (month, upper))
+            cur.execute(f"""
+                ALTER TABLE mentions ATTACH PARTITION {name}
+                FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')
+            """)
+            logger.info(f"Created partition {name}")
+
+def rename_legacy_mentions(cur):
+    """Move an unpartitioned mentions table aside as mentions_legacy
+    
+    Returns whether there was one; copy_legacy_mentions moves its rows
+    into the partitioned table.
+    """
+    cur.execute("""
+        SELECT relkind FROM pg_class
+        WHERE oid = to_regclass('mentions')
+    """)
+    row = cur.fetchone()
+    if not row or row['relkind'] != 'r':
+        return False
+    
+    logger.info("Migrating mentions to a partitioned table")
+    cur.execute("ALTER TABLE mentions ADD COLUMN IF NOT EXISTS classifier_version INTEGER NOT NULL DEFAULT 0")
+    cur.execute("ALTER TABLE mentions RENAME CONSTRAINT mentions_pkey TO mentions_legacy_pkey")
+    cur.execute("ALTER TABLE mentions RENAME TO mentions_legacy")
+    cur.execute("DROP INDEX IF EXISTS idx_mentions_status")
+    cur.execute("DROP INDEX IF EXISTS idx_mentions_url")
+    return True
+
+def copy_legacy_mentions(cur):
+    """Copy mentions_legacy into the partitioned table, then drop it"""
+    cur.execute("SELECT MIN(captured_at) AS first, MAX(captured_at) AS last FROM mentions_legacy")
+    bounds = cur.fetchone()
+    if bounds['first']:
+        ensure_partitions(cur, bounds['first'], max(bounds['last'], datetime.now()))
+    
+    cur.execute("""
+        INSERT INTO mentions
+        (id, title, url, snippet, source_id, location_id, utility_id, utility_type_id, stage_id, priority,
+         captured_at, status, tags, notes, updated_at, classifier_version)
+        SELECT id, title, url, snippet, resolve_entity('source', source), resolve_entity('location', location),
+               resolve_entity('utility', utility), resolve_entity('utility_type', utility_type),
+               resolve_entity('stage', stage), priority,
+               COALESCE(captured_at, updated_at, CURRENT_TIMESTAMP), status, tags, notes, updated_at,
+               classifier_version
+        FROM mentions_legacy
+    """)
+    copied = cur.rowcount
+    cur.execute("""
+        INSERT INTO mention_keys (url_hash, mention_id)
+        SELECT sha256(convert_to(url, 'UTF8')), id FROM mentions_legacy
+        ON CONFLICT DO NOTHING
+    """)
+    cur.execute("DROP TABLE mentions_legacy")
+    logger.info(f"Moved {copied} mentions into the partitioned table")
+
+def create_entities(cur):
+    """Create the entity tables and resolve_entity() (caller commits)
+    
+    entities has one row per distinct source, location, utility, utility
+    type and stage, which mentions refer to by id. entity_aliases maps the
+    normalized spelling (entity_key: trimmed, lower case, single spaces)
+    of every name seen, and of crawler.UTILITY_ALIASES, to its entity;
+    rows added by hand merge spellings. resolve_entity(kind, name) returns
+    a name's entity id, creating the entity on first sight, inside the
+    caller's transaction. An alias only applies to rows written after it.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS entities (
+            id SERIAL PRIMARY KEY,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            UNIQUE (kind, name)
+        )
+    """)
+    
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS entity_aliases (
+            kind TEXT NOT NULL,
+            alias TEXT NOT NULL,
+            entity_id INTEGER NOT NULL REFERENCES entities(id),
+            PRIMARY KEY (kind, alias)
+        )
+    """)
+    
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION entity_key(name TEXT) RETURNS TEXT AS $$
+            SELECT lower(regexp_replace(btrim(name), '\\s+', ' ', 'g'))
+        $$ LANGUAGE sql IMMUTABLE
+    """)
+    
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION resolve_entity(entity_kind TEXT, entity_name TEXT) RETURNS INTEGER AS $$
+        DECLARE
+            name_key TEXT := entity_key(entity_name);
+            resolved INTEGER;
+        BEGIN
+            IF name_key IS NULL OR name_key = '' THEN
+                RETURN NULL;
+            END IF;
+            
+            SELECT entity_id INTO resolved FROM entity_aliases WHERE kind = entity_kind AND alias = name_key;
+            IF resolved IS NULL THEN
+                INSERT INTO entities (kind, name) VALUES (entity_kind, btrim(entity_name))
+                ON CONFLICT (kind, name) DO UPDATE SET name = EXCLUDED.name
+                RETURNING id INTO resolved;
+                
+                -- A concurrent writer may have claimed the spelling first; its entity wins
+                INSERT INTO entity_aliases (kind, alias, entity_id) VALUES (entity_kind, name_key, resolved)
+                ON CONFLICT DO NOTHING;
+                SELECT entity_id INTO resolved FROM entity_aliases WHERE kind = entity_kind AND alias = name_key;
+            END IF;
+            
+            RETURN resolved;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    
+    cur.executemany("""
+        INSERT INTO entity_aliases (kind, alias, entity_id)
+        VALUES ('utility', entity_key(%s), resolve_entity('utility', %s))
+        ON CONFLICT (kind, alias) DO UPDATE SET entity_id = EXCLUDED.entity_id
+    """, [(alias, canonical) for canonical, aliases in UTILITY_ALIASES.items() for alias in aliases])
+
+def migrate_entity_columns(cur):
+    """Replace the text source/location/utility/utility_type/stage columns of mentions with entity ids
+    
+    Runs once, on a mentions table from before entities. Every row is
+    rewritten in this transaction, with the mentions triggers out of the
+    way; mention_rollups is rebuilt on the id columns afterwards.
+    """
+    cur.execute("""
+        SELECT 1 FROM pg_attribute
+        WHERE attrelid = to_regclass('mentions') AND attname = 'location' AND NOT attisdropped
+    """)
+    if not cur.fetchone():
+        return
+    
+    logger.info("Migrating mentions to entity ids")
+    for operation in ('insert', 'update', 'delete'):
+        cur.execute(f"DROP TRIGGER IF EXISTS mention_rollups_{operation} ON mentions")
+        cur.execute(f"DROP TRIGGER IF EXISTS mention_events_{operation} ON mentions")
+    
+    for kind, column in ENTITY_COLUMNS.items():
+        cur.execute(f"ALTER TABLE mentions ADD COLUMN IF NOT EXISTS {column} INTEGER REFERENCES entities(id)")
+        cur.execute(f"SELECT resolve_entity(%s, name) FROM (SELECT DISTINCT {kind} AS name FROM mentions) names",
+                    (kind,))
+    
+    assignments = ', '.join(
+        f"{column} = (SELECT entity_id FROM entity_aliases WHERE kind = '{kind}' AND alias = entity_key({kind}))"
+        for kind, column in ENTITY_COLUMNS.items()
+    )
+    cur.execute(f"UPDATE mentions SET {assignments}")
+    logger.info(f"Moved {cur.rowcount} mentions to entity ids")
+    
+    cur.execute(f"ALTER TABLE mentions {', '.join(f'DROP COLUMN {kind}' for kind in ENTITY_COLUMNS)}")
+    cur.execute("DROP TABLE IF EXISTS mention_rollups")
+
+def create_mention_details(cur):
+    """(Re)create mention_details: mentions with entity names joined back (caller commits)
+    
+    The names appear under the columns' old names, so readers select from
+    it as they did from mentions. Joins to unused names are removed by the
+    planner, so filters and counts on ids pay nothing for them.
+    """
+    names = ', '.join(f'{kind}.name AS {kind}' for kind in ENTITY_COLUMNS)
+    joins = ' '.join(f'LEFT JOIN entities {kind} ON {kind}.id = m.{column}'
+                     for kind, column in ENTITY_COLUMNS.items())
+    cur.execute("DROP VIEW IF EXISTS mention_details")
+    cur.execute(f"CREATE VIEW mention_details AS SELECT m.*, {names} FROM mentions m {joins}")
+
+def entity_names(cur, ids):
+    """{id: name} for the given entity ids"""
+    ids = [entity_id for entity_id in ids if entity_id]
+    if not ids:
+        return {}
+    cur.execute("SELECT id, name FROM entities WHERE id = ANY(%s)", (ids,))
+    return {row['id']: row['name'] for row in cur.fetchall()}
+
+def entity_match_sql(kind):
+    """WHERE condition matching one entity by name or alias; takes the name as a parameter"""
+    return (f"{ENTITY_COLUMNS[kind]} = (SELECT entity_id FROM entity_aliases "
+            f"WHERE kind = '{kind}' AND alias = entity_key(%s))")
+
+def rollup_changes_sql(sources):
+    """Upsert the net count change per rollup key from (transition table, sign) pairs"""
+    entity_columns = set(ENTITY_COLUMNS.values())
+    columns = ', '.join(f"COALESCE({column}, 0) AS {column}" if column in entity_columns
+                        else f"COALESCE({column}, '') AS {column}"
+                        for column in ROLLUP_COLUMNS)
+    changes = ' UNION ALL '.join(
+        f"SELECT captured_at::date AS day, {columns}, {sign} AS delta FROM {table}"
+        for table, sign in sources
+    )
+    keys = ', '.join(['day'] + ROLLUP_COLUMNS)
+    return f"""
+        INSERT INTO mention_rollups AS rollup ({keys}, mentions)
+        SELECT {keys}, SUM(delta) FROM ({changes}) AS changes
+        GROUP BY {keys}
+        HAVING SUM(delta) <> 0
+        ORDER BY {keys}
+        ON CONFLICT ({keys}) DO UPDATE SET mentions = rollup.mentions + EXCLUDED.mentions;
+    """
+
+def create_rollups(cur):
+    """Create mention_rollups and the triggers that keep it current (caller commits)
+    
+    Statement-level triggers apply the net change of each insert, update or
+    delete on mentions, so a batch write costs one upsert per affected key
+    and updates that leave every dimension unchanged cost nothing. The
+    table is filled from mentions the first time it is created.
+    
+    Deletes made with ROLLUP_ARCHIVING_SETTING on (retention moving rows to
+    mentions_archive) keep their counts, as detached partitions do, so
+    analytics history doesn't change when old rows leave mentions.
+    """
+    cur.execute("SELECT to_regclass('mention_rollups') IS NULL AS missing")
+    missing = cur.fetchone()['missing']
+    
+    entity_columns = set(ENTITY_COLUMNS.values())
+    dimensions = ', '.join(f"{column} {'INTEGER' if column in entity_columns else 'TEXT'} NOT NULL"
+                           for column in ROLLUP_COLUMNS)
+    keys = ', '.join(['day'] + ROLLUP_COLUMNS)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS mention_rollups (
+            day DATE NOT NULL,
+            {dimensions},
+            mentions INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY ({keys})
+        )
+    """)
+    
+    cur.execute(f"""
+        CREATE OR REPLACE FUNCTION mention_rollups_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {rollup_changes_sql([('new_rows', 1)])}
+            ELSIF TG_OP = 'UPDATE' THEN
+                {rollup_changes_sql([('old_rows', -1), ('new_rows', 1)])}
+            ELSIF current_setting('{ROLLUP_ARCHIVING_SETTING}', true) IS DISTINCT FROM 'on' THEN
+                {rollup_changes_sql([('old_rows', -1)])}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    
+    for operation, referencing in (
+        ('INSERT', 'NEW TABLE AS new_rows'),
+        ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+        ('DELETE', 'OLD TABLE AS old_rows'),
+    ):
+        name = f'mention_rollups_{operation.lower()}'
+        cur.execute(f"DROP TRIGGER IF EXISTS {name} ON mentions")
+        cur.execute(f"""
+            CREATE TRIGGER {name}
+            AFTER {operation} ON mentions
+            REFERENCING {referencing}
+            FOR EACH STATEMENT EXECUTE FUNCTION mention_rollups_apply()
+        """)
+    
+    if missing:
+        cur.execute(rollup_changes_sql([('mentions', 1)]))
+        logger.info("Built mention_rollups from existing mentions")
+
+def create_mention_events(cur):
+    """Create mention_events and the triggers that fill it (caller commits)
+    
+    Each insert, update or delete on mentions appends one event per
+    affected row and sends a payload-less NOTIFY on EVENTS_CHANNEL, which
+    Postgres folds into one notification per transaction. Updates that
+    only touch bookkeeping columns (updated_at, classifier_version) are
+    not recorded.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS mention_events (
+            id BIGSERIAL PRIMARY KEY,
+            mention_id TEXT NOT NULL,
+            captured_at TIMESTAMP NOT NULL,
+            op TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    cur.execute(f"""
+        CREATE OR REPLACE FUNCTION mention_events_record() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO mention_events (mention_id, captured_at, op)
+                SELECT id, captured_at, 'inserted' FROM new_rows;
+            ELSIF TG_OP = 'UPDATE' THEN
+                INSERT INTO mention_events (mention_id, captured_at, op)
+                SELECT n.id, n.captured_at,
+                       CASE WHEN n.status IS DISTINCT FROM o.status THEN 'status' ELSE 'updated' END
+                FROM new_rows n JOIN old_rows o USING (id)
+                WHERE ({', '.join(f'n.{column}' for column in EVENT_COLUMNS)})
+                      IS DISTINCT FROM ({', '.join(f'o.{column}' for column in EVENT_COLUMNS)});
+            ELSE
+                INSERT INTO mention_events (mention_id, captured_at, op)
+                SELECT id, captured_at, 'deleted' FROM old_rows;
+            END IF;
+            IF FOUND THEN
+                PERFORM pg_notify('{EVENTS_CHANNEL}', '');
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    
+    for operation, referencing in (
+        ('INSERT', 'NEW TABLE AS new_rows'),
+        ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+        ('DELETE', 'OLD TABLE AS old_rows'),
+    ):
+        name = f'mention_events_{operation.lower()}'
+        cur.execute(f"DROP TRIGGER IF EXISTS {name} ON mentions")
+        cur.execute(f"""
+            CREATE TRIGGER {name}
+            AFTER {operation} ON mentions
+            REFERENCING {referencing}
+            FOR EACH STATEMENT EXECUTE FUNCTION mention_events_record()
+        """)
+
 def init_database():
     """Initialize database tables"""
     conn = get_db_connection()
@@ -52,37 +695,200 @@ def init_database():
     try:
         cur = conn.cursor()
         
-        # Create mentions table
+        # An unpartitioned mentions table from before partitioning is moved aside
+        legacy = rename_legacy_mentions(cur)
+        
+        create_entities(cur)
+        
+        # Mentions, partitioned by captured_at month (see ensure_partitions)
         cur.execute("""
             CREATE TABLE IF NOT EXISTS mentions (
-                id TEXT PRIMARY KEY,
+                id TEXT NOT NULL,
                 title TEXT NOT NULL,
-                url TEXT NOT NULL UNIQUE,
+                url TEXT NOT NULL,
                 snippet TEXT,
+                source_id INTEGER REFERENCES entities(id),
+                location_id INTEGER REFERENCES entities(id),
+                utility_id INTEGER REFERENCES entities(id),
+                utility_type_id INTEGER REFERENCES entities(id),
+                stage_id INTEGER REFERENCES entities(id),
+                priority TEXT,
+                captured_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                status TEXT DEFAULT 'pending',
+                tags TEXT[],
+                notes TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                classifier_version INTEGER NOT NULL DEFAULT 0,
+                score DOUBLE PRECISION,
+                published_at TIMESTAMP,
+                PRIMARY KEY (id, captured_at)
+            ) PARTITION BY RANGE (captured_at)
+        """)
+        
+        migrate_entity_columns(cur)
+        
+        # Priority score (see scoring.py); filled in for older rows by backfill.py
+        cur.execute("ALTER TABLE mentions ADD COLUMN IF NOT EXISTS score DOUBLE PRECISION")
+        
+        # Publication time (UTC) from the source, when it gives one; NULL for older rows
+        cur.execute("ALTER TABLE mentions ADD COLUMN IF NOT EXISTS published_at TIMESTAMP")
+        
+        # Rows outside every monthly partition
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS mentions_default 
+            PARTITION OF mentions DEFAULT
+        """)
+        
+        # Every URL ever stored, live or archived; a partitioned table can't
+        # enforce a unique url, so crawls dedupe here. url_hash is
+        # crawler.url_digest (SHA-256 of the canonical URL); keys copied from
+        # before canonical URLs hash the URL as stored
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS mention_keys (
+                url_hash BYTEA PRIMARY KEY,
+                mention_id TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_mention_keys_mention
+            ON mention_keys(mention_id)
+        """)
+        
+        # Deleted mentions moved out by the retention job (see retention.py);
+        # url_hash is the mention's mention_keys key
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS mentions_archive (
+                id TEXT NOT NULL,
+                url_hash BYTEA NOT NULL,
                 source TEXT,
+                captured_at TIMESTAMP NOT NULL,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        ensure_partitions(cur)
+        if legacy:
+            copy_legacy_mentions(cur)
+        
+        # Status filters and the review queue, highest score first; this
+        # replaces the plain status index
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_mentions_status_score 
+            ON mentions(status, score DESC NULLS LAST)
+        """)
+        cur.execute("DROP INDEX IF EXISTS idx_mentions_status")
+        
+        # Newest-published first and publication date ranges
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_mentions_status_published 
+            ON mentions(status, published_at DESC NULLS LAST)
+        """)
+        
+        # Location filters
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_mentions_location 
+            ON mentions(location_id)
+        """)
+        
+        # Newest-first listings read the recent end of each partition
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_mentions_captured_at 
+            ON mentions(captured_at)
+        """)
+        
+        create_mention_details(cur)
+        create_rollups(cur)
+        create_mention_events(cur)
+        
+        # Fetched articles, so enrichment never downloads the same URL twice
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS article_cache (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT,
                 location TEXT,
                 utility TEXT,
                 utility_type TEXT,
                 stage TEXT,
                 priority TEXT,
-                captured_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'pending',
-                tags TEXT[],
-                notes TEXT,
+                fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Articles are no longer looked up by content hash
+        cur.execute("DROP INDEX IF EXISTS idx_article_cache_hash")
+        
+        # Failed fetches (content_hash NULL) are retried with backoff
+        cur.execute("""
+            ALTER TABLE article_cache
+            ADD COLUMN IF NOT EXISTS mention_id TEXT,
+            ADD COLUMN IF NOT EXISTS failures INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS failed_at TIMESTAMP
+        """)
+        cur.execute("""
+            UPDATE article_cache SET failures = 1, failed_at = fetched_at
+            WHERE content_hash IS NULL AND failed_at IS NULL
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_article_cache_failed
+            ON article_cache(failed_at) WHERE content_hash IS NULL
+        """)
+        
+        # State the crawler carries between runs (working PUC paths, sitemap cursors, ...)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS crawler_state (
+                key TEXT PRIMARY KEY,
+                value JSONB NOT NULL,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
         
-        # Create index on status for faster queries
+        # Archived before it was taken from mention_keys, url_hash was SHA-256 of the stored URL.
+        # Repaired once: whichever worker inserts the marker runs the update.
+        cur.execute("""
+            INSERT INTO crawler_state (key, value) VALUES (%s, 'true')
+            ON CONFLICT (key) DO NOTHING
+            RETURNING key
+        """, (ARCHIVE_HASH_REPAIRED_KEY,))
+        if cur.fetchone():
+            cur.execute("""
+                UPDATE mentions_archive a SET url_hash = k.url_hash
+                FROM mention_keys k
+                WHERE k.mention_id = a.id AND k.url_hash <> a.url_hash
+            """)
+            logger.info(f"Repaired url_hash of {cur.rowcount} archived mentions")
+        
+        # Crawl checkpoints: each run and the (source, query, page) units it finished
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_runs (
+                id SERIAL PRIMARY KEY,
+                params_hash TEXT NOT NULL,
+                params JSONB NOT NULL,
+                status TEXT DEFAULT 'running',
+                found INTEGER DEFAULT 0,
+                inserted INTEGER DEFAULT 0,
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        """)
+        
         cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_mentions_status 
-            ON mentions(status)
+            CREATE INDEX IF NOT EXISTS idx_crawl_runs_status 
+            ON crawl_runs(status, params_hash)
         """)
         
-        # Create index on URL for duplicate checking
         cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_mentions_url 
-            ON mentions(url)
+            CREATE TABLE IF NOT EXISTS crawl_units (
+                crawl_id INTEGER NOT NULL REFERENCES crawl_runs(id) ON DELETE CASCADE,
+                source TEXT NOT NULL,
+                query TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                mentions INTEGER DEFAULT 0,
+                completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (crawl_id, source, query, page)
+            )
         """)
         
         conn.commit()
@@ -101,6 +907,481 @@ def init_database():
 # Initialize database on startup
 init_database()
 
+def load_crawler_state(cur):
+    """Load the crawler's persisted state as a dict of top-level sections"""
+    cur.execute("SELECT key, value FROM crawler_state")
+    return {row['key']: row['value'] for row in cur.fetchall()}
+
+def save_crawler_state(cur, state):
+    """Persist top-level sections of the crawler state (caller commits)"""
+    for key, value in state.items():
+        cur.execute("""
+            INSERT INTO crawler_state (key, value, updated_at)
+            VALUES (%s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (key) DO UPDATE
+            SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at
+        """, (key, Jsonb(value)))
+
+def insert_mentions(cur, mentions):
+    """Insert crawled mentions, skipping URLs already stored or archived
+    
+    Keyed on the canonical URL digest (which the mention id is derived
+    from), so repeating an insert, or two crawlers storing the same page,
+    writes it once. Returns the mentions that were actually inserted.
+    """
+    inserted = []
+    # Entity names are stored as ids, resolved (and aliased) in the same statement
+    columns = ', '.join(ENTITY_COLUMNS.get(column, column) for column in MENTION_COLUMNS)
+    values = ', '.join(f"resolve_entity('{column}', %s)" if column in ENTITY_COLUMNS else '%s'
+                       for column in MENTION_COLUMNS)
+    
+    for mention in mentions:
+        # The mention_keys row claims the URL; the mention is only written if the claim succeeds
+        run_query(cur, f"""
+            WITH claimed AS (
+                INSERT INTO mention_keys (url_hash, mention_id)
+                VALUES (%s, %s)
+                ON CONFLICT DO NOTHING
+                RETURNING mention_id
+            )
+            INSERT INTO mentions ({columns})
+            SELECT {values} FROM claimed
+            RETURNING id
+        """, (url_digest(mention.url), mention.id) + mention.to_row())
+        if cur.fetchone():
+            inserted.append(mention)
+    
+    return inserted
+
+class DatabaseCheckpoint(CrawlCheckpoint):
+    """Crawl checkpoint stored in crawl_runs/crawl_units
+    
+    Each finished unit commits its mentions, its unit row and any changed
+    crawler state in one transaction, so a crawl killed mid-way resumes
+    from the next unfinished unit without repeating paid API calls.
+    """
+    
+    def __init__(self, conn, crawl_id, state, done_units, previous_mentions, resumed):
+        self.conn = conn
+        self.crawl_id = crawl_id
+        self.state = state
+        self.done_units = done_units
+        self.previous_mentions = previous_mentions
+        self.resumed = resumed
+        self.found = 0
+        self.inserted = []
+        self.skipped = []
+        self._saved_state = {key: json.dumps(value, sort_keys=True) for key, value in state.items()}
+    
+    @classmethod
+    def open(cls, conn, params):
+        """Resume the latest interrupted run with the same parameters, or start one"""
+        params_hash = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+        cur = conn.cursor()
+        
+        # Long-lived workers keep the next months' partitions in place
+        ensure_partitions(cur)
+        
+        cur.execute("""
+            UPDATE crawl_runs SET status = 'abandoned'
+            WHERE status = 'running'
+            AND started_at < CURRENT_TIMESTAMP - make_interval(hours => %s)
+        """, (CRAWL_RESUME_HOURS,))
+        
+        cur.execute("""
+            SELECT id, inserted FROM crawl_runs
+            WHERE status = 'running' AND params_hash = %s
+            ORDER BY started_at DESC
+        """, (params_hash,))
+        candidates = cur.fetchall()
+        
+        crawl_id = None
+        previous_mentions = 0
+        for row in candidates:
+            # A run still held by a live worker is locked; skip it
+            cur.execute("SELECT pg_try_advisory_lock(%s, %s) AS locked", (CRAWL_LOCK_NAMESPACE, row['id']))
+            if cur.fetchone()['locked']:
+                crawl_id = row['id']
+                previous_mentions = row['inserted']
+                break
+        
+        resumed = crawl_id is not None
+        done_units = set()
+        
+        if resumed:
+            cur.execute("""
+                SELECT source, query, page FROM crawl_units WHERE crawl_id = %s
+            """, (crawl_id,))
+            done_units = {(row['source'], row['query'], row['page']) for row in cur.fetchall()}
+            logger.info(f"Resuming crawl {crawl_id} ({len(done_units)} units already done)")
+        else:
+            cur.execute("""
+                INSERT INTO crawl_runs (params_hash, params) VALUES (%s, %s) RETURNING id
+            """, (params_hash, Jsonb(params)))
+            crawl_id = cur.fetchone()['id']
+            cur.execute("SELECT pg_advisory_lock(%s, %s)", (CRAWL_LOCK_NAMESPACE, crawl_id))
+        
+        state = load_crawler_state(cur)
+        conn.commit()
+        cur.close()
+        
+        return cls(conn, crawl_id, state, done_units, previous_mentions, resumed)
+    
+    def is_done(self, unit):
+        return unit in self.done_units
+    
+    def complete(self, unit, mentions, finished=True):
+        source, query, page = unit
+        cur = self.conn.cursor()
+        
+        try:
+            inserted = insert_mentions(cur, mentions)
+            
+            if finished:
+                cur.execute("""
+                    INSERT INTO crawl_units (crawl_id, source, query, page, mentions)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON CONFLICT DO NOTHING
+                """, (self.crawl_id, source, query, page, len(inserted)))
+            
+            cur.execute("""
+                UPDATE crawl_runs
+                SET found = found + %s, inserted = inserted + %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (len(mentions), len(inserted), self.crawl_id))
+            
+            # Only write state sections this unit changed
+            changed = {}
+            for key, value in self.state.items():
+                serialized = json.dumps(value, sort_keys=True)
+                if self._saved_state.get(key) != serialized:
+                    changed[key] = value
+                    self._saved_state[key] = serialized
+            save_crawler_state(cur, changed)
+            
+            self.conn.commit()
+            
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+        
+        if finished:
+            self.done_units.add(unit)
+        self.found += len(mentions)
+        self.inserted.extend(inserted)
+    
+    def skip(self, unit, reason):
+        source, query, page = unit
+        self.skipped.append({'source': source, 'query': query, 'page': page, 'reason': reason})
+    
+    def finish(self):
+        """Release the run's lock, marking it completed unless units were skipped
+        
+        A run that stopped at its deadline, or had units fail, stays 'running',
+        so the next crawl with the same parameters resumes the skipped units.
+        """
+        cur = self.conn.cursor()
+        if self.skipped:
+            cur.execute("UPDATE crawl_runs SET updated_at = CURRENT_TIMESTAMP WHERE id = %s", (self.crawl_id,))
+        else:
+            cur.execute("""
+                UPDATE crawl_runs
+                SET status = 'completed', finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (self.crawl_id,))
+        cur.execute("SELECT pg_advisory_unlock(%s, %s)", (CRAWL_LOCK_NAMESPACE, self.crawl_id))
+        self.conn.commit()
+        cur.close()
+
+class DatabaseArticleCache:
+    """Article cache backed by the article_cache table (see crawler.ArticleCache)"""
+    
+    def __init__(self, conn):
+        self.conn = conn
+    
+    # A failed fetch is due again ARTICLE_RETRY_SECONDS * 2^(failures - 1) after the last one
+    RETRY_DUE = """
+        content_hash IS NULL AND failures < %(attempts)s
+        AND failed_at <= CURRENT_TIMESTAMP - make_interval(secs => %(retry)s * 2 ^ (failures - 1))
+    """
+    
+    def unseen(self, urls):
+        cur = self.conn.cursor()
+        cur.execute(f"""
+            SELECT url FROM article_cache
+            WHERE url = ANY(%(urls)s) AND NOT ({self.RETRY_DUE})
+        """, {'urls': urls, 'attempts': ARTICLE_MAX_ATTEMPTS, 'retry': ARTICLE_RETRY_SECONDS})
+        cached = {row['url'] for row in cur.fetchall()}
+        cur.close()
+        return [url for url in urls if url not in cached]
+    
+    def due_retries(self, limit=ENRICH_RETRY_BATCH):
+        """Pending mentions whose article fetch failed and is due again, as records.Mention"""
+        cur = self.conn.cursor()
+        cur.execute(f"""
+            SELECT d.* FROM article_cache a
+            JOIN mention_details d ON d.id = a.mention_id
+            WHERE {self.RETRY_DUE} AND d.status = 'pending'
+            ORDER BY a.failed_at
+            LIMIT %(limit)s
+        """, {'attempts': ARTICLE_MAX_ATTEMPTS, 'retry': ARTICLE_RETRY_SECONDS, 'limit': limit})
+        rows = cur.fetchall()
+        cur.close()
+        return [Mention.from_row(row) for row in rows]
+    
+    def store(self, url, content_hash, fields):
+        fields = fields or {}
+        cur = self.conn.cursor()
+        cur.execute("""
+            INSERT INTO article_cache 
+            (url, content_hash, location, utility, utility_type, stage, priority)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (url) DO UPDATE
+            SET content_hash = EXCLUDED.content_hash, location = EXCLUDED.location, utility = EXCLUDED.utility,
+                utility_type = EXCLUDED.utility_type, stage = EXCLUDED.stage, priority = EXCLUDED.priority,
+                fetched_at = CURRENT_TIMESTAMP
+            WHERE article_cache.content_hash IS NULL
+        """, (
+            url,
+            content_hash,
+            fields.get('location'),
+            fields.get('utility'),
+            fields.get('utilityType'),
+            fields.get('stage'),
+            fields.get('priority')
+        ))
+        cur.close()
+        self.conn.commit()
+
+    def store_failure(self, url, mention_id):
+        cur = self.conn.cursor()
+        cur.execute("""
+            INSERT INTO article_cache (url, mention_id, failures, failed_at)
+            VALUES (%s, %s, 1, CURRENT_TIMESTAMP)
+            ON CONFLICT (url) DO UPDATE
+            SET mention_id = EXCLUDED.mention_id, failures = article_cache.failures + 1,
+                failed_at = CURRENT_TIMESTAMP
+            WHERE article_cache.content_hash IS NULL
+        """, (url, mention_id))
+        cur.close()
+        self.conn.commit()
+
+def run_enrichment(mentions, profile=False):
+    """Fetch full articles for mentions and write back the reclassification
+    
+    With profile, the run is profiled like a request (see /api/profiles).
+    """
+    with logging_setup.log_context(job_id=logging_setup.new_id('enrich')):
+        if not profile:
+            enrich_and_update(mentions)
+            return
+        with profiling.profiled('enrichment') as result:
+            enrich_and_update(mentions)
+        logger.info(f"Enrichment profile saved as {result['name']}")
+
+def enrich_and_update(mentions):
+    conn = get_db_connection()
+    if not conn:
+        logger.warning("Skipping enrichment - database not available")
+        return
+    
+    try:
+        cache = DatabaseArticleCache(conn)
+        # Articles that failed to fetch earlier ride along once their backoff is over
+        urls = {mention.url for mention in mentions}
+        mentions = list(mentions) + [mention for mention in cache.due_retries() if mention.url not in urls]
+        updates = enrich_mentions(mentions, cache)
+        
+        # The stage may have changed, and the score with it
+        reclassified = score_mentions([mention.reclassified(fields, CLASSIFIER_VERSION)
+                                       for mention, fields in updates])
+        
+        cur = conn.cursor()
+        for mention in reclassified:
+            cur.execute("""
+                UPDATE mentions
+                SET location_id = resolve_entity('location', %s), utility_id = resolve_entity('utility', %s),
+                    utility_type_id = resolve_entity('utility_type', %s), stage_id = resolve_entity('stage', %s),
+                    priority = %s, classifier_version = %s, score = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND status = 'pending'
+            """, (
+                mention.location,
+                mention.utility,
+                mention.utility_type,
+                mention.stage,
+                mention.priority,
+                mention.classifier_version,
+                mention.score,
+                mention.id
+            ))
+        
+        conn.commit()
+        cur.close()
+        conn.close()
+        
+        logger.info(f"Enrichment updated {len(updates)} mentions")
+        
+    except Exception as e:
+        logger.error(f"Enrichment error: {e}", exc_info=True)
+        conn.rollback()
+        conn.close()
+
+def start_enrichment(mentions, profile=False):
+    """Run enrichment on a background thread so it never delays the crawl response
+    
+    The thread runs in a copy of the caller's context, so its log records
+    carry the crawl's correlation id.
+    """
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(run_enrichment, mentions, profile), name='enrichment',
+                              daemon=True)
+    thread.start()
+    return thread
+
+def fetch_events(cur, after, limit, until=None):
+    """mention_events rows after id after (up to until), each with its current mention row"""
+    query = """
+        SELECT e.id AS event_id, e.op, e.mention_id AS event_mention_id, m.*
+        FROM mention_events e
+        LEFT JOIN mention_details m ON m.id = e.mention_id AND m.captured_at = e.captured_at
+        WHERE e.id > %s
+    """
+    params = [after]
+    if until is not None:
+        query += " AND e.id <= %s"
+        params.append(until)
+    query += " ORDER BY e.id LIMIT %s"
+    params.append(limit)
+    
+    cur.execute(query, params)
+    return cur.fetchall()
+
+def event_message(row):
+    """(event id, SSE message) for a fetch_events row"""
+    row = dict(row)
+    event_id = row.pop('event_id')
+    op = row.pop('op')
+    mention_id = row.pop('event_mention_id')
+    mention = serialize_mention(row) if row['id'] is not None else None
+    data = json.dumps({'op': op, 'id': mention_id, 'mention': mention}, default=str)
+    return event_id, f"id: {event_id}\nevent: mention\ndata: {data}\n\n"
+
+class EventClient:
+    """Queue of (event id, message) pairs for one /api/events stream"""
+    
+    def __init__(self):
+        self.queue = queue.Queue(EVENTS_CLIENT_QUEUE)
+        self.overflowed = False
+    
+    def put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.overflowed = True
+
+class EventBroadcaster:
+    """Fans new mention_events out to this process's /api/events streams
+    
+    One thread LISTENs on EVENTS_CHANNEL and reads new events in id order,
+    so each event is read once however many clients are connected. last_id
+    is the newest event delivered. An id that is missing (its transaction
+    has not committed yet) holds delivery back for up to EVENTS_GAP_SECONDS
+    from when the listener first saw a later id, after which it is taken to
+    be rolled back. The gap is timed here rather than from created_at, which
+    is when the later event's transaction started, not when it committed.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clients = set()
+        self.last_id = None
+        # (missing id, time.monotonic() when a later id was first seen)
+        self.gap = None
+        self.ready = threading.Event()
+        self.thread = None
+    
+    def subscribe(self):
+        """Register a client, starting the listener thread on first use
+        
+        Returns None when EVENTS_MAX_STREAMS clients are already connected.
+        """
+        client = EventClient()
+        with self.lock:
+            if len(self.clients) >= EVENTS_MAX_STREAMS:
+                return None
+            self.clients.add(client)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='mention-events', daemon=True)
+                self.thread.start()
+        self.ready.wait(EVENTS_POLL_SECONDS)
+        return client
+    
+    def unsubscribe(self, client):
+        with self.lock:
+            self.clients.discard(client)
+    
+    def gap_settled(self):
+        """Whether the id after last_id has been missing for EVENTS_GAP_SECONDS"""
+        missing = self.last_id + 1
+        now = time.monotonic()
+        if self.gap is None or self.gap[0] != missing:
+            self.gap = (missing, now)
+        return now - self.gap[1] >= EVENTS_GAP_SECONDS
+    
+    def poll(self, conn):
+        """Deliver the events committed since last_id"""
+        while True:
+            with conn.cursor() as cur:
+                rows = fetch_events(cur, self.last_id, EVENTS_BATCH_ROWS)
+            
+            messages = []
+            for row in rows:
+                if row['event_id'] != self.last_id + 1 and not self.gap_settled():
+                    break
+                messages.append(event_message(row))
+                self.last_id = row['event_id']
+            
+            if messages:
+                with self.lock:
+                    clients = list(self.clients)
+                for client in clients:
+                    for message in messages:
+                        client.put(message)
+            
+            if len(rows) < EVENTS_BATCH_ROWS or len(messages) < len(rows):
+                return
+    
+    def run(self):
+        while True:
+            conn = get_db_connection()
+            if not conn:
+                self.ready.set()
+                time.sleep(EVENTS_POLL_SECONDS)
+                continue
+            
+            try:
+                conn.autocommit = True
+                conn.execute(f"LISTEN {EVENTS_CHANNEL}")
+                if self.last_id is None:
+                    row = conn.execute("SELECT COALESCE(MAX(id), 0) AS id FROM mention_events").fetchone()
+                    self.last_id = row['id']
+                self.ready.set()
+                
+                while True:
+                    self.poll(conn)
+                    # Wait for the next NOTIFY, but read at least every EVENTS_POLL_SECONDS
+                    for _ in conn.notifies(timeout=EVENTS_POLL_SECONDS, stop_after=1):
+                        pass
+            except Exception as e:
+                logger.error(f"Event listener error: {e}")
+                time.sleep(EVENTS_POLL_SECONDS)
+            finally:
+                conn.close()
+
+EVENTS = EventBroadcaster()
+
 # HTML content (embedded frontend)
 HTML_CONTENT = """<!DOCTYPE html>
 <html lang="en">
@@ -138,7 +1419,7 @@ HTML_CONTENT = """<!DOCTYPE html>
 <body>
     <div id="root"><div class="loading">Loading Utility Monitor...</div></div>
     <script type="text/babel">
-        const { useState, useEffect } = React;
+        const { useState, useEffect, useRef } = React;
         const { Search, X, Filter, AlertCircle, CheckCircle, Clock, ChevronDown, ChevronUp, MapPin, Zap, RefreshCw, Loader, Server, ExternalLink } = lucide;
         const API_BASE_URL = '/api';
 
@@ -154,13 +1435,94 @@ HTML_CONTENT = """<!DOCTYPE html>
           const [isCrawling, setIsCrawling] = useState(false);
           const [crawlStatus, setCrawlStatus] = useState('');
           const [backendConnected, setBackendConnected] = useState(false);
+          const [facets, setFacets] = useState({});
+          const statsTimer = useRef(null);
+          const facetQuery = useRef('');
+          const filtersOpen = useRef(false);
 
           useEffect(() => {
             checkBackendConnection();
             fetchMentions();
             fetchStats();
+
+            // Live changes from /api/events. The server closes each stream after a few minutes and
+            // EventSource resumes from the last event id. When every stream slot is taken (503)
+            // EventSource gives up, so reload and try again later from the last id seen.
+            let events = null;
+            let lastEventId = null;
+            let retryTimer = null;
+            const connect = () => {
+              events = new EventSource(`${API_BASE_URL}/events` + (lastEventId ? `?since=${lastEventId}` : ''));
+              const track = (e) => { if (e.lastEventId) lastEventId = e.lastEventId; };
+              events.addEventListener('ready', track);
+              events.addEventListener('mention', (e) => {
+                track(e);
+                const event = JSON.parse(e.data);
+                if (event.mention) applyMention(event.mention);
+                else setMentions(prev => prev.filter(m => m.id !== event.id));
+                scheduleStats();
+              });
+              events.addEventListener('reset', (e) => {
+                track(e);
+                fetchMentions();
+                fetchStats();
+              });
+              events.onerror = () => {
+                if (events.readyState !== EventSource.CLOSED) return;
+                retryTimer = setTimeout(() => {
+                  fetchMentions();
+                  fetchStats();
+                  connect();
+                }, 60000);
+              };
+            };
+            connect();
+            return () => {
+              clearTimeout(retryTimer);
+              events.close();
+            };
           }, []);
 
+          // Replace a mention in place, or add a new one at its score position
+          const applyMention = (mention) => {
+            setMentions(prev => {
+              if (prev.some(m => m.id === mention.id)) {
+                return prev.map(m => m.id === mention.id ? mention : m);
+              }
+              const index = prev.findIndex(m => (m.score ?? -Infinity) < (mention.score ?? -Infinity));
+              return index === -1 ? [...prev, mention] : [...prev.slice(0, index), mention, ...prev.slice(index)];
+            });
+          };
+
+          // A crawl sends a burst of events; refresh the counters once it settles
+          const scheduleStats = () => {
+            clearTimeout(statsTimer.current);
+            statsTimer.current = setTimeout(() => {
+              fetchStats();
+              fetchFacets();
+            }, 500);
+          };
+
+          // Filter options and counts for the current view and search, counted by the server;
+          // only fetched while the filter panel is open
+          const fetchFacets = async () => {
+            if (!filtersOpen.current) return;
+            try {
+              const response = await fetch(`${API_BASE_URL}/facets?${facetQuery.current}`);
+              if (response.ok) setFacets(await response.json());
+            } catch (error) {
+              console.error('Error fetching facets:', error);
+            }
+          };
+
+          useEffect(() => {
+            const params = new URLSearchParams({ status: view === 'review' ? 'pending' : 'approved' });
+            if (searchQuery) params.set('q', searchQuery);
+            facetQuery.current = params.toString();
+            filtersOpen.current = showFilters;
+            fetchFacets();
+          }, [view, searchQuery, showFilters]);
+
           const checkBackendConnection = async () => {
             try {
               const response = await fetch(`${API_BASE_URL}/health`);
@@ -173,7 +1535,7 @@ HTML_CONTENT = """<!DOCTYPE html>
 
           const fetchMentions = async () => {
             try {
-              const response = await fetch(`${API_BASE_URL}/mentions`);
+              const response = await fetch(`${API_BASE_URL}/mentions?sort=score`);
               if (response.ok) {
                 const data = await response.json();
                 setMentions(data);
@@ -234,8 +1596,8 @@ HTML_CONTENT = """<!DOCTYPE html>
               if (response.ok) {
                 const data = await response.json();
                 console.log('Update successful:', data);
-                await fetchMentions();
-                await fetchStats();
+                applyMention(data);
+                scheduleStats();
                 setSelectedMention(null);
               } else {
                 const errorData = await response.json();
@@ -248,7 +1610,14 @@ HTML_CONTENT = """<!DOCTYPE html>
             }
           };
 
-          const getUniqueValues = (key) => ['all', ...new Set(mentions.map(m => m[key]))];
+          const FILTER_FIELDS = [['source', 'Source'], ['location', 'Location'], ['priority', 'Priority'], ['utilityType', 'Utility type']];
+          // The selected value stays listed even when the current view has none of it
+          const getUniqueValues = (key) => {
+            const values = (facets[key] || []).map(f => f.value).filter(value => value !== null);
+            const selected = filters[key] !== 'all' && !values.includes(filters[key]) ? [filters[key]] : [];
+            return ['all', ...selected, ...values];
+          };
+          const getFacetCount = (key, value) => ((facets[key] || []).find(f => f.value === value) || {}).count || 0;
 
           const performCrawl = async () => {
             setIsCrawling(true);
@@ -278,13 +1647,20 @@ HTML_CONTENT = """<!DOCTYPE html>
                 })
               });
               const data = await response.json();
-              if (data.success) {
+              if (data.success && data.deadline_reached) {
+                setCrawlStatus(`✓ Crawl stopped at its time limit: ${data.new_mentions} new mentions saved, ${data.skipped.length} units left for the next crawl`);
+              } else if (data.success && data.skipped.length) {
+                setCrawlStatus(`✓ Crawl finished: ${data.new_mentions} new mentions saved, ${data.skipped.length} failed units left for the next crawl`);
+              } else if (data.success) {
                 setCrawlStatus(`✓ Crawl complete! Found ${data.new_mentions} new mentions (${data.duplicates} duplicates filtered)`);
-                await fetchMentions();
-                await fetchStats();
               } else {
                 setCrawlStatus(`✗ Crawl failed: ${data.error}`);
               }
+              // Without a free event stream slot this tab saw none of the crawl's events
+              if (data.success) {
+                await fetchMentions();
+                await fetchStats();
+              }
             } catch (error) {
               setCrawlStatus(`✗ Error: ${error.message}`);
             } finally {
@@ -335,6 +1711,23 @@ HTML_CONTENT = """<!DOCTYPE html>
                     <button onClick={() => setView('review')} style={{ flex: 1, padding: '0.75rem', background: view === 'review' ? 'linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%)' : 'rgba(51, 65, 85, 0.5)', border: 'none', borderRadius: '8px', color: 'white', cursor: 'pointer', fontWeight: '600' }}>Review Queue</button>
                     <button onClick={() => setView('approved')} style={{ flex: 1, padding: '0.75rem', background: view === 'approved' ? 'linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%)' : 'rgba(51, 65, 85, 0.5)', border: 'none', borderRadius: '8px', color: 'white', cursor: 'pointer', fontWeight: '600' }}>Approved Items</button>
                   </div>
+                  <button onClick={() => setShowFilters(!showFilters)} style={{ width: '100%', padding: '0.5rem', background: 'rgba(51, 65, 85, 0.5)', border: 'none', borderRadius: '8px', color: '#94a3b8', cursor: 'pointer', fontSize: '0.875rem' }}>
+                    {showFilters ? '▲ Hide filters' : '▼ Filters'}
+                  </button>
+                  {showFilters && (
+                    <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fit, minmax(200px, 1fr))', gap: '1rem', marginTop: '1rem' }}>
+                      {FILTER_FIELDS.map(([key, label]) => (
+                        <label key={key} style={{ fontSize: '0.75rem', color: '#94a3b8' }}>
+                          {label}
+                          <select value={filters[key]} onChange={(e) => setFilters({ ...filters, [key]: e.target.value })} style={{ display: 'block', width: '100%', marginTop: '0.25rem', padding: '0.5rem', background: 'rgba(15, 23, 42, 0.8)', color: '#e2e8f0', border: '1px solid rgba(148, 163, 184, 0.2)', borderRadius: '6px' }}>
+                            {getUniqueValues(key).map(value => (
+                              <option key={value} value={value}>{value === 'all' ? 'All' : `${value} (${getFacetCount(key, value)})`}</option>
+                            ))}
+                          </select>
+                        </label>
+                      ))}
+                    </div>
+                  )}
                 </div>
 
                 {filteredMentions.length === 0 ? (
@@ -354,7 +1747,7 @@ HTML_CONTENT = """<!DOCTYPE html>
                         <h3 style={{ fontSize: '1rem', fontWeight: '600', marginBottom: '0.5rem', color: '#e2e8f0' }}>{mention.title}</h3>
                         <p style={{ fontSize: '0.875rem', color: '#94a3b8', marginBottom: '0.75rem' }}>{mention.snippet}</p>
                         <div style={{ fontSize: '0.75rem', color: '#64748b', marginBottom: '0.5rem' }}>
-                          📍 {mention.location} | ⚡ {mention.utility} | 🕒 {new Date(mention.captured_at).toLocaleDateString()}
+                          📍 {mention.location} | ⚡ {mention.utility} | 🕒 {new Date(mention.publishedAt || mention.capturedAt).toLocaleDateString()}
                         </div>
                         <a 
                           href={mention.url} 
@@ -406,6 +1799,66 @@ HTML_CONTENT = """<!DOCTYPE html>
 </body>
 </html>"""
 
+def serialize_mention(row):
+    """Map a mentions row to the field names the frontend expects"""
+    mention = dict(row)
+    mention['utilityType'] = mention.pop('utility_type', None)
+    mention['capturedAt'] = mention.pop('captured_at', None)
+    mention['classifierVersion'] = mention.pop('classifier_version', None)
+    mention['publishedAt'] = mention.pop('published_at', None)
+    for column in ENTITY_COLUMNS.values():
+        mention.pop(column, None)
+    if mention['capturedAt']:
+        mention['capturedAt'] = mention['capturedAt'].isoformat()
+    if mention['publishedAt']:
+        mention['publishedAt'] = mention['publishedAt'].isoformat()
+    return mention
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            route=request.endpoint or 'unknown',
+            method=request.method,
+            status=response.status_code
+        )
+    return response
+
+def profile_requested():
+    """Profiling is opt-in per request: X-Profile: 1, ?profile=1, or "profile" in a crawl body"""
+    if request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1':
+        return True
+    if request.endpoint == 'trigger_crawl':
+        return bool((request.get_json(silent=True) or {}).get('profile'))
+    return False
+
+@app.before_request
+def start_request_profile():
+    # Only the request thread is profiled; crawler worker pools show up as waits
+    if request.path.startswith('/api/') and profile_requested():
+        g.profiler = profiling.start()
+
+@app.after_request
+def set_write_cookie(response):
+    write_lsn = g.pop('write_lsn', None)
+    if write_lsn:
+        response.set_cookie(WRITE_LSN_COOKIE, write_lsn, max_age=WRITE_LSN_MAX_AGE,
+                            httponly=True, samesite='Lax')
+    return response
+
+@app.after_request
+def save_request_profile(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        response.headers['X-Profile-Id'] = profiling.save(profiler, f"{request.method}-{request.endpoint}")
+    return response
+
 # Serve frontend
 @app.route('/')
 def index():
@@ -415,7 +1868,11 @@ def index():
 # API Routes
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; replicas shows each replica's last measured lag
+    
+    gazetteer.source is 'seed' when the built place index is missing and
+    only states and major cities are located (see build.sh).
+    """
     conn = get_db_connection()
     db_status = 'connected' if conn else 'disconnected'
     if conn:
@@ -425,56 +1882,106 @@ def health_check():
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'version': '2.0.0',
-        'database': db_status
+        'database': db_status,
+        'replicas': REPLICAS.status(),
+        'gazetteer': gazetteer_status()
     })
 
+def parse_date_arg(name):
+    """Parse an ISO date or datetime query argument; raises ValueError"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: expected an ISO date such as 2024-06-01")
+
+def mention_filters():
+    """WHERE clause and params for the status, location, priority, date and search filters
+    
+    since and until bound captured_at, published_since and published_until
+    bound published_at (undated mentions never match); the upper bounds
+    are exclusive. location matches an entity by name or alias. q matches
+    title, snippet, location or utility, case-insensitively. Raises
+    ValueError for a malformed date. The clause is for mention_details.
+    """
+    status = request.args.get('status')
+    location = request.args.get('location')
+    priority = request.args.get('priority')
+    since = parse_date_arg('since')
+    until = parse_date_arg('until')
+    published_since = parse_date_arg('published_since')
+    published_until = parse_date_arg('published_until')
+    search = request.args.get('q', '').strip()
+    
+    where = "WHERE 1=1"
+    params = []
+    
+    if status:
+        where += " AND status = %s"
+        params.append(status)
+    if location and location != 'all':
+        where += f" AND {entity_match_sql('location')}"
+        params.append(location)
+    if priority and priority != 'all':
+        where += " AND priority = %s"
+        params.append(priority)
+    if since:
+        where += " AND captured_at >= %s"
+        params.append(since)
+    if until:
+        where += " AND captured_at < %s"
+        params.append(until)
+    if published_since:
+        where += " AND published_at >= %s"
+        params.append(published_since)
+    if published_until:
+        where += " AND published_at < %s"
+        params.append(published_until)
+    if search:
+        pattern = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        where += " AND (title ILIKE %s OR snippet ILIKE %s OR location ILIKE %s OR utility ILIKE %s)"
+        params.extend([pattern] * 4)
+    
+    return where, params
+
 @app.route('/api/mentions', methods=['GET'])
 def get_mentions():
-    """Get all mentions with optional filtering"""
-    conn = get_db_connection()
+    """Get all mentions with optional filtering
+    
+    sort=score lists the highest-scored mentions first and
+    sort=published_at the most recently published (undated last); the
+    default is newest captured first. limit caps the number returned.
+    """
+    try:
+        where, params = mention_filters()
+        sort = request.args.get('sort', 'captured_at')
+        if sort not in MENTION_SORTS:
+            raise ValueError(f"sort must be one of {', '.join(MENTION_SORTS)}")
+        limit = limit_arg(maximum=MENTIONS_MAX_LIMIT) if 'limit' in request.args else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    conn = get_db_connection(readonly=True)
     if not conn:
         return jsonify({'error': 'Database not available'}), 500
     
     try:
         cur = conn.cursor()
         
-        status = request.args.get('status')
-        location = request.args.get('location')
-        priority = request.args.get('priority')
-        
-        query = "SELECT * FROM mentions WHERE 1=1"
-        params = []
+        query = f"SELECT * FROM mention_details {where} ORDER BY {MENTION_SORTS[sort]}"
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
         
-        if status:
-            query += " AND status = %s"
-            params.append(status)
-        if location and location != 'all':
-            query += " AND location = %s"
-            params.append(location)
-        if priority and priority != 'all':
-            query += " AND priority = %s"
-            params.append(priority)
-        
-        query += " ORDER BY captured_at DESC"
-        
-        cur.execute(query, params)
-        mentions = cur.fetchall()
-        
-        # Convert to list of dicts and fix field names
-        result = []
-        for m in mentions:
-            mention_dict = dict(m)
-            # Map database fields to frontend expected fields
-            mention_dict['utilityType'] = mention_dict.pop('utility_type', None)
-            mention_dict['capturedAt'] = mention_dict.pop('captured_at', None)
-            if mention_dict['capturedAt']:
-                mention_dict['capturedAt'] = mention_dict['capturedAt'].isoformat()
-            result.append(mention_dict)
+        mentions = fetch_all(cur, query, params)
         
         cur.close()
         conn.close()
         
-        return jsonify(result)
+        with SERIALIZE_SECONDS.time(route=current_route()):
+            return jsonify([serialize_mention(m) for m in mentions])
         
     except Exception as e:
         logger.error(f"Error getting mentions: {e}")
@@ -482,6 +1989,181 @@ def get_mentions():
             conn.close()
         return jsonify({'error': str(e)}), 500
 
+def export_ndjson(conn, where, params):
+    """Yield mentions as NDJSON, read through a server-side cursor"""
+    cur = conn.cursor(name='mentions_export')
+    cur.itersize = EXPORT_BATCH_ROWS
+    cur.execute(f"SELECT * FROM mention_details {where} ORDER BY captured_at DESC", params)
+    
+    buffer = []
+    size = 0
+    for row in cur:
+        line = json.dumps(serialize_mention(row), default=str) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+    cur.close()
+
+def export_csv(conn, where, params):
+    """Yield mentions as CSV straight from COPY ... TO STDOUT"""
+    cur = conn.cursor()
+    with cur.copy(f"""
+        COPY (SELECT {', '.join(EXPORT_COLUMNS)} FROM mention_details {where} ORDER BY captured_at DESC)
+        TO STDOUT WITH (FORMAT csv, HEADER)
+    """, params) as copy:
+        for data in copy:
+            yield bytes(data)
+    cur.close()
+
+def gzip_stream(chunks):
+    """Compress a byte stream into a gzip file on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+@app.route('/api/export', methods=['GET'])
+def export_mentions():
+    """Stream mentions as NDJSON (default) or CSV, optionally gzipped
+    
+    Accepts the /api/mentions filters (status, location, priority, since,
+    until). Rows are streamed from the database, so memory use does not
+    depend on the size of the export.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    compress = request.args.get('gzip', '').lower() in ('1', 'true')
+    
+    try:
+        where, params = mention_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    conn = get_db_connection(readonly=True)
+    if not conn:
+        return jsonify({'error': 'Database not available'}), 500
+    
+    def generate():
+        try:
+            if export_format == 'csv':
+                chunks = export_csv(conn, where, params)
+            else:
+                chunks = export_ndjson(conn, where, params)
+            yield from gzip_stream(chunks) if compress else chunks
+        except Exception as e:
+            # Headers are already sent; the client sees a truncated body
+            logger.error(f"Export error: {e}", exc_info=True)
+            raise
+        finally:
+            conn.close()
+    
+    filename = f"mentions-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"'
+    })
+
+def catch_up_events(since, until):
+    """Messages for the events after since up to until, or None if the client must reload
+    
+    None means some of those events were pruned, or there are more than
+    EVENTS_CATCHUP_LIMIT of them.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT MIN(id) AS first FROM mention_events")
+            first = cur.fetchone()['first']
+            if first is None or since + 1 < first:
+                return None
+            rows = fetch_events(cur, since, EVENTS_CATCHUP_LIMIT + 1, until)
+    finally:
+        conn.close()
+    
+    if len(rows) > EVENTS_CATCHUP_LIMIT:
+        return None
+    return [event_message(row) for row in rows]
+
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    """Server-Sent Events stream of mention changes
+    
+    Each 'mention' event carries {op, id, mention}: op is inserted, updated,
+    status or deleted, and mention is the row as it is now (null once it is
+    gone). The Last-Event-ID header a reconnecting EventSource sends, or
+    since=<event id>, replays the events after it first. A 'reset' event
+    means the client fell too far behind and should reload.
+    
+    A stream ends after EVENTS_STREAM_SECONDS; EventSource reconnects on
+    its own and resumes. With EVENTS_MAX_STREAMS streams already open the
+    request gets a 503, and the client should retry later.
+    """
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        since = int(since) if since else None
+    except ValueError:
+        return jsonify({'error': 'since must be an event id'}), 400
+    
+    if not DATABASE_URL:
+        return jsonify({'error': 'Database not available'}), 500
+    
+    client = EVENTS.subscribe()
+    if client is None:
+        return jsonify({'error': 'Too many event streams open'}), 503, {'Retry-After': str(EVENTS_STREAM_SECONDS)}
+    if EVENTS.last_id is None:
+        EVENTS.unsubscribe(client)
+        return jsonify({'error': 'Database not available'}), 500
+    
+    def generate():
+        last_id = EVENTS.last_id
+        closes_at = time.monotonic() + EVENTS_STREAM_SECONDS
+        try:
+            backlog = []
+            if since is not None and since < last_id:
+                backlog = catch_up_events(since, last_id)
+            if backlog is None:
+                yield f"retry: {EVENTS_RETRY_MS}\nid: {last_id}\nevent: reset\ndata: {{}}\n\n"
+            else:
+                yield f"retry: {EVENTS_RETRY_MS}\nid: {last_id if since is None else since}\nevent: ready\ndata: {{}}\n\n"
+                for _, message in backlog:
+                    yield message
+            
+            while True:
+                if client.overflowed:
+                    yield f"id: {EVENTS.last_id}\nevent: reset\ndata: {{}}\n\n"
+                    return
+                remaining = closes_at - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    event_id, message = client.queue.get(timeout=min(EVENTS_HEARTBEAT_SECONDS, remaining))
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event_id > last_id:
+                    last_id = event_id
+                    yield message
+        finally:
+            EVENTS.unsubscribe(client)
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/mentions/<mention_id>', methods=['PATCH'])
 def update_mention(mention_id):
     """Update a mention"""
@@ -514,22 +2196,21 @@ def update_mention(mention_id):
         
         params.append(mention_id)
         
-        query = f"UPDATE mentions SET {', '.join(update_fields)} WHERE id = %s RETURNING *"
+        query = f"UPDATE mentions SET {', '.join(update_fields)} WHERE id = %s RETURNING id, captured_at"
         
-        cur.execute(query, params)
-        updated_mention = cur.fetchone()
+        updated = fetch_one(cur, query, params)
+        updated_mention = updated and fetch_one(cur, """
+            SELECT * FROM mention_details WHERE id = %s AND captured_at = %s
+        """, (updated['id'], updated['captured_at']))
         
         conn.commit()
+        remember_write(conn)
         cur.close()
         conn.close()
         
         if updated_mention:
-            result = dict(updated_mention)
-            result['utilityType'] = result.pop('utility_type', None)
-            result['capturedAt'] = result.pop('captured_at', None)
-            if result['capturedAt']:
-                result['capturedAt'] = result['capturedAt'].isoformat()
-            return jsonify(result)
+            with SERIALIZE_SECONDS.time(route=current_route()):
+                return jsonify(serialize_mention(updated_mention))
         
         return jsonify({'error': 'Mention not found'}), 404
         
@@ -544,64 +2225,52 @@ def update_mention(mention_id):
 def trigger_crawl():
     """Trigger a web crawl"""
     try:
-        from crawler import run_crawl
-        
         data = request.json or {}
         queries = data.get('queries', ['utility municipalization', 'public power initiative'])
         max_results_per_query = data.get('max_results_per_query', 10)
+        enrich = data.get('enrich', ENRICH_ARTICLES)
         
-        logger.info(f"Starting crawl with {len(queries)} queries")
-        new_mentions = run_crawl(queries, max_results_per_query)
+        # Counted from the start of the request; clients may ask for less, never more
+        try:
+            budget = min(float(data.get('budget_seconds', CRAWL_BUDGET_SECONDS)), CRAWL_BUDGET_SECONDS)
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'budget_seconds must be a number'}), 400
+        deadline = time.monotonic() + budget
         
-        # Save to database
         conn = get_db_connection()
         if not conn:
             return jsonify({'success': False, 'error': 'Database not available'}), 500
         
-        cur = conn.cursor()
+        try:
+            checkpoint = DatabaseCheckpoint.open(conn, {
+                'queries': queries,
+                'max_results_per_query': max_results_per_query
+            })
+            
+            with logging_setup.log_context(crawl_id=checkpoint.crawl_id):
+                logger.info(f"Starting crawl with {len(queries)} queries and a {budget:.0f}s budget")
+                run_crawl(queries, max_results_per_query, checkpoint.state, checkpoint, deadline)
+                checkpoint.finish()
+            remember_write(conn)
+        finally:
+            # Closing the connection also releases the run's lock if the crawl failed
+            conn.close()
         
-        # Get existing URLs to check for duplicates
-        cur.execute("SELECT url FROM mentions")
-        existing_urls = {row['url'] for row in cur.fetchall()}
-        
-        unique_new_mentions = []
-        for mention in new_mentions:
-            if mention.get('url') not in existing_urls:
-                try:
-                    cur.execute("""
-                        INSERT INTO mentions 
-                        (id, title, url, snippet, source, location, utility, utility_type, stage, priority, status, tags)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (url) DO NOTHING
-                    """, (
-                        mention['id'],
-                        mention['title'],
-                        mention['url'],
-                        mention['snippet'],
-                        mention['source'],
-                        mention['location'],
-                        mention['utility'],
-                        mention['utilityType'],
-                        mention['stage'],
-                        mention['priority'],
-                        mention['status'],
-                        mention.get('tags', [])
-                    ))
-                    unique_new_mentions.append(mention)
-                    existing_urls.add(mention['url'])
-                except Exception as e:
-                    logger.error(f"Error inserting mention: {e}")
-                    continue
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        # Enrichment also retries earlier failed fetches, so it runs even without new mentions
+        if enrich:
+            with logging_setup.log_context(crawl_id=checkpoint.crawl_id):
+                # A profiled crawl profiles its enrichment too; the request profiler only sees this thread
+                start_enrichment(checkpoint.inserted, profile_requested())
         
         return jsonify({
             'success': True,
-            'new_mentions': len(unique_new_mentions),
-            'total_found': len(new_mentions),
-            'duplicates': len(new_mentions) - len(unique_new_mentions)
+            'crawl_id': checkpoint.crawl_id,
+            'resumed': checkpoint.resumed,
+            'new_mentions': len(checkpoint.inserted),
+            'total_found': checkpoint.found,
+            'duplicates': checkpoint.found - len(checkpoint.inserted),
+            'deadline_reached': any(unit['reason'] == 'deadline' for unit in checkpoint.skipped),
+            'skipped': checkpoint.skipped
         })
         
     except Exception as e:
@@ -611,7 +2280,7 @@ def trigger_crawl():
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get statistics"""
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     if not conn:
         return jsonify({'error': 'Database not available'}), 500
     
@@ -619,15 +2288,15 @@ def get_stats():
         cur = conn.cursor()
         
         # Get counts by status
-        cur.execute("SELECT status, COUNT(*) as count FROM mentions GROUP BY status")
-        status_counts = {row['status']: row['count'] for row in cur.fetchall()}
+        rows = fetch_all(cur, "SELECT status, COUNT(*) as count FROM mentions GROUP BY status")
+        status_counts = {row['status']: row['count'] for row in rows}
         
         # Get today's count
-        cur.execute("""
+        # A range on captured_at (not DATE(captured_at)) lets Postgres prune to today's partition
+        today_count = fetch_one(cur, """
             SELECT COUNT(*) as count FROM mentions 
-            WHERE DATE(captured_at) = CURRENT_DATE
-        """)
-        today_count = cur.fetchone()['count']
+            WHERE captured_at >= CURRENT_DATE AND captured_at < CURRENT_DATE + 1
+        """)['count']
         
         cur.close()
         conn.close()
@@ -646,6 +2315,244 @@ def get_stats():
             conn.close()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/facets', methods=['GET'])
+def get_facets():
+    """Distinct values and counts of each filterable field
+    
+    Takes the /api/mentions filters (typically status and q) and returns
+    {field: [{value, count}, ...]} for source, location, priority and
+    utilityType, largest first, at most limit values per field. All fields
+    are counted in one pass with GROUPING SETS.
+    """
+    try:
+        where, params = mention_filters()
+        limit = limit_arg(FACET_DEFAULT_LIMIT, FACET_MAX_LIMIT)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    conn = get_db_connection(readonly=True)
+    if not conn:
+        return jsonify({'error': 'Database not available'}), 500
+    
+    try:
+        cur = conn.cursor()
+        
+        # Entities are counted by id and named afterwards
+        columns = [ENTITY_COLUMNS.get(column, column) for column in FACET_FIELDS.values()]
+        rows = fetch_all(cur, f"""
+            SELECT {', '.join(columns)}, GROUPING({', '.join(columns)}) AS grouping, COUNT(*) AS count
+            FROM mention_details {where}
+            GROUP BY GROUPING SETS ({', '.join(f'({column})' for column in columns)})
+            ORDER BY count DESC
+        """, params)
+        
+        names = entity_names(cur, {row[column] for row in rows for column in columns
+                                   if column in ENTITY_COLUMNS.values()})
+        cur.close()
+        conn.close()
+        
+        # GROUPING() has a 0 bit, most significant first, for the set's own column
+        facets = {field: [] for field in FACET_FIELDS}
+        for row in rows:
+            index = next(i for i in range(len(columns)) if not row['grouping'] >> (len(columns) - 1 - i) & 1)
+            values = facets[list(FACET_FIELDS)[index]]
+            value = row[columns[index]]
+            if columns[index] in ENTITY_COLUMNS.values():
+                value = names.get(value)
+            if len(values) < limit:
+                values.append({'value': value, 'count': row['count']})
+        
+        return jsonify(facets)
+        
+    except Exception as e:
+        logger.error(f"Error getting facets: {e}")
+        if conn:
+            conn.close()
+        return jsonify({'error': str(e)}), 500
+
+def analytics_filters():
+    """WHERE clause, params and window for the rollup-backed analytics endpoints
+    
+    since/until default to the last ANALYTICS_DEFAULT_DAYS days. status is
+    a comma-separated list or 'all'; by default deleted mentions are left
+    out. Each other rollup dimension can be filtered by exact value.
+    Raises ValueError for malformed arguments.
+    """
+    until = parse_date_arg('until')
+    until = until.date() if until else datetime.now().date() + timedelta(days=1)
+    since = parse_date_arg('since')
+    since = since.date() if since else until - timedelta(days=ANALYTICS_DEFAULT_DAYS + 1)
+    
+    where = "WHERE day >= %s AND day < %s"
+    params = [since, until]
+    
+    status = request.args.get('status')
+    if not status:
+        where += " AND status <> 'deleted'"
+    elif status != 'all':
+        where += " AND status = ANY(%s)"
+        params.append(status.split(','))
+    
+    for dimension in ROLLUP_DIMENSIONS:
+        value = request.args.get(dimension)
+        if dimension in ENTITY_COLUMNS and value and value != 'all':
+            where += f" AND {entity_match_sql(dimension)}"
+            params.append(value)
+    
+    return where, params, since, until
+
+def dimension_arg(name, required=False):
+    """A rollup dimension named by a query argument; raises ValueError"""
+    value = request.args.get(name)
+    if value is None and not required:
+        return None
+    if value not in ROLLUP_DIMENSIONS:
+        raise ValueError(f"{name} must be one of {', '.join(ROLLUP_DIMENSIONS)}")
+    return value
+
+def name_entity_keys(cur, dimension, rows):
+    """Replace entity ids in rows' key with names ('' for none) when dimension is an entity"""
+    if dimension not in ENTITY_COLUMNS:
+        return
+    names = entity_names(cur, {row['key'] for row in rows})
+    for row in rows:
+        row['key'] = names.get(row['key'], '')
+
+def limit_arg(default=10, maximum=100):
+    try:
+        return max(1, min(int(request.args.get('limit', default)), maximum))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+
+@app.route('/api/analytics/timeseries', methods=['GET'])
+def get_analytics_timeseries():
+    """Mentions per day, week or month from the rollups, optionally split by a dimension
+    
+    With group=<dimension> only the limit largest groups in the window are
+    returned.
+    """
+    try:
+        interval = request.args.get('interval', 'day')
+        if interval not in ANALYTICS_INTERVALS:
+            raise ValueError(f"interval must be one of {', '.join(ANALYTICS_INTERVALS)}")
+        group = dimension_arg('group')
+        limit = limit_arg()
+        where, params, since, until = analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    conn = get_db_connection(readonly=True)
+    if not conn:
+        return jsonify({'error': 'Database not available'}), 500
+    
+    try:
+        cur = conn.cursor()
+        
+        if group:
+            column = ENTITY_COLUMNS.get(group, group)
+            query = f"""
+                SELECT date_trunc('{interval}', day)::date AS period, {column} AS key, SUM(mentions) AS mentions
+                FROM mention_rollups {where}
+                AND {column} IN (
+                    SELECT {column} FROM mention_rollups {where}
+                    GROUP BY {column} HAVING SUM(mentions) > 0
+                    ORDER BY SUM(mentions) DESC LIMIT %s
+                )
+                GROUP BY period, key HAVING SUM(mentions) > 0
+                ORDER BY period, key
+            """
+            params = params + params + [limit]
+        else:
+            query = f"""
+                SELECT date_trunc('{interval}', day)::date AS period, SUM(mentions) AS mentions
+                FROM mention_rollups {where}
+                GROUP BY period HAVING SUM(mentions) > 0
+                ORDER BY period
+            """
+        
+        rows = fetch_all(cur, query, params)
+        name_entity_keys(cur, group, rows)
+        
+        cur.close()
+        conn.close()
+        
+        for row in rows:
+            row['period'] = row['period'].isoformat()
+        
+        return jsonify({
+            'interval': interval,
+            'group': group,
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'points': rows
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting analytics timeseries: {e}")
+        if conn:
+            conn.close()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/top', methods=['GET'])
+def get_analytics_top():
+    """Top values of one dimension by mention count, from the rollups"""
+    try:
+        dimension = dimension_arg('dimension', required=True)
+        limit = limit_arg()
+        where, params, since, until = analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    conn = get_db_connection(readonly=True)
+    if not conn:
+        return jsonify({'error': 'Database not available'}), 500
+    
+    try:
+        cur = conn.cursor()
+        
+        column = ENTITY_COLUMNS.get(dimension, dimension)
+        rows = fetch_all(cur, f"""
+            SELECT {column} AS key, SUM(mentions) AS mentions
+            FROM mention_rollups {where}
+            GROUP BY {column} HAVING SUM(mentions) > 0
+            ORDER BY mentions DESC, key
+            LIMIT %s
+        """, params + [limit])
+        name_entity_keys(cur, dimension, rows)
+        
+        cur.close()
+        conn.close()
+        
+        return jsonify({
+            'dimension': dimension,
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'top': rows
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting analytics breakdown: {e}")
+        if conn:
+            conn.close()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Crawler and API metrics in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profiles', methods=['GET'])
+def get_profiles():
+    """List recent request and crawl profiles"""
+    return jsonify(profiling.list_profiles())
+
+@app.route('/api/profiles/<filename>', methods=['GET'])
+def download_profile(filename):
+    """Download a profile artifact (.prof for pstats, .txt for the summary)"""
+    if not filename.endswith(profiling.PROFILE_EXTENSIONS):
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_from_directory(profiling.PROFILE_DIR, filename, as_attachment=True)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     logger.info(f"Starting Utility Monitor on port {port}")
@@ -0,0 +1,184 @@
+"""
+Reclassify stored mentions after a classifier change
+
+Streams mentions whose classifier_version is older than
+crawler.CLASSIFIER_VERSION through a server-side cursor, reclassifies and
+rescores them on a process pool and writes them back in batched updates. Progress (the
+last id written) is kept in crawler_state, so an interrupted backfill
+resumes where it stopped. A pause between batches keeps it from starving
+the API.
+
+Usage:
+    python backfill.py --batch-size 1000 --workers 4 --pause 0.2
+"""
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import logging_setup
+from crawler import CLASSIFIER_VERSION, classify_text
+from scoring import score
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = 'classifier_backfill'
+
+# Rows read per server-side cursor; its transaction (and snapshot) ends after each chunk
+CHUNK_ROWS = int(os.environ.get('BACKFILL_CHUNK_ROWS', 50000))
+
+def reclassify_batch(rows):
+    """Classify and score (id, title, snippet, source, captured_at) rows; runs in a worker process"""
+    results = []
+    for mention_id, title, snippet, source, captured_at in rows:
+        text = f"{title} {snippet or ''}"
+        fields = classify_text(text)
+        results.append((
+            fields['location'],
+            fields['utility'],
+            fields['utilityType'],
+            fields['stage'],
+            fields['priority'],
+            score(text, source, fields['stage'], captured_at),
+            mention_id
+        ))
+    return results
+
+def write_batch(conn, results, version, state):
+    """Write one reclassified batch and the resume point in one transaction
+
+    Priority can be set by reviewers, so it is only recomputed while a
+    mention is still pending.
+    """
+    from app import save_crawler_state
+
+    with conn.cursor() as cur:
+        if results:
+            cur.executemany("""
+                UPDATE mentions
+                SET location_id = resolve_entity('location', %s), utility_id = resolve_entity('utility', %s),
+                    utility_type_id = resolve_entity('utility_type', %s), stage_id = resolve_entity('stage', %s),
+                    priority = CASE WHEN status = 'pending' THEN %s ELSE priority END,
+                    score = %s, classifier_version = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND classifier_version < %s
+            """, [(location, utility, utility_type, stage, priority, mention_score, version, mention_id, version)
+                  for location, utility, utility_type, stage, priority, mention_score, mention_id in results])
+        save_crawler_state(cur, {STATE_KEY: state})
+    conn.commit()
+
+def load_progress(conn, version):
+    """Resume point for this classifier version, or a fresh start"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT value FROM crawler_state WHERE key = %s", (STATE_KEY,))
+        row = cur.fetchone()
+    conn.commit()
+
+    progress = row['value'] if row else None
+    if progress and progress.get('version') == version and not progress.get('completed_at'):
+        logger.info(f"Resuming backfill to version {version} after id {progress['last_id']!r} "
+                    f"({progress['updated']} rows already done)")
+        return progress
+    return {'version': version, 'last_id': '', 'updated': 0, 'completed_at': None}
+
+def stream_stale(conn, version, last_id, batch_size):
+    """Yield batches of stale (id, title, snippet, source, captured_at) rows after last_id, in id order
+
+    Each chunk of CHUNK_ROWS rows is read through its own named cursor and
+    transaction, keyed on the last id seen, so no snapshot stays open for
+    the whole backfill.
+    """
+    while True:
+        rows_in_chunk = 0
+        with conn.cursor(name='classifier_backfill') as cur:
+            cur.itersize = batch_size
+            cur.execute("""
+                SELECT id, title, snippet, source, captured_at FROM mention_details
+                WHERE classifier_version < %s AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (version, last_id, CHUNK_ROWS))
+
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                rows_in_chunk += len(rows)
+                last_id = rows[-1]['id']
+                yield [(row['id'], row['title'], row['snippet'], row['source'], row['captured_at'])
+                       for row in rows]
+        conn.commit()
+
+        if rows_in_chunk < CHUNK_ROWS:
+            return
+
+def run_backfill(version=CLASSIFIER_VERSION, batch_size=1000, workers=None, pause=0.2, limit=None):
+    """Reclassify every mention older than version; returns rows updated"""
+    # app initializes the database on import, which worker processes must not do
+    from app import get_db_connection, init_database
+
+    if not init_database():
+        raise RuntimeError('Database not available')
+
+    read_conn = get_db_connection()
+    write_conn = get_db_connection()
+    progress = load_progress(write_conn, version)
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    submitted = done = 0
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # At most two batches per worker in flight, so memory stays bounded
+            in_flight = []
+
+            def drain(count):
+                nonlocal done
+                while len(in_flight) > count:
+                    future, last_id = in_flight.pop(0)
+                    results = future.result()
+                    progress['last_id'] = last_id
+                    progress['updated'] += len(results)
+                    write_batch(write_conn, results, version, progress)
+                    done += len(results)
+
+                    elapsed = time.perf_counter() - started
+                    logger.info(f"Reclassified {progress['updated']} mentions "
+                                f"({done / elapsed:.0f}/s), last id {last_id!r}")
+                    if pause:
+                        time.sleep(pause)
+
+            for rows in stream_stale(read_conn, version, progress['last_id'], batch_size):
+                in_flight.append((executor.submit(reclassify_batch, rows), rows[-1][0]))
+                submitted += len(rows)
+                drain(2 * workers)
+                if limit and submitted >= limit:
+                    break
+            drain(0)
+
+        if not limit or submitted < limit:
+            progress['completed_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+            write_batch(write_conn, [], version, progress)
+    finally:
+        read_conn.close()
+        write_conn.close()
+
+    logger.info(f"Backfill to classifier version {version} updated {done} mentions "
+                f"in {time.perf_counter() - started:.1f}s")
+    return done
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reclassify mentions stored under an older classifier version')
+    parser.add_argument('--batch-size', type=int, default=1000, help='rows per update batch')
+    parser.add_argument('--workers', type=int, default=None, help='classifier processes (default: CPU count)')
+    parser.add_argument('--pause', type=float, default=0.2, help='seconds to sleep after each batch')
+    parser.add_argument('--limit', type=int, default=None, help='stop after about this many rows')
+    args = parser.parse_args(argv)
+
+    logging_setup.configure()
+    with logging_setup.log_context(job_id=logging_setup.new_id('backfill')):
+        run_backfill(CLASSIFIER_VERSION, args.batch_size, args.workers, args.pause, args.limit)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+"""
+Offline benchmark suites for the Utility Monitor
+Run each module with python -m benchmarks.<name> from the repository root
+"""
@@ -0,0 +1,329 @@
+"""
+Load test for the Flask API against a seeded local PostgreSQL
+
+Seeds a dedicated schema with synthetic mentions at each requested volume,
+serves the app on a local port and drives the endpoints with concurrent
+clients. Results are printed (or written) as JSON for comparison between
+commits.
+
+Usage:
+    BENCH_DATABASE_URL=postgresql://localhost/bench \\
+        python -m benchmarks.api_load --rows 10000,100000 --concurrency 8
+
+The benchmark schema (default "bench") is dropped and recreated for every
+row count; nothing outside it is touched.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import psycopg
+import requests
+
+from scoring import score
+
+SEED = 20240601
+
+STATUSES = [('pending', 0.60), ('approved', 0.25), ('deleted', 0.15)]
+PRIORITIES = [('normal', 0.70), ('high', 0.30)]
+STAGES = [('Exploratory', 0.45), ('Active', 0.25), ('Ballot Measure', 0.20), ('Litigation', 0.10)]
+UTILITY_TYPES = [('Electric', 0.70), ('Water', 0.15), ('Gas', 0.10), ('Multi-utility', 0.05)]
+
+# Long-tailed like real crawls: a third unknown, then a few big cities, then states
+LOCATIONS = (
+    [('Unknown', 0.35)]
+    + [(city, 0.03) for city in ('Boulder, CO', 'San Francisco, CA', 'Minneapolis, MN', 'Portland, OR',
+                                 'Austin, TX', 'Sacramento, CA', 'Seattle, WA', 'Denver, CO',
+                                 'Chicago, IL', 'Boston, MA')]
+    + [(state, 0.35 / 25) for state in ('CA', 'TX', 'NY', 'FL', 'IL', 'CO', 'OR', 'WA', 'MN', 'AZ',
+                                        'NC', 'GA', 'MI', 'OH', 'PA', 'NJ', 'MA', 'VA', 'TN', 'MO',
+                                        'WI', 'IN', 'MD', 'SC', 'NM')]
+)
+
+UTILITIES = [('Municipal Utility Discussion', 0.55)] + [
+    (name, 0.45 / 12) for name in ('Xcel Energy', 'Pacific Gas & Electric', 'Duke Energy',
+                                   'Consolidated Edison', 'Sacramento Municipal Utility District',
+                                   'Austin Energy', 'Seattle City Light', 'ComEd', 'Dominion Energy',
+                                   'Entergy', 'Georgia Power', 'National Grid')
+]
+
+SOURCES = ['Boulder Weekly', 'Star Tribune', 'Texas Tribune', 'CalMatters', 'Seattle Times',
+           'California Public Utility Commission', 'Austin, TX City Council', 'utilitydive.com',
+           'Sacramento Bee', 'The Oregonian']
+
+def weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+def synthetic_rows(count, rng, now, entity_id):
+    """Yield mention rows in COPY column order; entity_id(kind, name) gives entity ids"""
+    for index in range(count):
+        location = weighted(rng, LOCATIONS)
+        utility = weighted(rng, UTILITIES)
+        stage = weighted(rng, STAGES)
+        title = f'{location} weighs {stage.lower()} step on {utility} municipalization #{index}'
+        snippet = f'Synthetic snippet {index} about public power in {location} and {utility}. ' * 2
+        source = rng.choice(SOURCES)
+        captured_at = now - timedelta(seconds=rng.randint(0, 365 * 86400))
+        # Most sources date their items, a few days before the crawl finds them
+        published_at = captured_at - timedelta(hours=rng.randint(0, 240)) if rng.random() < 0.8 else None
+        yield (
+            f'bench{index:09d}',
+            title,
+            f'https://bench.example.com/{index}',
+            snippet,
+            entity_id('source', source),
+            entity_id('location', location),
+            entity_id('utility', utility),
+            entity_id('utility_type', weighted(rng, UTILITY_TYPES)),
+            entity_id('stage', stage),
+            weighted(rng, PRIORITIES),
+            captured_at,
+            weighted(rng, STATUSES),
+            [],
+            score(f'{title} {snippet}', source, stage, captured_at),
+            published_at
+        )
+
+def schema_url(database_url, schema):
+    """Database URL whose sessions default to the benchmark schema"""
+    separator = '&' if '?' in database_url else '?'
+    return f"{database_url}{separator}options={quote(f'-csearch_path={schema}')}"
+
+def reset_schema(database_url, schema):
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        conn.execute(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+        conn.execute(f'CREATE SCHEMA {schema}')
+
+def seed(url, count, rng):
+    """Bulk load synthetic mentions with COPY and return their ids"""
+    now = datetime.now()
+    ids = []
+    with psycopg.connect(url) as conn:
+        with conn.cursor() as cur:
+            entity_ids = {}
+
+            def entity_id(kind, name):
+                if (kind, name) not in entity_ids:
+                    cur.execute('SELECT resolve_entity(%s, %s)', (kind, name))
+                    entity_ids[kind, name] = cur.fetchone()[0]
+                return entity_ids[kind, name]
+
+            # No queries can run during COPY, so every entity is resolved up front
+            for kind, choices in (('location', LOCATIONS), ('utility', UTILITIES),
+                                  ('utility_type', UTILITY_TYPES), ('stage', STAGES)):
+                for name, _ in choices:
+                    entity_id(kind, name)
+            for name in SOURCES:
+                entity_id('source', name)
+
+            with cur.copy("""
+                COPY mentions (id, title, url, snippet, source_id, location_id, utility_id,
+                               utility_type_id, stage_id, priority, captured_at, status, tags, score,
+                               published_at)
+                FROM STDIN
+            """) as copy:
+                for row in synthetic_rows(count, rng, now, entity_id):
+                    copy.write_row(row)
+                    ids.append(row[0])
+            # Crawls dedupe against mention_keys
+            cur.execute("""
+                INSERT INTO mention_keys (url_hash, mention_id)
+                SELECT sha256(convert_to(url, 'UTF8')), id FROM mentions
+            """)
+        conn.commit()
+        conn.execute('ANALYZE mentions')
+    return ids
+
+def make_scenarios(ids, rng):
+    """(name, weight, request factory) for each endpoint under test
+
+    weight scales the request count; full list scans are much heavier
+    than the other calls, so they get fewer requests.
+    """
+    locations = [location for location, _ in LOCATIONS]
+
+    def patch_status():
+        return 'PATCH', f'/api/mentions/{rng.choice(ids)}', {'status': rng.choice(['pending', 'approved'])}
+
+    return [
+        ('get_mentions_all', 0.05, lambda: ('GET', '/api/mentions', None)),
+        ('get_mentions_pending', 0.1, lambda: ('GET', '/api/mentions?status=pending', None)),
+        ('get_mentions_top_scored', 1.0,
+         lambda: ('GET', '/api/mentions?status=pending&sort=score&limit=50', None)),
+        ('get_mentions_recently_published', 1.0,
+         lambda: ('GET', '/api/mentions?status=pending&sort=published_at&limit=50', None)),
+        ('get_mentions_location', 0.5,
+         lambda: ('GET', f'/api/mentions?status=approved&location={quote(rng.choice(locations))}', None)),
+        ('get_stats', 1.0, lambda: ('GET', '/api/stats', None)),
+        ('update_mention', 1.0, patch_status),
+    ]
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    # Rank is ceil(fraction * n); rounding first keeps e.g. 0.07 * 100 from landing on 7.000000000000001
+    rank = math.ceil(round(fraction * len(sorted_values), 9))
+    index = max(0, min(len(sorted_values) - 1, rank - 1))
+    return sorted_values[index]
+
+def summarize(latencies, sizes, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+        'mean_response_bytes': round(statistics.fmean(sizes)) if sizes else None,
+    }
+
+def drive(base_url, factory, total, concurrency):
+    """Issue total requests from concurrency clients and summarize them"""
+    local = threading.local()
+    lock = threading.Lock()
+    latencies, sizes = [], []
+    errors = 0
+
+    def one(_):
+        nonlocal errors
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+
+        method, path, body = factory()
+        started = time.perf_counter()
+        response = session.request(method, base_url + path, json=body, timeout=600)
+        elapsed = time.perf_counter() - started
+
+        with lock:
+            if response.status_code >= 400:
+                errors += 1
+            latencies.append(elapsed)
+            sizes.append(len(response.content))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total)))
+    return summarize(latencies, sizes, errors, time.perf_counter() - started)
+
+def bench_persistence(app_module, rng, batches=20, batch_size=50):
+    """Time the crawl persistence path (insert_mentions) with fresh mentions"""
+    from crawler import process_search_result
+    from records import RawResult
+
+    latencies = []
+    with app_module.get_db_connection() as conn:
+        for batch in range(batches):
+            mentions = [
+                process_search_result(RawResult(
+                    title=f'Persistence benchmark {batch}-{index} municipal utility vote',
+                    url=f'https://bench.example.com/persist/{rng.random()}',
+                    snippet='City council debates public power and a franchise agreement.',
+                    source='Benchmark'
+                ))
+                for index in range(batch_size)
+            ]
+            started = time.perf_counter()
+            with conn.cursor() as cur:
+                app_module.insert_mentions(cur, mentions)
+            conn.commit()
+            latencies.append(time.perf_counter() - started)
+
+    result = summarize(latencies, [], 0, sum(latencies))
+    result['batches'] = result.pop('requests')
+    result['batches_per_second'] = result.pop('throughput_rps')
+    del result['mean_response_bytes']
+    result['batch_size'] = batch_size
+    result['mentions_per_second'] = round(batches * batch_size / sum(latencies), 1)
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', default=os.environ.get('BENCH_DATABASE_URL'),
+                        help='local PostgreSQL to seed (default: $BENCH_DATABASE_URL)')
+    parser.add_argument('--schema', default='bench')
+    parser.add_argument('--rows', default='10000,100000,1000000',
+                        help='comma-separated table sizes to benchmark')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400,
+                        help='requests per scenario at weight 1.0')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error('set --database-url or BENCH_DATABASE_URL')
+
+    url = schema_url(args.database_url.replace('postgres://', 'postgresql://', 1), args.schema)
+
+    # app reads DATABASE_URL at import time
+    os.environ['DATABASE_URL'] = url
+    reset_schema(args.database_url, args.schema)
+    import app as app_module
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'concurrency': args.concurrency,
+        'sizes': {}
+    }
+
+    try:
+        for count in [int(value) for value in args.rows.split(',') if value]:
+            rng = random.Random(SEED)
+            reset_schema(args.database_url, args.schema)
+            app_module.init_database()
+            with app_module.get_db_connection() as conn:
+                # Seeded rows span the last year; give each month its partition
+                app_module.ensure_partitions(conn.cursor(), datetime.now() - timedelta(days=366))
+
+            started = time.perf_counter()
+            ids = seed(url, count, rng)
+            size_results = {'seed_seconds': round(time.perf_counter() - started, 2), 'scenarios': {}}
+            print(f'Seeded {count} mentions in {size_results["seed_seconds"]}s', file=sys.stderr)
+
+            for name, weight, factory in make_scenarios(ids, rng):
+                total = max(args.concurrency, int(args.requests * weight))
+                size_results['scenarios'][name] = drive(base_url, factory, total, args.concurrency)
+                print(f'  {name}: {size_results["scenarios"][name]}', file=sys.stderr)
+
+            size_results['scenarios']['crawl_persistence'] = bench_persistence(app_module, rng)
+            results['sizes'][str(count)] = size_results
+    finally:
+        server.shutdown()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Microbenchmark for the per-mention classifiers
+
+Runs extract_location, extract_utility, determine_utility_type,
+determine_stage, determine_priority, classify_text and
+process_search_result over a fixed corpus (the generate_demo_data items
+plus a seeded synthetic set) and reports calls per second and allocations
+per call. Output digests must match the stored baseline, and throughput
+may not drop more than --tolerance below it.
+
+Usage:
+    python -m benchmarks.classify_bench
+    python -m benchmarks.classify_bench --update-baseline
+
+Exits non-zero on a digest mismatch or a throughput regression. Baseline
+throughput is machine-specific; refresh it with --update-baseline on the
+machine that runs the check.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+import crawler
+from records import RawResult
+
+SEED = 20240615
+SYNTHETIC_ITEMS = 2000
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'classify_baseline.json')
+
+PLACES = ['Boulder, CO', 'San Francisco', 'Minneapolis', 'Portland, OR', 'Austin, TX', 'Pueblo',
+          'Santa Fe, NM', 'Ann Arbor, MI', 'Decorah, Iowa', 'Chicago', 'South Portland, ME',
+          'the Town of Hempstead, NY', 'Sacramento County', 'Tucson', 'Nashville', 'Boston']
+
+UTILITIES = ['Xcel Energy', 'PG&E', 'Duke Energy', 'Portland General Electric', 'ComEd',
+             'Central Maine Power', 'DTE Energy', 'Alliant Energy', 'National Grid', 'SMUD',
+             'the local utility', 'Tucson Electric Power', 'Entergy']
+
+TITLES = [
+    '{place} council weighs municipal utility to replace {utility}',
+    '{place} voters to decide public power ballot measure',
+    'Court rules on {place} eminent domain case against {utility}',
+    '{place} approves feasibility study for city-owned electric utility',
+    '{place} residents push water system takeover from private operator',
+    '{place} explores community choice aggregation as {utility} rates climb',
+    '{utility} franchise agreement with {place} expires next year',
+    'Gas utility municipalization proposal stalls in {place}',
+    '{place} moving forward with plan for municipal broadband and electric service',
+    'Editorial: {place} should keep {utility} for now',
+]
+
+SNIPPETS = [
+    'Officials said the proposal would be on the November ballot if the council approves it.',
+    'A lawsuit filed by {utility} challenges the condemnation of distribution lines.',
+    'The study estimates residents could save 12% on electric and gas bills.',
+    'Advocates say the deadline for signatures is two weeks away.',
+    'Wastewater and sewer operations would move to the new public authority.',
+    'The city hired consultants to value the grid assets owned by {utility}.',
+    'Council members authorized staff to negotiate an exit from the franchise.',
+    'No decision is expected until next year, according to the mayor.',
+]
+
+SOURCES = ['Boulder Weekly', 'Star Tribune', 'Utility Dive', 'Texas Tribune', 'CalMatters',
+           'Colorado Public Utility Commission', 'Seattle Times', 'Bangor Daily News']
+
+FUNCTIONS = [
+    ('extract_location', crawler.extract_location),
+    ('extract_utility', crawler.extract_utility),
+    ('determine_utility_type', crawler.determine_utility_type),
+    ('determine_stage', crawler.determine_stage),
+    ('determine_priority', crawler.determine_priority),
+    ('classify_text', crawler.classify_text),
+]
+
+# Fields that vary per call and are left out of the output digest
+VOLATILE_FIELDS = ('capturedAt',)
+
+def synthetic_results(count, rng):
+    for index in range(count):
+        place = rng.choice(PLACES)
+        utility = rng.choice(UTILITIES)
+        sentences = rng.sample(SNIPPETS, rng.randint(1, 3))
+        yield RawResult(
+            title=rng.choice(TITLES).format(place=place, utility=utility),
+            url=f'https://news{rng.randint(1, 80)}.example.com/story/{index}',
+            snippet=' '.join(sentence.format(utility=utility) for sentence in sentences),
+            source=rng.choice(SOURCES)
+        )
+
+def build_corpus(synthetic_items=SYNTHETIC_ITEMS):
+    """Search results: the demo items followed by the seeded synthetic set"""
+    rng = random.Random(SEED)
+    return crawler.generate_demo_data() + list(synthetic_results(synthetic_items, rng))
+
+def digest(outputs):
+    payload = json.dumps(outputs, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def measure(name, function, inputs, repeat, number):
+    """Throughput, per-call allocations and output digest for one function"""
+    def run():
+        for value in inputs:
+            function(value)
+
+    # Best of repeat passes; the minimum is the least noisy estimate
+    best = min(timeit.repeat(run, repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        before_size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        snapshot_before = tracemalloc.take_snapshot()
+        outputs = [function(value) for value in inputs]
+        snapshot_after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    allocated = sum(stat.size_diff for stat in snapshot_after.filter_traces(filters).compare_to(
+        snapshot_before.filter_traces(filters), 'filename') if stat.size_diff > 0)
+
+    return {
+        'calls_per_second': round(len(inputs) / best, 1),
+        'microseconds_per_call': round(best / len(inputs) * 1e6, 3),
+        'retained_bytes_per_call': round(allocated / len(inputs), 1),
+        'peak_bytes': peak - before_size,
+        'digest': digest([stable_output(name, output) for output in outputs])
+    }
+
+def stable_output(name, output):
+    if name == 'process_search_result':
+        return {key: value for key, value in output.to_dict().items() if key not in VOLATILE_FIELDS}
+    return output
+
+def run_benchmarks(corpus, repeat, number):
+    texts = [f"{result.title} {result.snippet}" for result in corpus]
+    results = {}
+    for name, function in FUNCTIONS:
+        results[name] = measure(name, function, texts, repeat, number)
+    results['process_search_result'] = measure(
+        'process_search_result', crawler.process_search_result, corpus, repeat, number)
+    return results
+
+def compare(results, baseline, tolerance):
+    """Failure messages for changed outputs and throughput regressions"""
+    failures = []
+    for name, result in results.items():
+        expected = baseline.get('functions', {}).get(name)
+        if expected is None:
+            continue
+        if result['digest'] != expected['digest']:
+            failures.append(f"{name}: outputs changed (digest {result['digest'][:12]} != {expected['digest'][:12]})")
+        floor = expected['calls_per_second'] * (1 - tolerance)
+        if result['calls_per_second'] < floor:
+            failures.append(f"{name}: {result['calls_per_second']} calls/s is below "
+                            f"{round(floor, 1)} ({expected['calls_per_second']} baseline - {tolerance:.0%})")
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--synthetic-items', type=int, default=SYNTHETIC_ITEMS)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=1, help='corpus passes per timing')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed throughput drop as a fraction of the baseline')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.synthetic_items)
+    results = run_benchmarks(corpus, args.repeat, args.number)
+    report = {'corpus_size': len(corpus), 'functions': results}
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+            handle.write('\n')
+        print(json.dumps(report, indent=2))
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+    if baseline and baseline.get('corpus_size') != len(corpus):
+        parser.error(f"baseline was recorded with {baseline.get('corpus_size')} items; "
+                     f"rerun with the same --synthetic-items or --update-baseline")
+
+    failures = compare(results, baseline, args.tolerance)
+    report['failures'] = failures
+    print(json.dumps(report, indent=2))
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
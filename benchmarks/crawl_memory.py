@@ -0,0 +1,112 @@
+"""
+Memory benchmark for the mentions a crawl holds
+
+Feeds the classify_bench corpus, decoded from JSON one item at a time as
+a crawl decodes upstream responses, through process_search_result and
+keeps every mention, as run_crawl does. The same pass is repeated with
+the plain dicts the crawler used before records.Mention. Reports peak and
+retained bytes, live allocations per mention and time for both as JSON.
+
+Usage:
+    python -m benchmarks.crawl_memory --items 50000
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict
+from datetime import datetime
+
+import crawler
+from benchmarks.classify_bench import build_corpus
+from benchmarks.api_load import git_commit
+from records import RawResult
+
+def dict_mention(item):
+    """A mention as the crawler built it before records.Mention"""
+    result = {
+        'title': item['title'],
+        'url': item['url'],
+        'snippet': item['snippet'],
+        'source': item['source'],
+        'date': item.get('date', '')
+    }
+    return {
+        'id': crawler.mention_id(result['url']),
+        'title': result['title'],
+        'url': result['url'],
+        'snippet': result['snippet'],
+        'source': result['source'],
+        **crawler.classify_text(f"{result['title']} {result['snippet']}"),
+        'classifierVersion': crawler.CLASSIFIER_VERSION,
+        'capturedAt': datetime.now().isoformat(),
+        'status': 'pending',
+        'tags': []
+    }
+
+def record_mention(item):
+    return crawler.process_search_result(RawResult(**item))
+
+def crawl(lines, build):
+    """Decode and classify every line, keeping the mentions"""
+    return [build(json.loads(line)) for line in lines]
+
+def measure(lines, build):
+    started = time.perf_counter()
+    crawl(lines, build)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        mentions = crawl(lines, build)
+        retained, peak = tracemalloc.get_traced_memory()
+        blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    finally:
+        tracemalloc.stop()
+
+    count = len(mentions)
+    return {
+        'seconds': round(elapsed, 3),
+        'peak_bytes': peak - before,
+        'retained_bytes': retained - before,
+        'retained_bytes_per_mention': round((retained - before) / count, 1),
+        'live_blocks_per_mention': round(blocks / count, 2)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=20000, help='synthetic results in the corpus')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    lines = [json.dumps(asdict(result)) for result in build_corpus(args.items)]
+    # Warm the gazetteer and regex caches outside the measurements
+    crawl(lines[:100], record_mention)
+
+    dicts = measure(lines, dict_mention)
+    records = measure(lines, record_mention)
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'mentions': len(lines),
+        'dicts': dicts,
+        'records': records,
+        'retained_reduction': round(1 - records['retained_bytes'] / dicts['retained_bytes'], 3),
+        'peak_reduction': round(1 - records['peak_bytes'] / dicts['peak_bytes'], 3)
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+    else:
+        print(output)
+    print(f"Retained {report['retained_reduction']:.0%} less, peak {report['peak_reduction']:.0%} less "
+          f"than dict mentions", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+End-to-end crawl benchmark against the local upstream stand-in
+
+Starts benchmarks.fake_sources on a local port, points the crawler at it
+with CRAWLER_UPSTREAM_BASE and runs run_crawl, reporting crawl time,
+upstream requests per second and mentions per second as JSON. No quota
+is spent and no live site is contacted.
+
+Usage:
+    python -m benchmarks.crawl_replay --latency-ms 80 --throttle-rate 0.05 --runs 2
+    python -m benchmarks.crawl_replay --cassette crawl_cassette.json
+
+A cassette recorded with CRAWLER_HTTP_MODE=record is served ahead of the
+synthetic responses. Later runs reuse the crawler state from earlier ones,
+so --runs 2 also measures the warm (conditional GET, cursor) path.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from benchmarks.api_load import git_commit
+from benchmarks.fake_sources import add_config_arguments, config_from_args, create_app
+
+DEFAULT_QUERIES = ['municipal utility', 'public power', 'municipalization', 'utility franchise']
+
+def configure_environment(base_url, extra_feeds):
+    """Settings the crawler reads at import time"""
+    os.environ['CRAWLER_UPSTREAM_BASE'] = base_url
+    os.environ.pop('CRAWLER_HTTP_MODE', None)
+    # Placeholder credentials so the paid-API phases run against the stand-in
+    os.environ['GOOGLE_API_KEY'] = 'bench'
+    os.environ['GOOGLE_CSE_ID'] = 'bench'
+    os.environ['NEWS_API_KEY'] = 'bench'
+    feeds = [f'https://feeds{index}.example.net/rss' for index in range(extra_feeds)]
+    os.environ['RSS_FEEDS'] = ','.join(feeds)
+
+def per_source(crawler):
+    """Upstream requests, retries, sleep and unit time per crawl source"""
+    sources = {}
+
+    def entry(source):
+        return sources.setdefault(source, {'requests': 0, 'retries': 0, 'sleep_seconds': 0.0,
+                                           'unit_seconds': 0.0, 'mentions': 0})
+
+    for labels, value in crawler.HTTP_REQUESTS.values().items():
+        entry(dict(labels)['source'])['requests'] += value
+    for labels, value in crawler.HTTP_RETRIES.values().items():
+        entry(dict(labels)['source'])['retries'] += value
+    for labels, value in crawler.SLEEP_SECONDS.values().items():
+        entry(dict(labels)['source'])['sleep_seconds'] += round(value, 3)
+    for labels, (_, total) in crawler.UNIT_LATENCY.values().items():
+        entry(dict(labels)['source'])['unit_seconds'] += round(total, 3)
+    for labels, value in crawler.UNIT_MENTIONS.values().items():
+        entry(dict(labels)['source'])['mentions'] += value
+    return sources
+
+def subtract(after, before):
+    """Per-source counters accumulated between two snapshots"""
+    delta = {}
+    for source, values in after.items():
+        previous = before.get(source, {})
+        delta[source] = {name: round(value - previous.get(name, 0), 3) for name, value in values.items()}
+    return delta
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_config_arguments(parser)
+    parser.add_argument('--queries', default=','.join(DEFAULT_QUERIES),
+                        help='comma-separated crawl queries')
+    parser.add_argument('--max-results', type=int, default=30)
+    parser.add_argument('--extra-feeds', type=int, default=20,
+                        help='synthetic feeds added to RSS_FEEDS')
+    parser.add_argument('--request-delay', type=float, default=0.0,
+                        help='crawler REQUEST_DELAY (production uses 1s)')
+    parser.add_argument('--runs', type=int, default=1)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    from werkzeug.serving import make_server
+    import logging_setup
+    logging_setup.configure()
+    # The stand-in's per-request access log would drown out the crawler's
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    fake_app = create_app(config_from_args(args))
+    server = make_server('127.0.0.1', 0, fake_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    configure_environment(f'http://127.0.0.1:{server.server_port}', args.extra_feeds)
+
+    import crawler
+    crawler.REQUEST_DELAY = args.request_delay
+
+    stats = fake_app.config['STATS']
+    queries = [query.strip() for query in args.queries.split(',') if query.strip()]
+    state = {}
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'runs': []
+    }
+
+    try:
+        for run in range(args.runs):
+            requests_before = stats['requests']
+            sources_before = per_source(crawler)
+
+            started = time.perf_counter()
+            mentions = crawler.run_crawl(queries, args.max_results, state)
+            elapsed = time.perf_counter() - started
+
+            upstream = stats['requests'] - requests_before
+            result = {
+                'run': run + 1,
+                'elapsed_seconds': round(elapsed, 3),
+                'upstream_requests': upstream,
+                'requests_per_second': round(upstream / elapsed, 2) if elapsed else None,
+                'mentions': len(mentions),
+                'mentions_per_second': round(len(mentions) / elapsed, 2) if elapsed else None,
+                'sources': subtract(per_source(crawler), sources_before)
+            }
+            results['runs'].append(result)
+            print(f"Run {run + 1}: {result['elapsed_seconds']}s, {upstream} requests, "
+                  f"{len(mentions)} mentions", file=sys.stderr)
+    finally:
+        server.shutdown()
+
+    results['upstream'] = dict(stats)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+"""
+Local stand-in for every upstream the crawler talks to
+
+Serves synthetic (or recorded) Google CSE, NewsAPI, Legistar, PUC, feed
+and article responses with configurable latency, error and 429 rates.
+Point the crawler at it with CRAWLER_UPSTREAM_BASE, which rewrites
+https://host/path to <base>/host/path.
+
+Usage:
+    python -m benchmarks.fake_sources --port 8765 --latency-ms 80 --throttle-rate 0.05
+    CRAWLER_UPSTREAM_BASE=http://127.0.0.1:8765 python crawler.py
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from flask import Flask, Response, request
+
+from replay import Cassette, build_response, request_key
+
+CITIES = [('Boulder', 'CO'), ('Minneapolis', 'MN'), ('Portland', 'OR'), ('Austin', 'TX'),
+          ('San Diego', 'CA'), ('Denver', 'CO'), ('Sacramento', 'CA'), ('Seattle', 'WA'),
+          ('Charlotte', 'NC'), ('Chicago', 'IL'), ('Pueblo', 'CO'), ('Santa Fe', 'NM')]
+
+UTILITIES = ['Xcel Energy', 'PG&E', 'Duke Energy', 'Portland General Electric', 'ComEd',
+             'San Diego Gas & Electric', 'Public Service Company of New Mexico', 'Black Hills Energy']
+
+HEADLINES = [
+    '{city} Council Votes to Study Municipal Utility Ending {utility} Franchise',
+    '{city} Voters to Decide Public Power Ballot Measure',
+    'Court Hears {city} Eminent Domain Case Against {utility}',
+    '{city} Explores Community Choice Energy as {utility} Rates Rise',
+    '{city} Feasibility Study Says Municipal Utility Could Cut Bills',
+    'Residents Push {city} Toward Public Power Takeover',
+]
+
+FILLER_HEADLINES = ['Road Resurfacing Schedule Announced', 'Library Hours Extended for Summer',
+                    'Parks Department Hiring Seasonal Staff', 'Water Main Flushing Next Week']
+
+NEWS_PATHS = {'news', 'press-releases', 'newsroom', 'media'}
+
+class Config:
+    """Stand-in behavior; every rate is a probability per request"""
+
+    def __init__(self, latency_ms=50, jitter_ms=20, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=1, google_pages=3, seed=1, cassette=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.google_pages = google_pages
+        self.seed = seed
+        self.cassette = Cassette(cassette, 'replay') if cassette else None
+
+def item_rng(config, *parts):
+    """Deterministic RNG for one synthetic resource"""
+    digest = hashlib.sha256(f"{config.seed}:{':'.join(map(str, parts))}".encode('utf-8')).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+def synthetic_story(rng, relevant=True):
+    city, state = rng.choice(CITIES)
+    utility = rng.choice(UTILITIES)
+    if not relevant:
+        return {'title': rng.choice(FILLER_HEADLINES), 'snippet': 'Routine city announcement.',
+                'city': city, 'state': state}
+
+    title = rng.choice(HEADLINES).format(city=city, utility=utility)
+    snippet = (f"Officials in {city}, {state} discussed municipalization of the electric system "
+               f"now served by {utility}. A vote on the proposal is expected this fall.")
+    return {'title': title, 'snippet': snippet, 'city': city, 'state': state}
+
+def slug(text):
+    return '-'.join(''.join(c if c.isalnum() else ' ' for c in text.lower()).split())
+
+def google_response(config, args):
+    query = args.get('q', '')
+    start = int(args.get('start', 1))
+    num = int(args.get('num', 10))
+    page = (start - 1) // 10
+
+    items = []
+    if page < config.google_pages:
+        for index in range(num):
+            rng = item_rng(config, 'google', query, start + index)
+            story = synthetic_story(rng)
+            host = f"news{rng.randint(1, 40)}.example.com"
+            items.append({
+                'title': story['title'],
+                'link': f"https://{host}/{slug(story['title'])}-{rng.randint(1000, 9999)}",
+                'snippet': story['snippet'],
+                'pagemap': {'metatags': [{'article:published_time': (
+                    datetime.utcnow() - timedelta(days=rng.randint(0, 60))).isoformat() + 'Z'}]}
+            })
+    return Response(json.dumps({'items': items}), mimetype='application/json')
+
+def newsapi_response(config, args):
+    query = args.get('q', '')
+    articles = []
+    for index in range(min(int(args.get('pageSize', 10)), 100)):
+        rng = item_rng(config, 'newsapi', query, index)
+        story = synthetic_story(rng)
+        articles.append({
+            'title': story['title'],
+            'url': f"https://wire{rng.randint(1, 20)}.example.org/{slug(story['title'])}-{rng.randint(1000, 9999)}",
+            'description': story['snippet'],
+            'source': {'name': f"Wire {rng.randint(1, 20)}"},
+            'publishedAt': (datetime.utcnow() - timedelta(days=rng.randint(0, 30))).isoformat() + 'Z'
+        })
+    return Response(json.dumps({'status': 'ok', 'articles': articles}), mimetype='application/json')
+
+def legistar_response(config, host, path):
+    parts = path.split('/')
+    if parts[-1] == 'Events':
+        rng = item_rng(config, 'legistar', host)
+        events = [{'EventId': rng.randint(10000, 99999),
+                   'EventDate': (datetime.utcnow() - timedelta(days=rng.randint(0, 90))).isoformat()}
+                  for _ in range(rng.randint(3, 8))]
+        return Response(json.dumps(events), mimetype='application/json')
+
+    event_id = parts[-2]
+    items = []
+    for index in range(6):
+        rng = item_rng(config, 'legistar', host, event_id, index)
+        story = synthetic_story(rng, relevant=rng.random() < 0.3)
+        items.append({'EventItemTitle': story['title'], 'EventItemMatterName': story['snippet'],
+                      'EventItemMatterFile': f"{event_id}-{index}"})
+    return Response(json.dumps(items), mimetype='application/json')
+
+def news_page_response(config, host, path):
+    rng = item_rng(config, 'puc', host, path)
+    links = []
+    for index in range(40):
+        story = synthetic_story(rng, relevant=index % 8 == 0)
+        links.append(f'<li><a href="/news/{slug(story["title"])}-{index}">{escape(story["title"])}</a></li>')
+    filler = '<p>' + 'Commission news and announcements. ' * 40 + '</p>'
+    html = f"<html><head><title>{host} News</title></head><body>{filler * 20}<ul>{''.join(links)}</ul></body></html>"
+    return Response(html, mimetype='text/html')
+
+def sitemap_response(config, host):
+    rng = item_rng(config, 'sitemap', host)
+    urls = []
+    for index in range(200):
+        story = synthetic_story(rng, relevant=index % 10 == 0)
+        lastmod = (datetime.utcnow() - timedelta(days=rng.randint(0, 120))).strftime('%Y-%m-%d')
+        urls.append(f"<url><loc>https://{host}/news/{slug(story['title'])}-{index}</loc><lastmod>{lastmod}</lastmod></url>")
+    xml = ('<?xml version="1.0" encoding="UTF-8"?>'
+           '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">' + ''.join(urls) + '</urlset>')
+    return Response(xml, mimetype='application/xml')
+
+def feed_response(config, host, path, headers):
+    rng = item_rng(config, 'feed', host, path)
+    items = []
+    # Feeds change once a day, so warm runs see 304s like a real conditional GET
+    now = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    for index in range(30):
+        story = synthetic_story(rng, relevant=rng.random() < 0.4)
+        link = f"https://{host}/story/{slug(story['title'])}-{index}"
+        published = format_datetime(now - timedelta(hours=index * 6), usegmt=True)
+        items.append(f"<item><title>{escape(story['title'])}</title><link>{link}</link><guid>{link}</guid>"
+                     f"<pubDate>{published}</pubDate><description>{escape(story['snippet'])}</description></item>")
+    xml = (f'<?xml version="1.0"?><rss version="2.0"><channel><title>{host}</title>'
+           + ''.join(items) + '</channel></rss>')
+    etag = f'"{hashlib.md5(xml.encode()).hexdigest()}"'
+    if headers.get('If-None-Match') == etag:
+        return Response(status=304, headers={'ETag': etag})
+    return Response(xml, mimetype='application/rss+xml', headers={'ETag': etag})
+
+def article_response(config, host, path):
+    rng = item_rng(config, 'article', host, path)
+    story = synthetic_story(rng)
+    paragraphs = ''.join(
+        f"<p>{escape(story['snippet'])} Paragraph {index} covers rates, reliability and the "
+        f"timeline for a decision in {story['city']}, {story['state']}.</p>"
+        for index in range(12))
+    title = escape(story['title'])
+    html = (f"<html><head><title>{title}</title></head><body><nav>Home | News</nav>"
+            f"<article><h1>{title}</h1>{paragraphs}</article></body></html>")
+    return Response(html, mimetype='text/html')
+
+def synthetic_response(config, host, path, args, headers):
+    if host == 'www.googleapis.com':
+        return google_response(config, args)
+    if host == 'newsapi.org':
+        return newsapi_response(config, args)
+    if path.endswith('/Events') or path.endswith('/EventItems'):
+        return legistar_response(config, host, path)
+    if path == 'robots.txt':
+        return Response(f"User-agent: *\nSitemap: https://{host}/sitemap.xml\n", mimetype='text/plain')
+    if path == 'sitemap.xml':
+        return sitemap_response(config, host)
+    if path in NEWS_PATHS:
+        return news_page_response(config, host, path)
+    if 'feed' in path or 'rss' in path:
+        return feed_response(config, host, path, headers)
+    return article_response(config, host, path)
+
+def create_app(config=None):
+    """Build the stand-in app; app.config['STATS'] counts requests served"""
+    config = config or Config()
+    app = Flask(__name__)
+    chaos = random.Random(config.seed)
+    lock = threading.Lock()
+    stats = {'requests': 0, 'errors': 0, 'throttled': 0}
+    app.config['STATS'] = stats
+
+    @app.route('/<host>/', defaults={'path': ''})
+    @app.route('/<host>/<path:path>')
+    def upstream(host, path):
+        with lock:
+            stats['requests'] += 1
+            roll = chaos.random()
+            delay = max(0.0, chaos.gauss(config.latency_ms, config.jitter_ms)) / 1000
+
+        time.sleep(delay)
+
+        if roll < config.throttle_rate:
+            with lock:
+                stats['throttled'] += 1
+            return Response('rate limited', status=429, headers={'Retry-After': str(config.retry_after)})
+        if roll < config.throttle_rate + config.error_rate:
+            with lock:
+                stats['errors'] += 1
+            return Response('upstream error', status=500)
+
+        if config.cassette is not None:
+            entry = config.cassette.next_entry(request_key(f"https://{host}/{path}", dict(request.args)))
+            if entry is not None:
+                recorded = build_response(request.url, entry)
+                return Response(recorded.content, status=recorded.status_code,
+                                headers=dict(recorded.headers))
+
+        return synthetic_response(config, host, path, request.args, request.headers)
+
+    return app
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve stand-in crawler upstreams')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from werkzeug.serving import run_simple
+    run_simple(args.host, args.port, create_app(config_from_args(args)), threaded=True)
+
+def add_config_arguments(parser):
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--google-pages', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--cassette', help='serve recorded responses from this cassette first')
+
+def config_from_args(args):
+    return Config(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        google_pages=args.google_pages,
+        seed=args.seed,
+        cassette=args.cassette
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+#!/usr/bin/env bash
+# Build command for the web service: install requirements and build the
+# place-name index that extract_location uses. The deploy fails if the
+# index is missing or incomplete rather than running on the seed.
+set -euo pipefail
+
+pip install -r requirements.txt
+python gazetteer.py build --download
+python gazetteer.py check
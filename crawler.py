@@ -4,18 +4,33 @@ Uses Google Custom Search API, NewsAPI, and custom .gov scrapers
 """
 
 import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+import atexit
+import contextvars
+import feedparser
+import hashlib
+import threading
 import time
 import re
 import os
-from urllib.parse import urlparse, urljoin
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlsplit, urlunsplit
 import json
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+import logging_setup
+import metrics
+import replay
+from gazetteer import get_gazetteer
+from records import Mention, RawResult
+from scoring import score_mentions
+
 logger = logging.getLogger(__name__)
+# Logged once per request, page or site: rate limited per call site
+request_logger = logging_setup.rate_limited(f'{__name__}.requests')
 
 # Configuration
 GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY', '')
@@ -25,58 +40,272 @@ NEWS_API_KEY = os.environ.get('NEWS_API_KEY', '')
 # Rate limiting
 REQUEST_DELAY = 1  # seconds between requests
 
+# Send every crawler request to a stand-in server (see benchmarks/fake_sources.py)
+UPSTREAM_BASE = os.environ.get('CRAWLER_UPSTREAM_BASE', '').rstrip('/')
+
+# Retries for throttled or unavailable upstreams
+HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 2))
+HTTP_MAX_RETRY_DELAY = 10  # seconds
+RETRY_STATUSES = (429, 503)
+
+# Page fetching limits
+MAX_PAGE_BYTES = int(os.environ.get('CRAWLER_MAX_PAGE_BYTES', 2 * 1024 * 1024))
+PAGE_CHUNK_SIZE = 64 * 1024
+PUC_MAX_WORKERS = int(os.environ.get('PUC_MAX_WORKERS', 6))
+
+# Article enrichment limits
+ARTICLE_MAX_BYTES = int(os.environ.get('ARTICLE_MAX_BYTES', 1024 * 1024))
+ARTICLE_TIMEOUT = int(os.environ.get('ARTICLE_TIMEOUT', 8))
+ARTICLE_MAX_TEXT_CHARS = 20000
+ARTICLE_MIN_PARAGRAPH_CHARS = 40
+ENRICH_MAX_WORKERS = int(os.environ.get('ENRICH_MAX_WORKERS', 4))
+
+# Results published more than this many days ago are dropped before classification;
+# the searches that take a date range ask for no more than this window
+CRAWL_FRESHNESS_DAYS = int(os.environ.get('CRAWL_FRESHNESS_DAYS', 180))
+
+# Per-source unit cost and yield, smoothed across crawls, order the crawl under a deadline
+CRAWL_COST_STATE_KEY = 'unit_costs'
+CRAWL_COST_SMOOTHING = 0.3
+
+# Classifier fallbacks, replaced when the full article has something better
+UNKNOWN_LOCATION = 'Unknown'
+GENERIC_UTILITY = 'Municipal Utility Discussion'
+
+# Bump whenever a classifier, its keyword lists or a scoring weight change;
+# rows stored under an older version are reclassified by backfill.py
+CLASSIFIER_VERSION = 4
+
+# Query parameters that only track the click; dropped from canonical URLs
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|cmpid|ocid)$', re.IGNORECASE)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Utility companies by canonical name, with the other names they go by. Every
+# alias classifies as the canonical name; app.py also registers them as
+# entity_aliases so stored names resolve to one utility
+UTILITY_ALIASES = {
+    'Pacific Gas & Electric': ['PG&E'],
+    'Southern California Edison': ['SCE'],
+    'San Diego Gas & Electric': ['SDG&E'],
+    'Duke Energy': [],
+    'ComEd': ['Commonwealth Edison'],
+    'Xcel Energy': [],
+    'Consolidated Edison': ['Con Edison'],
+    'Dominion Energy': [],
+    'FirstEnergy': [],
+    'Entergy': [],
+    'American Electric Power': ['AEP'],
+    'Exelon': [],
+    'NextEra': [],
+    'Florida Power & Light': ['FPL'],
+    'Georgia Power': [],
+    'Alabama Power': [],
+    'PSE&G': ['Public Service Electric and Gas'],
+    'National Grid': [],
+    'Eversource': [],
+    'Avista': [],
+    'Puget Sound Energy': ['PSE'],
+    'Portland General Electric': ['PGE'],
+    'CenterPoint': [],
+    'Ameren': [],
+    'WE Energies': [],
+    'Consumers Energy': [],
+    'DTE Energy': [],
+    'Oncor': [],
+    'CPS Energy': [],
+    'Austin Energy': [],
+    'Seattle City Light': [],
+    'LADWP': ['Los Angeles Department of Water and Power'],
+    'Sacramento Municipal Utility District': ['SMUD'],
+    'Salt River Project': ['SRP'],
+    'Tennessee Valley Authority': ['TVA'],
+}
+
+# (lower-cased name, canonical name) in match order: a utility's own names
+# before the next utility's, longer names first within each
+UTILITY_NAMES = [(name.lower(), canonical)
+                 for canonical, aliases in UTILITY_ALIASES.items()
+                 for name in sorted([canonical] + aliases, key=len, reverse=True)]
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Major state PUC websites
+PUC_SITES = {
+    'California': 'https://www.cpuc.ca.gov',
+    'Texas': 'https://www.puc.texas.gov',
+    'New York': 'https://www.dps.ny.gov',
+    'Florida': 'https://www.psc.state.fl.us',
+    'Illinois': 'https://www.icc.illinois.gov',
+    'Colorado': 'https://puc.colorado.gov',
+}
+
+PUC_NEWS_PATHS = ['/news', '/press-releases', '/newsroom', '/media']
+
+# Link text keywords that flag municipalization items on PUC pages
+PUC_KEYWORDS = ['municipal', 'franchise', 'public power', 'takeover']
+
+# The same keywords as they appear in URL slugs
+PUC_URL_KEYWORDS = sorted({variant for keyword in PUC_KEYWORDS
+                           for variant in (keyword.replace(' ', '-'), keyword.replace(' ', '_'))})
+
+# Sitemap discovery for PUC sites
+PUC_USE_SITEMAPS = os.environ.get('PUC_USE_SITEMAPS', 'True').lower() == 'true'
+PUC_DISCOVERY_REFRESH_DAYS = 7  # re-read robots.txt / re-probe news paths this often
+PUC_SITEMAP_LOOKBACK_DAYS = 30  # window used on a site's first crawl
+PUC_MAX_SITEMAPS = 5
+PUC_MAX_SITEMAP_PAGES = 10
+ROBOTS_MAX_BYTES = 64 * 1024
+TITLE_MAX_BYTES = 64 * 1024
+
+# RSS/Atom feeds to monitor; RSS_FEEDS adds more as a comma-separated list
+RSS_FEEDS = [
+    'https://www.utilitydive.com/feeds/news/',
+] + [url.strip() for url in os.environ.get('RSS_FEEDS', '').split(',') if url.strip()]
+
+FEED_MAX_WORKERS = int(os.environ.get('FEED_MAX_WORKERS', 16))
+FEED_PER_HOST_LIMIT = int(os.environ.get('FEED_PER_HOST_LIMIT', 2))
+FEED_MAX_BYTES = 2 * 1024 * 1024
+FEED_MAX_TRACKED_GUIDS = 200
+
+# Feed items must mention one of these to be treated as a result
+FEED_KEYWORDS = ['municipal', 'municipalization', 'public power', 'community choice',
+                 'franchise', 'eminent domain', 'takeover', 'public utility district']
+
+# Crawler instrumentation, exposed at /api/metrics
+HTTP_REQUESTS = metrics.counter(
+    'crawler_http_requests_total', 'Crawler HTTP requests by source, host and status code',
+    ('source', 'host', 'status'))
+HTTP_LATENCY = metrics.histogram(
+    'crawler_http_request_seconds', 'Crawler HTTP latency until response headers arrive',
+    ('source', 'host'))
+HTTP_BYTES = metrics.counter(
+    'crawler_http_response_bytes_total', 'Response body bytes read by the crawler',
+    ('source', 'host'))
+HTTP_RETRIES = metrics.counter(
+    'crawler_http_retries_total', 'Crawler HTTP requests retried after 429/503',
+    ('source', 'host'))
+SLEEP_SECONDS = metrics.counter(
+    'crawler_sleep_seconds_total', 'Time the crawler spent in rate-limit and retry sleeps',
+    ('source',))
+UNIT_LATENCY = metrics.histogram(
+    'crawler_unit_seconds', 'Wall-clock time per crawl unit',
+    ('source',))
+UNIT_MENTIONS = metrics.counter(
+    'crawler_unit_mentions_total', 'New mentions produced by crawl units',
+    ('source',))
+STALE_RESULTS = metrics.counter(
+    'crawler_stale_results_total', 'Results dropped as published before the freshness window',
+    ('source',))
+
+# time.monotonic() by which the running crawl must stop; worker threads get it via copy_context
+CRAWL_DEADLINE = contextvars.ContextVar('crawl_deadline', default=None)
+
+class CrawlDeadlineExceeded(requests.exceptions.Timeout):
+    """The crawl's time budget is spent; raised instead of starting a request"""
+
+def remaining_budget():
+    """Seconds left before the crawl deadline, or None without one"""
+    deadline = CRAWL_DEADLINE.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def budget_timeout(timeout):
+    """A requests timeout capped at the remaining crawl budget"""
+    remaining = remaining_budget()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise CrawlDeadlineExceeded('Crawl deadline reached')
+    if timeout is None:
+        return remaining
+    if isinstance(timeout, tuple):
+        return tuple(min(part, remaining) if part is not None else remaining for part in timeout)
+    return min(timeout, remaining)
+
+def submit_with_context(executor, fn, *args):
+    """executor.submit, running fn with the caller's context (and so its crawl deadline)"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+def crawl_sleep(seconds, source):
+    """time.sleep that records where the crawler spends its waiting time"""
+    remaining = remaining_budget()
+    if remaining is not None:
+        seconds = max(0, min(seconds, remaining))
+    SLEEP_SECONDS.inc(seconds, source=source)
+    time.sleep(seconds)
+
+def retry_delay(response, attempt):
+    """Seconds to wait before retrying, honoring a numeric Retry-After"""
+    retry_after = response.headers.get('Retry-After', '')
+    if retry_after.isdigit():
+        return min(int(retry_after), HTTP_MAX_RETRY_DELAY)
+    return min(2 ** attempt, HTTP_MAX_RETRY_DELAY)
+
+def upstream_url(url):
+    """Rewrite https://host/path to UPSTREAM_BASE/host/path when a stand-in is configured"""
+    if not UPSTREAM_BASE:
+        return url
+    
+    parsed = urlparse(url)
+    routed = f"{UPSTREAM_BASE}/{parsed.netloc}{parsed.path or '/'}"
+    return f"{routed}?{parsed.query}" if parsed.query else routed
+
+def routed_get(url, **kwargs):
+    return requests.get(upstream_url(url), **kwargs)
+
+# CRAWLER_HTTP_MODE=record|replay stores or serves responses from CRAWLER_CASSETTE
+HTTP_TRANSPORT, HTTP_CASSETTE = replay.transport_from_env(routed_get)
+if HTTP_CASSETTE is not None and HTTP_CASSETTE.mode == 'record':
+    atexit.register(HTTP_CASSETTE.save)
+
+def http_get(url, source, **kwargs):
+    """requests.get with per-source/host metrics and a bounded retry on 429/503
+    
+    Under a crawl deadline each attempt's timeout is capped at the budget
+    left, and no attempt starts once it is spent.
+    """
+    host = urlparse(url).netloc
+    timeout = kwargs.pop('timeout', None)
+    
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        attempt_timeout = budget_timeout(timeout)
+        started = time.perf_counter()
+        try:
+            response = HTTP_TRANSPORT(url, timeout=attempt_timeout, **kwargs)
+        except requests.exceptions.RequestException as e:
+            HTTP_REQUESTS.inc(source=source, host=host, status=type(e).__name__)
+            raise
+        finally:
+            HTTP_LATENCY.observe(time.perf_counter() - started, source=source, host=host)
+        
+        HTTP_REQUESTS.inc(source=source, host=host, status=response.status_code)
+        
+        # Streamed bodies are counted by the caller as they are read
+        if not kwargs.get('stream'):
+            HTTP_BYTES.inc(len(response.content), source=source, host=host)
+        
+        if response.status_code not in RETRY_STATUSES or attempt == HTTP_MAX_RETRIES:
+            return response
+        
+        delay = retry_delay(response, attempt)
+        response.close()
+        HTTP_RETRIES.inc(source=source, host=host)
+        crawl_sleep(delay, source)
+
 def extract_location(text):
-    """Extract location (city, state) from text"""
-    # Common US states and cities patterns
-    state_abbr = ['AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA', 
-                  'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD',
-                  'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ',
-                  'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC',
-                  'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY']
-    
-    cities = ['San Francisco', 'Los Angeles', 'San Diego', 'New York', 'Chicago',
-              'Houston', 'Phoenix', 'Philadelphia', 'San Antonio', 'Dallas',
-              'Austin', 'Jacksonville', 'Seattle', 'Denver', 'Portland',
-              'Boston', 'Detroit', 'Nashville', 'Minneapolis', 'Boulder',
-              'Sacramento', 'Atlanta', 'Miami', 'Cleveland', 'Pittsburgh']
-    
-    # Try to find city, state pattern
-    for city in cities:
-        if city.lower() in text.lower():
-            for state in state_abbr:
-                if f'{city}, {state}' in text or f'{city.lower()}, {state.lower()}' in text.lower():
-                    return f'{city}, {state}'
-            return city
-    
-    # Try to find state
-    for state in state_abbr:
-        if re.search(rf'\b{state}\b', text):
-            return state
-    
-    return 'Unknown'
+    """Extract location ("City, ST", city, county or state) from text"""
+    return get_gazetteer().locate(text) or UNKNOWN_LOCATION
 
 def extract_utility(text):
-    """Extract utility company name from text"""
-    utilities = [
-        'Pacific Gas & Electric', 'PG&E', 'Southern California Edison', 'SCE',
-        'San Diego Gas & Electric', 'SDG&E', 'Duke Energy', 'ComEd',
-        'Xcel Energy', 'Consolidated Edison', 'Con Edison', 'Dominion Energy',
-        'FirstEnergy', 'Entergy', 'AEP', 'American Electric Power',
-        'Exelon', 'NextEra', 'Florida Power & Light', 'FPL',
-        'Georgia Power', 'Alabama Power', 'PSE&G', 'National Grid',
-        'Eversource', 'Avista', 'Puget Sound Energy', 'PSE',
-        'Portland General Electric', 'PGE', 'CenterPoint', 'Ameren',
-        'WE Energies', 'Consumers Energy', 'DTE Energy', 'Oncor',
-        'CPS Energy', 'Austin Energy', 'Seattle City Light', 'LADWP',
-        'Sacramento Municipal Utility District', 'SMUD', 'Salt River Project',
-        'SRP', 'TVA', 'Tennessee Valley Authority'
-    ]
+    """Extract the canonical name of the utility company named in text"""
+    text_lower = text.lower()
     
-    for utility in utilities:
-        if utility.lower() in text.lower():
-            return utility
+    for name, canonical in UTILITY_NAMES:
+        if name in text_lower:
+            return canonical
     
-    return 'Municipal Utility Discussion'
+    return GENERIC_UTILITY
 
 def determine_utility_type(text):
     """Determine utility type from text"""
@@ -114,8 +343,28 @@ def determine_priority(text):
         return 'high'
     return 'normal'
 
-def search_google(query, num_results=10):
-    """Search Google Custom Search API with pagination support"""
+def classify_text(text):
+    """Run all classifiers over text, keyed like mention fields"""
+    return {
+        'location': extract_location(text),
+        'utility': extract_utility(text),
+        'utilityType': determine_utility_type(text),
+        'stage': determine_stage(text),
+        'priority': determine_priority(text)
+    }
+
+def google_pages_needed(num_results):
+    """Google CSE API returns max 10 results per request"""
+    return (num_results + 9) // 10  # ceiling division
+
+def search_google_page(query, page, num_results=10, raise_errors=False):
+    """Fetch one page of Google Custom Search results
+    
+    page is zero-based; num_results is the total wanted across all pages.
+    With raise_errors, a failed request (including a bad response body)
+    raises instead of returning [], so a crawl can tell it from a short
+    last page.
+    """
     if not GOOGLE_API_KEY or not GOOGLE_CSE_ID:
         logger.warning("Google API credentials not configured")
         return []
@@ -123,57 +372,47 @@ def search_google(query, num_results=10):
     results = []
     
     try:
-        # Google CSE API returns max 10 results per request
-        # For more results, we need to paginate
-        pages_needed = (num_results + 9) // 10  # ceiling division
+        url = "https://www.googleapis.com/customsearch/v1"
+        params = {
+            'key': GOOGLE_API_KEY,
+            'cx': GOOGLE_CSE_ID,
+            'q': query,
+            'num': min(10, num_results - page * 10),
+            'start': page * 10 + 1,
+            'dateRestrict': f'd{CRAWL_FRESHNESS_DAYS}'
+        }
         
-        for page in range(pages_needed):
-            start_index = page * 10 + 1
-            
-            url = "https://www.googleapis.com/customsearch/v1"
-            params = {
-                'key': GOOGLE_API_KEY,
-                'cx': GOOGLE_CSE_ID,
-                'q': query,
-                'num': min(10, num_results - len(results)),
-                'start': start_index,
-                'dateRestrict': 'm6'  # Last 6 months for relevance
-            }
-            
-            logger.info(f"Google search: {query} (page {page + 1})")
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            for item in data.get('items', []):
-                results.append({
-                    'title': item.get('title', ''),
-                    'url': item.get('link', ''),
-                    'snippet': item.get('snippet', ''),
-                    'source': urlparse(item.get('link', '')).netloc,
-                    'date': item.get('pagemap', {}).get('metatags', [{}])[0].get('article:published_time', '')
-                })
-            
-            # Check if we have enough results
-            if len(results) >= num_results:
-                break
-            
-            # Rate limiting
-            time.sleep(REQUEST_DELAY)
+        request_logger.info(f"Google search: {query} (page {page + 1})")
+        response = http_get(url, 'google', params=params, timeout=10)
+        response.raise_for_status()
+        
+        data = response.json()
         
-        logger.info(f"Google search found {len(results)} results for: {query}")
-        return results[:num_results]
+        for item in data.get('items', []):
+            results.append(RawResult(
+                title=item.get('title', ''),
+                url=item.get('link', ''),
+                snippet=item.get('snippet', ''),
+                source=urlparse(item.get('link', '')).netloc,
+                date=item.get('pagemap', {}).get('metatags', [{}])[0].get('article:published_time', '')
+            ))
+        
+        return results
         
     except requests.exceptions.RequestException as e:
         logger.error(f"Google search request error: {e}")
+        if raise_errors:
+            raise
         return []
     except Exception as e:
         logger.error(f"Google search error: {e}")
         return []
 
-def search_newsapi(query, num_results=10):
-    """Search NewsAPI.org for recent news articles"""
+def search_newsapi(query, num_results=10, raise_errors=False):
+    """Search NewsAPI.org for recent news articles
+    
+    With raise_errors, a failed request raises instead of returning [].
+    """
     if not NEWS_API_KEY:
         logger.warning("NewsAPI key not configured")
         return []
@@ -181,9 +420,9 @@ def search_newsapi(query, num_results=10):
     try:
         url = "https://newsapi.org/v2/everything"
         
-        # Calculate date range (last 30 days)
+        # NewsAPI searches at most the last 30 days
         to_date = datetime.now()
-        from_date = to_date - timedelta(days=30)
+        from_date = to_date - timedelta(days=min(30, CRAWL_FRESHNESS_DAYS))
         
         params = {
             'apiKey': NEWS_API_KEY,
@@ -195,8 +434,8 @@ def search_newsapi(query, num_results=10):
             'to': to_date.strftime('%Y-%m-%d')
         }
         
-        logger.info(f"NewsAPI search: {query}")
-        response = requests.get(url, params=params, timeout=10)
+        request_logger.info(f"NewsAPI search: {query}")
+        response = http_get(url, 'newsapi', params=params, timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -207,19 +446,21 @@ def search_newsapi(query, num_results=10):
             if article.get('title') == '[Removed]':
                 continue
                 
-            results.append({
-                'title': article.get('title', ''),
-                'url': article.get('url', ''),
-                'snippet': article.get('description', ''),
-                'source': article.get('source', {}).get('name', urlparse(article.get('url', '')).netloc),
-                'date': article.get('publishedAt', '')
-            })
+            results.append(RawResult(
+                title=article.get('title', ''),
+                url=article.get('url', ''),
+                snippet=article.get('description', ''),
+                source=article.get('source', {}).get('name', urlparse(article.get('url', '')).netloc),
+                date=article.get('publishedAt', '')
+            ))
         
         logger.info(f"NewsAPI found {len(results)} results for: {query}")
         return results
         
     except requests.exceptions.RequestException as e:
         logger.error(f"NewsAPI request error: {e}")
+        if raise_errors:
+            raise
         return []
     except Exception as e:
         logger.error(f"NewsAPI error: {e}")
@@ -240,12 +481,12 @@ def scrape_ferc_filings():
             try:
                 # Note: FERC has a search API but requires specific access
                 # This is a simplified example - you'd need to implement proper API access
-                logger.info(f"Searching FERC for: {term}")
+                request_logger.info(f"Searching FERC for: {term}")
                 
                 # Placeholder - implement actual FERC API integration
                 # See: https://www.ferc.gov/docs-filing/elibrary-api.asp
                 
-                time.sleep(REQUEST_DELAY)
+                crawl_sleep(REQUEST_DELAY, 'ferc')
                 
             except Exception as e:
                 logger.error(f"FERC search error for {term}: {e}")
@@ -256,66 +497,382 @@ def scrape_ferc_filings():
     
     return results
 
-def scrape_state_puc_sites():
-    """Scrape state Public Utility Commission websites"""
+def fetch_response(url, max_bytes=None, timeout=10, headers=None, source='pages'):
+    """Fetch a URL, streaming the body and stopping once max_bytes is read
+
+    Returns (status_code, response_headers, body). The body is None for
+    non-200 responses.
+    """
+    max_bytes = max_bytes or MAX_PAGE_BYTES
+    
+    with http_get(url, source, timeout=timeout, headers=headers or BROWSER_HEADERS, stream=True) as response:
+        if response.status_code != 200:
+            return response.status_code, response.headers, None
+        
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=PAGE_CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                request_logger.debug(f"Truncated {url} at {max_bytes} bytes")
+                break
+        
+        HTTP_BYTES.inc(size, source=source, host=urlparse(url).netloc)
+        return response.status_code, response.headers, b''.join(chunks)[:max_bytes]
+
+def fetch_page(url, max_bytes=None, timeout=10, headers=None, source='pages'):
+    """Fetch a page body with a size cap
+
+    Returns (status_code, body). The body is None for non-200 responses.
+    """
+    status, response_headers, body = fetch_response(url, max_bytes, timeout, headers, source)
+    return status, body
+
+def extract_keyword_links(content, base_url, keywords):
+    """Return (text, absolute_url) for anchors whose text contains a keyword"""
+    # Only <a href> tags are built into the tree; everything else is skipped by the parser
+    soup = BeautifulSoup(content, 'lxml', parse_only=SoupStrainer('a', href=True))
+    
+    links = []
+    for link in soup.find_all('a', href=True):
+        link_text = link.get_text().strip()
+        if not link_text:
+            continue
+        
+        text_lower = link_text.lower()
+        if any(keyword in text_lower for keyword in keywords):
+            links.append((link_text, urljoin(base_url, link['href'])))
+    
+    return links
+
+def parse_lastmod(value):
+    """Parse a sitemap <lastmod> value into a naive UTC datetime, or None"""
+    if not value:
+        return None
+    
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def parse_sitemap_lastmod(value):
+    """Parse a sitemap <lastmod>: a date for date-only values, otherwise as parse_lastmod"""
+    try:
+        return date.fromisoformat((value or '').strip())
+    except ValueError:
+        return parse_lastmod(value)
+
+def changed_since(lastmod, since):
+    """Whether a sitemap lastmod is after since
+    
+    A date-only lastmod is compared by day, so a page changed later on the
+    day of the last crawl still counts as new.
+    """
+    if isinstance(lastmod, datetime):
+        return lastmod > since
+    return lastmod >= since.date()
+
+def transient_status(status):
+    """Whether a non-200 status may go away on its own, rather than meaning the page isn't there"""
+    return status in RETRY_STATUSES or status >= 500
+
+def parse_published(value):
+    """Parse a result's date (ISO 8601, or RFC 2822 as feeds use) into a naive UTC datetime, or None"""
+    if not value:
+        return None
+    
+    parsed = parse_lastmod(value)
+    if parsed is not None:
+        return parsed
+    
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def freshness_cutoff():
+    """Oldest publication time (naive UTC) a crawl still keeps"""
+    return datetime.utcnow() - timedelta(days=CRAWL_FRESHNESS_DAYS)
+
+def discover_sitemaps(base_url):
+    """Find a site's sitemaps from robots.txt, falling back to /sitemap.xml
+    
+    Returns None when robots.txt could not be read, so the fallback is not
+    mistaken for what the site lists.
+    """
+    sitemaps = []
+    
+    try:
+        status, content = fetch_page(urljoin(base_url, '/robots.txt'), max_bytes=ROBOTS_MAX_BYTES, source='puc')
+    except CrawlDeadlineExceeded:
+        raise
+    except Exception as e:
+        request_logger.debug(f"Failed to read robots.txt for {base_url}: {e}")
+        return None
+    
+    if transient_status(status):
+        request_logger.debug(f"Failed to read robots.txt for {base_url}: HTTP {status}")
+        return None
+    
+    if content:
+        for line in content.decode('utf-8', errors='replace').splitlines():
+            key, _, value = line.partition(':')
+            if key.strip().lower() == 'sitemap' and value.strip():
+                sitemaps.append(value.strip())
+    
+    return sitemaps or [urljoin(base_url, '/sitemap.xml')]
+
+def parse_sitemap(content):
+    """Parse a sitemap or sitemap index
+    
+    Returns (child_sitemaps, urls) where each entry is (loc, lastmod).
+    """
+    children = []
+    urls = []
+    
+    root = etree.fromstring(content, parser=etree.XMLParser(recover=True, resolve_entities=False, no_network=True))
+    if root is None:
+        return children, urls
+    
+    for entry in root:
+        if not isinstance(entry.tag, str):
+            continue
+        
+        loc = lastmod = None
+        for field in entry:
+            if not isinstance(field.tag, str):
+                continue
+            name = etree.QName(field).localname
+            if name == 'loc':
+                loc = (field.text or '').strip()
+            elif name == 'lastmod':
+                lastmod = parse_sitemap_lastmod(field.text)
+        
+        if not loc:
+            continue
+        
+        if etree.QName(entry).localname == 'sitemap':
+            children.append((loc, lastmod))
+        else:
+            urls.append((loc, lastmod))
+    
+    return children, urls
+
+def fetch_page_title(url):
+    """Fetch just enough of a page to read its <title>"""
+    status, content = fetch_page(url, max_bytes=TITLE_MAX_BYTES, source='puc')
+    if transient_status(status):
+        raise requests.exceptions.HTTPError(f"HTTP {status} from {url}")
+    if content is None:
+        return ''
+    
+    soup = BeautifulSoup(content, 'lxml', parse_only=SoupStrainer('title'))
+    title = soup.find('title')
+    return ' '.join(title.get_text().split()) if title else ''
+
+def scrape_puc_sitemaps(state, base_url, site_state, since, crawl_started):
+    """Find keyword pages changed since the last crawl through the site's sitemaps
+    
+    site_state['last_crawl'] moves to crawl_started only when every sitemap
+    and changed page was read; after a failure the next crawl looks again
+    from the same point.
+    """
     results = []
     
-    # Major state PUC websites
-    puc_sites = {
-        'California': 'https://www.cpuc.ca.gov',
-        'Texas': 'https://www.puc.texas.gov',
-        'New York': 'https://www.dps.ny.gov',
-        'Florida': 'https://www.psc.state.fl.us',
-        'Illinois': 'https://www.icc.illinois.gov',
-        'Colorado': 'https://puc.colorado.gov',
-    }
+    sitemaps = site_state.get('sitemaps')
+    refreshed_at = parse_lastmod(site_state.get('sitemaps_checked_at'))
+    if sitemaps is None or not refreshed_at or \
+            datetime.utcnow() - refreshed_at > timedelta(days=PUC_DISCOVERY_REFRESH_DAYS):
+        discovered = discover_sitemaps(base_url)
+        if discovered is not None:
+            sitemaps = site_state['sitemaps'] = discovered
+            site_state['sitemaps_checked_at'] = datetime.utcnow().isoformat()
+    
+    # robots.txt failed and nothing is remembered: try the usual location, but don't count it as a full read
+    complete = sitemaps is not None
+    pending = list(sitemaps or [urljoin(base_url, '/sitemap.xml')])
+    fetched = 0
+    candidates = []
     
-    for state, base_url in puc_sites.items():
+    while pending and fetched < PUC_MAX_SITEMAPS:
+        sitemap_url = pending.pop(0)
+        fetched += 1
+        
         try:
-            logger.info(f"Scraping {state} PUC")
-            
-            # Try to find news/press releases page
-            news_paths = ['/news', '/press-releases', '/newsroom', '/media']
-            
-            for path in news_paths:
-                try:
-                    url = base_url + path
-                    response = requests.get(url, timeout=10, headers={
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                    })
-                    
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # Look for links containing municipalization keywords
-                        keywords = ['municipal', 'franchise', 'public power', 'takeover']
-                        
-                        for link in soup.find_all('a', href=True):
-                            link_text = link.get_text().lower()
-                            href = link['href']
-                            
-                            if any(keyword in link_text for keyword in keywords):
-                                full_url = urljoin(base_url, href)
-                                
-                                results.append({
-                                    'title': link.get_text().strip(),
-                                    'url': full_url,
-                                    'snippet': f'{state} PUC: {link.get_text().strip()[:200]}',
-                                    'source': f'{state} Public Utility Commission',
-                                    'date': datetime.now().isoformat()
-                                })
-                        
-                        break  # Found a valid news page
-                        
-                except Exception as e:
-                    logger.debug(f"Failed to scrape {url}: {e}")
-                    continue
-            
-            time.sleep(REQUEST_DELAY)
-            
+            status, content = fetch_page(sitemap_url, source='puc')
+        except CrawlDeadlineExceeded:
+            raise
+        except Exception as e:
+            request_logger.debug(f"Failed to fetch sitemap {sitemap_url}: {e}")
+            complete = False
+            continue
+        
+        if content is None:
+            complete = complete and not transient_status(status)
+            continue
+        
+        children, urls = parse_sitemap(content)
+        
+        # Only descend into child sitemaps that changed since the last crawl
+        pending.extend(loc for loc, lastmod in children if lastmod is None or changed_since(lastmod, since))
+        
+        for loc, lastmod in urls:
+            if lastmod is None or not changed_since(lastmod, since):
+                continue
+            if any(keyword in loc.lower() for keyword in PUC_URL_KEYWORDS):
+                candidates.append((lastmod, loc))
+    
+    # Newest changes first, and only a bounded number of page fetches per site.
+    # ISO strings order dates and datetimes together.
+    candidates.sort(key=lambda candidate: candidate[0].isoformat(), reverse=True)
+    for lastmod, loc in candidates[:PUC_MAX_SITEMAP_PAGES]:
+        try:
+            title = fetch_page_title(loc)
+        except CrawlDeadlineExceeded:
+            raise
+        except Exception as e:
+            request_logger.debug(f"Failed to fetch {loc}: {e}")
+            complete = False
+            continue
+        
+        if not title:
+            continue
+        
+        results.append(RawResult(
+            title=title,
+            url=loc,
+            snippet=f'{state} PUC: {title[:200]}',
+            source=f'{state} Public Utility Commission',
+            date=lastmod.isoformat()
+        ))
+    
+    if complete:
+        site_state['last_crawl'] = crawl_started.isoformat()
+    return results
+
+def scrape_puc_news_page(state, base_url, site_state):
+    """Scrape a PUC site's news page, starting with the path that worked last time"""
+    results = []
+    
+    remembered = site_state.get('news_path')
+    if remembered:
+        paths = [remembered] + [path for path in PUC_NEWS_PATHS if path != remembered]
+    else:
+        # No path worked recently; don't re-probe every crawl
+        checked_at = parse_lastmod(site_state.get('news_path_checked_at'))
+        if checked_at and datetime.utcnow() - checked_at < timedelta(days=PUC_DISCOVERY_REFRESH_DAYS):
+            return results
+        paths = PUC_NEWS_PATHS
+    
+    failed = False
+    
+    # Try to find news/press releases page
+    for path in paths:
+        url = base_url + path
+        try:
+            status, content = fetch_page(url, source='puc')
+        except CrawlDeadlineExceeded:
+            raise
         except Exception as e:
-            logger.error(f"Error scraping {state} PUC: {e}")
+            request_logger.debug(f"Failed to scrape {url}: {e}")
+            failed = True
             continue
+        
+        if content is None:
+            failed = failed or transient_status(status)
+            continue
+        
+        for link_text, full_url in extract_keyword_links(content, base_url, PUC_KEYWORDS):
+            results.append(RawResult(
+                title=link_text,
+                url=full_url,
+                snippet=f'{state} PUC: {link_text[:200]}',
+                source=f'{state} Public Utility Commission'
+            ))
+        
+        # Found a valid news page
+        site_state['news_path'] = path
+        site_state['news_path_checked_at'] = datetime.utcnow().isoformat()
+        return results
+    
+    # Only forget the path once every candidate definitely isn't there; an error may pass
+    if not failed:
+        site_state['news_path'] = None
+        site_state['news_path_checked_at'] = datetime.utcnow().isoformat()
+    
+    return results
+
+def scrape_puc_site(state, base_url, site_state=None):
+    """Scrape one state PUC site for municipalization links
+    
+    site_state is this site's persisted entry and is updated in place with
+    the working news path, discovered sitemaps and the sitemap cursor. A site
+    cut short by the crawl deadline keeps what it found but leaves
+    site_state as it was, so the next crawl looks again.
+    """
+    site_state = site_state if site_state is not None else {}
+    updated = dict(site_state)
+    crawl_started = datetime.utcnow()
+    results = []
+    
+    request_logger.info(f"Scraping {state} PUC")
+    
+    try:
+        results.extend(scrape_puc_news_page(state, base_url, updated))
+        
+        if PUC_USE_SITEMAPS:
+            since = parse_lastmod(updated.get('last_crawl')) or crawl_started - timedelta(days=PUC_SITEMAP_LOOKBACK_DAYS)
+            try:
+                results.extend(scrape_puc_sitemaps(state, base_url, updated, since, crawl_started))
+            except CrawlDeadlineExceeded:
+                raise
+            except Exception as e:
+                request_logger.debug(f"Sitemap discovery failed for {base_url}: {e}")
+    except CrawlDeadlineExceeded:
+        request_logger.info(f"Crawl deadline reached while scraping {state} PUC")
+        return results
+    
+    # A request cut off by the deadline fails like any other; don't trust what it left out
+    remaining = remaining_budget()
+    if remaining is not None and remaining <= 0:
+        return results
+    
+    site_state.update(updated)
+    return results
+
+def scrape_state_puc_sites(site_states=None):
+    """Scrape state Public Utility Commission websites
+    
+    site_states maps each PUC base URL to its persisted crawl state; pass the
+    same dict on every crawl so working paths and sitemap cursors carry over.
+    """
+    results = []
+    site_states = site_states if site_states is not None else {}
+    
+    # Each site is a different host, so sites are fetched and parsed in parallel
+    max_workers = max(1, min(PUC_MAX_WORKERS, len(PUC_SITES)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            state: submit_with_context(executor, scrape_puc_site, state, base_url,
+                                       site_states.setdefault(base_url, {}))
+            for state, base_url in PUC_SITES.items()
+        }
+        
+        for state, future in futures.items():
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                logger.error(f"Error scraping {state} PUC: {e}")
+                continue
     
     logger.info(f"Found {len(results)} results from state PUC sites")
     return results
@@ -339,19 +896,20 @@ def scrape_legistar_sites():
     
     for city, api_base in legistar_cities.items():
         try:
-            logger.info(f"Searching {city} council agendas")
+            request_logger.info(f"Searching {city} council agendas")
             
-            # Get recent meetings (last 90 days)
+            # Get recent meetings (last 90 days at most)
             events_url = f"{api_base}/Events"
+            since = datetime.now() - timedelta(days=min(90, CRAWL_FRESHNESS_DAYS))
             params = {
-                '$filter': f"EventDate ge datetime'{(datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')}'",
+                '$filter': f"EventDate ge datetime'{since.strftime('%Y-%m-%d')}'",
                 '$top': 50
             }
             
-            response = requests.get(events_url, params=params, timeout=10)
+            response = http_get(events_url, 'legistar', params=params, timeout=10)
             
             if response.status_code != 200:
-                logger.debug(f"Failed to access {city} Legistar API")
+                request_logger.debug(f"Failed to access {city} Legistar API")
                 continue
             
             events = response.json()
@@ -363,7 +921,7 @@ def scrape_legistar_sites():
                 
                 # Get agenda items for this meeting
                 items_url = f"{api_base}/Events/{event_id}/EventItems"
-                items_response = requests.get(items_url, timeout=10)
+                items_response = http_get(items_url, 'legistar', timeout=10)
                 
                 if items_response.status_code != 200:
                     continue
@@ -381,15 +939,15 @@ def scrape_legistar_sites():
                     if any(keyword in combined_text for keyword in keywords):
                         event_date = event.get('EventDate', '')[:10]
                         
-                        results.append({
-                            'title': f"{city} Council: {title[:100]}",
-                            'url': f"{api_base.replace('/api/v1', '')}/MeetingDetail.aspx?ID={event_id}",
-                            'snippet': f"Council agenda item: {matter_name}. {title[:150]}",
-                            'source': f'{city} City Council',
-                            'date': event_date
-                        })
+                        results.append(RawResult(
+                            title=f"{city} Council: {title[:100]}",
+                            url=f"{api_base.replace('/api/v1', '')}/MeetingDetail.aspx?ID={event_id}",
+                            snippet=f"Council agenda item: {matter_name}. {title[:150]}",
+                            source=f'{city} City Council',
+                            date=event_date
+                        ))
             
-            time.sleep(REQUEST_DELAY)
+            crawl_sleep(REQUEST_DELAY, 'legistar')
             
         except Exception as e:
             logger.error(f"Error scraping {city} Legistar: {e}")
@@ -420,7 +978,7 @@ def scrape_state_legislature_sites():
     
     for state, config in state_leg_sites.items():
         try:
-            logger.info(f"Searching {state} legislature bills")
+            request_logger.info(f"Searching {state} legislature bills")
             
             # This is a simplified example - each state has different APIs/formats
             # You would need to implement specific scrapers for each state
@@ -428,7 +986,7 @@ def scrape_state_legislature_sites():
             # Placeholder for actual implementation
             # Most states have APIs or RSS feeds available
             
-            time.sleep(REQUEST_DELAY)
+            crawl_sleep(REQUEST_DELAY, 'legislature')
             
         except Exception as e:
             logger.error(f"Error scraping {state} legislature: {e}")
@@ -483,7 +1041,7 @@ def search_news_fallback(query, num_results=10):
         }
     ]
     
-    return base_results[:num_results]
+    return [RawResult(**result) for result in base_results[:num_results]]
 
 def generate_demo_data():
     """Generate realistic demo data when no API keys are configured"""
@@ -562,153 +1120,545 @@ def generate_demo_data():
         }
     ]
     
-    return demo_data
+    return [RawResult(**result) for result in demo_data]
 
-def scrape_rss_feeds():
-    """Scrape RSS feeds from local news sources"""
-    # List of RSS feeds to monitor
-    feeds = [
-        'https://www.utilitydive.com/feeds/news/',
-        # Add more RSS feeds here
-    ]
+def feed_entry_date(entry):
+    """Return an entry's published (or updated) time as a naive UTC datetime"""
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    if not parsed:
+        return None
+    return datetime(*parsed[:6])
+
+def fetch_feed(feed_url, cursor, host_limit):
+    """Fetch one feed with a conditional GET and return its new, relevant items
+    
+    cursor is the feed's persisted state and is updated in place.
+    """
+    headers = dict(BROWSER_HEADERS)
+    if cursor.get('etag'):
+        headers['If-None-Match'] = cursor['etag']
+    if cursor.get('modified'):
+        headers['If-Modified-Since'] = cursor['modified']
+    
+    with host_limit:
+        status, response_headers, content = fetch_response(feed_url, max_bytes=FEED_MAX_BYTES, headers=headers, source='feeds')
+    
+    if status == 304:
+        return []
+    if content is None:
+        request_logger.debug(f"Feed {feed_url} returned {status}")
+        return []
+    
+    cursor['etag'] = response_headers.get('ETag')
+    cursor['modified'] = response_headers.get('Last-Modified')
+    
+    feed = feedparser.parse(content)
+    feed_title = feed.feed.get('title') or urlparse(feed_url).netloc
+    
+    last_published = parse_lastmod(cursor.get('last_published'))
+    recent_guids = set(cursor.get('recent_guids', []))
     
     results = []
+    newest = last_published
+    guids = []
     
-    for feed_url in feeds:
-        try:
-            response = requests.get(feed_url, timeout=10)
-            if response.status_code == 200:
-                # Parse RSS feed (would need feedparser library)
-                # This is a placeholder
-                pass
-        except Exception as e:
-            print(f"RSS feed error for {feed_url}: {e}")
+    for entry in feed.entries:
+        guid = entry.get('id') or entry.get('link')
+        if not guid:
+            continue
+        guids.append(guid)
+        
+        published = feed_entry_date(entry)
+        if guid in recent_guids or (published and last_published and published <= last_published):
+            continue
+        if published and (newest is None or published > newest):
+            newest = published
+        
+        title = ' '.join(entry.get('title', '').split())
+        summary = ' '.join(BeautifulSoup(entry.get('summary', ''), 'lxml').get_text().split()) if entry.get('summary') else ''
+        
+        text_lower = f"{title} {summary}".lower()
+        if not any(keyword in text_lower for keyword in FEED_KEYWORDS):
+            continue
+        
+        results.append(RawResult(
+            title=title,
+            url=entry.get('link', ''),
+            snippet=summary[:300],
+            source=feed_title,
+            date=published.isoformat() if published else ''
+        ))
+    
+    # Keep the feed's current GUIDs so undated items aren't re-ingested
+    cursor['recent_guids'] = guids[:FEED_MAX_TRACKED_GUIDS]
+    cursor['last_guid'] = guids[0] if guids else cursor.get('last_guid')
+    cursor['last_published'] = newest.isoformat() if newest else None
     
     return results
 
-def process_search_result(result):
-    """Process a search result into a mention object"""
-    text = f"{result['title']} {result['snippet']}"
+def scrape_rss_feeds(feed_states=None):
+    """Ingest new items from RSS/Atom feeds from local news and trade sources
     
-    mention = {
-        'id': f"{int(time.time() * 1000)}{hash(result['url']) % 10000}",
-        'title': result['title'],
-        'url': result['url'],
-        'snippet': result['snippet'],
-        'source': result['source'],
-        'location': extract_location(text),
-        'utility': extract_utility(text),
-        'utilityType': determine_utility_type(text),
-        'stage': determine_stage(text),
-        'priority': determine_priority(text),
-        'capturedAt': datetime.now().isoformat(),
-        'status': 'pending',
-        'tags': []
+    feed_states maps each feed URL to its persisted cursor (ETag,
+    Last-Modified and the last items seen) and is updated in place.
+    """
+    feed_states = feed_states if feed_states is not None else {}
+    results = []
+    
+    # At most FEED_PER_HOST_LIMIT requests in flight to any one host
+    host_limits = {}
+    for feed_url in RSS_FEEDS:
+        host = urlparse(feed_url).netloc
+        host_limits.setdefault(host, threading.BoundedSemaphore(FEED_PER_HOST_LIMIT))
+    
+    logger.info(f"Fetching {len(RSS_FEEDS)} feeds")
+    
+    max_workers = max(1, min(FEED_MAX_WORKERS, len(RSS_FEEDS)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            feed_url: submit_with_context(
+                executor,
+                fetch_feed,
+                feed_url,
+                feed_states.setdefault(feed_url, {}),
+                host_limits[urlparse(feed_url).netloc]
+            )
+            for feed_url in RSS_FEEDS
+        }
+        
+        for feed_url, future in futures.items():
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                logger.error(f"RSS feed error for {feed_url}: {e}")
+                continue
+    
+    logger.info(f"Found {len(results)} new results from RSS feeds")
+    return results
+
+def canonical_url(url):
+    """Normalize url so trivially different links to one page compare equal
+    
+    Lowercases the scheme and host, drops default ports, credentials, the
+    fragment and tracking parameters, and sorts the remaining query.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.rpartition('@')[2].lower()
+    try:
+        if parts.port is not None and parts.port == DEFAULT_PORTS.get(scheme):
+            netloc = netloc.rsplit(':', 1)[0]
+    except ValueError:
+        pass
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not TRACKING_PARAMS.match(key))
+    return urlunsplit((scheme, netloc, parts.path or '/', urlencode(query), ''))
+
+def url_digest(url):
+    """SHA-256 of the canonical URL; the mention_keys key"""
+    return hashlib.sha256(canonical_url(url).encode('utf-8')).digest()
+
+def mention_id(url):
+    """Mention id for url: the first 128 bits of url_digest, as hex
+    
+    The same page gets the same id in every process and every run, so
+    crawlers can dedupe and write without coordinating.
+    """
+    return url_digest(url)[:16].hex()
+
+def process_search_result(result, key=None, published_at=None):
+    """Classify a RawResult into a Mention
+    
+    key is the result's mention id and published_at its parsed date, when
+    the caller already computed them.
+    """
+    fields = classify_text(f"{result.title} {result.snippet}")
+    
+    return Mention(
+        id=key or mention_id(result.url),
+        title=result.title,
+        url=result.url,
+        snippet=result.snippet,
+        source=result.source,
+        location=fields['location'],
+        utility=fields['utility'],
+        utility_type=fields['utilityType'],
+        stage=fields['stage'],
+        priority=fields['priority'],
+        captured_at=datetime.now(),
+        classifier_version=CLASSIFIER_VERSION,
+        published_at=published_at or parse_published(result.date)
+    )
+
+class ArticleCache:
+    """In-memory article cache keyed by URL, recording each article's content hash
+    
+    The database-backed cache in app.py implements the same methods.
+    Failed fetches are not remembered, so the next enrichment retries them.
+    """
+    
+    def __init__(self):
+        self._by_url = {}
+    
+    def unseen(self, urls):
+        """Return the URLs to fetch: never fetched, or failed and due a retry"""
+        return [url for url in urls if url not in self._by_url]
+    
+    def store(self, url, content_hash, fields):
+        self._by_url[url] = content_hash
+    
+    def store_failure(self, url, mention_id):
+        """Note a fetch that failed or found no article text"""
+        pass
+
+def extract_main_text(content):
+    """Extract the article body as the text of its substantial paragraphs"""
+    soup = BeautifulSoup(content, 'lxml', parse_only=SoupStrainer('p'))
+    
+    paragraphs = []
+    length = 0
+    for paragraph in soup.find_all('p'):
+        text = ' '.join(paragraph.get_text().split())
+        # Short paragraphs are mostly bylines, captions and navigation
+        if len(text) < ARTICLE_MIN_PARAGRAPH_CHARS:
+            continue
+        paragraphs.append(text)
+        length += len(text)
+        if length >= ARTICLE_MAX_TEXT_CHARS:
+            break
+    
+    return ' '.join(paragraphs)[:ARTICLE_MAX_TEXT_CHARS]
+
+def fetch_article(url):
+    """Fetch an article and return (content_hash, main_text), or (None, '')"""
+    try:
+        status, content = fetch_page(url, max_bytes=ARTICLE_MAX_BYTES, timeout=ARTICLE_TIMEOUT, source='articles')
+    except Exception as e:
+        request_logger.debug(f"Failed to fetch article {url}: {e}")
+        return None, ''
+    
+    if content is None:
+        return None, ''
+    
+    text = extract_main_text(content)
+    if not text:
+        return None, ''
+    
+    return hashlib.sha256(text.encode('utf-8')).hexdigest(), text
+
+def reclassify_mention(mention, article_text):
+    """Classify a mention on its full article text
+    
+    Location and utility found in the headline or snippet are kept, since
+    the body often mentions other places and companies in passing.
+    """
+    fields = classify_text(f"{mention.title} {mention.snippet} {article_text}")
+    
+    if mention.location != UNKNOWN_LOCATION:
+        fields['location'] = mention.location
+    if mention.utility != GENERIC_UTILITY:
+        fields['utility'] = mention.utility
+    
+    return fields
+
+def enrich_mentions(mentions, cache=None, max_workers=None):
+    """Fetch full articles for mentions and reclassify them on the body text
+    
+    Articles are fetched through a bounded thread pool, and each URL is only
+    fetched once per cache; failed fetches are left to the cache to retry
+    later (see ArticleCache.unseen). Returns a list of (mention, fields) pairs
+    for mentions whose classification changed.
+    """
+    cache = cache if cache is not None else ArticleCache()
+    by_url = {m.url: m for m in mentions if m.url}
+    urls = cache.unseen(list(by_url))
+    
+    if not urls:
+        return []
+    
+    logger.info(f"Enriching {len(urls)} articles ({len(by_url) - len(urls)} already cached)")
+    
+    updates = []
+    max_workers = max(1, min(max_workers or ENRICH_MAX_WORKERS, len(urls)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Workers run in the caller's context, so their log records carry its crawl and job ids
+        futures = [submit_with_context(executor, fetch_article, url) for url in urls]
+        for url, future in zip(urls, futures):
+            content_hash, text = future.result()
+            mention = by_url[url]
+            
+            if content_hash is None:
+                cache.store_failure(url, mention.id)
+                continue
+            
+            # Always this mention's own headline and snippet: a syndicated copy of the
+            # same text may carry a different headline, and so classify differently
+            fields = reclassify_mention(mention, text)
+            cache.store(url, content_hash, fields)
+            
+            if mention.classification() != fields:
+                updates.append((mention, fields))
+    
+    logger.info(f"Enrichment reclassified {len(updates)} of {len(urls)} articles")
+    return updates
+
+class CrawlCheckpoint:
+    """Checkpoint interface for run_crawl, which does not persist anything
+    
+    A crawl is split into units of (source, query, page). DatabaseCheckpoint
+    in app.py records each finished unit together with its mentions, so an
+    interrupted crawl resumes at the next unfinished unit.
+    """
+    
+    # Mentions stored by earlier, interrupted runs of this crawl
+    previous_mentions = 0
+    
+    def is_done(self, unit):
+        return False
+    
+    def complete(self, unit, mentions, finished=True):
+        """Store a unit's mentions; an unfinished unit (cut short by the deadline) is run again on resume"""
+        pass
+    
+    def skip(self, unit, reason):
+        """Note a unit the crawl did not finish: reason is 'deadline', or 'error' when its request failed"""
+        pass
+
+# Crawl phases in order: (source, label)
+CRAWL_PHASES = [
+    ('google', 'Google Custom Search'),
+    ('newsapi', 'NewsAPI.org'),
+    ('puc', 'State Public Utility Commissions'),
+    ('legistar', 'City Council Agendas (Legistar)'),
+    ('feeds', 'RSS/Atom Feeds'),
+    ('ferc', 'FERC Filings'),
+]
+
+def crawl_units(source, queries, max_results_per_query):
+    """List the (source, query, page) units of one crawl phase"""
+    if source == 'google':
+        return [('google', query, page)
+                for query in queries
+                for page in range(google_pages_needed(max_results_per_query))]
+    if source == 'newsapi':
+        return [('newsapi', query, 0) for query in queries]
+    return [(source, '', 0)]
+
+def run_crawl_unit(unit, max_results_per_query, state):
+    """Fetch the raw results for one crawl unit
+    
+    A failed Google or NewsAPI request raises a RequestException rather
+    than returning [], so the unit is not recorded as done.
+    """
+    source, query, page = unit
+    
+    if source == 'google':
+        return search_google_page(query, page, max_results_per_query, raise_errors=True)
+    if source == 'newsapi':
+        return search_newsapi(query, max_results_per_query, raise_errors=True)
+    if source == 'puc':
+        return scrape_state_puc_sites(state.setdefault('puc_sites', {}))
+    if source == 'legistar':
+        return scrape_legistar_sites()
+    if source == 'feeds':
+        return scrape_rss_feeds(state.setdefault('feeds', {}))
+    if source == 'ferc':
+        return scrape_ferc_filings()
+    if source == 'demo':
+        return generate_demo_data()
+    
+    raise ValueError(f"Unknown crawl source: {source}")
+
+def update_unit_cost(state, source, seconds, mentions, finished=True):
+    """Fold one unit's time and new mentions into the source's smoothed history
+    
+    A unit cut short by the deadline would have taken longer than it ran,
+    so its time only ever raises the expected cost.
+    """
+    costs = state.setdefault(CRAWL_COST_STATE_KEY, {})
+    previous = costs.get(source)
+    if previous is None:
+        costs[source] = {'seconds': round(seconds, 3), 'mentions': float(mentions), 'units': 1}
+        return
+    
+    alpha = CRAWL_COST_SMOOTHING
+    smoothed = (1 - alpha) * previous['seconds'] + alpha * seconds
+    costs[source] = {
+        'seconds': round(smoothed if finished else max(previous['seconds'], seconds), 3),
+        'mentions': round((1 - alpha) * previous['mentions'] + alpha * mentions, 3),
+        'units': previous['units'] + 1
     }
+
+def expected_unit_seconds(state, source):
+    """Expected wall-clock time of one unit of source, including its rate-limit sleep"""
+    history = state.get(CRAWL_COST_STATE_KEY, {}).get(source)
+    seconds = history['seconds'] if history else 0.0
+    if source in ('google', 'newsapi'):
+        seconds += REQUEST_DELAY
+    return seconds
+
+def plan_phases(state):
+    """CRAWL_PHASES ordered by historical mentions per second, highest first
+    
+    Sources with no history yet go first, so their cost is learned.
+    """
+    costs = state.get(CRAWL_COST_STATE_KEY, {})
     
-    return mention
+    def rate(phase):
+        history = costs.get(phase[0])
+        if history is None:
+            return float('inf')
+        return history['mentions'] / max(expected_unit_seconds(state, phase[0]), 0.01)
+    
+    return sorted(CRAWL_PHASES, key=rate, reverse=True)
 
-def run_crawl(queries, max_results_per_query=10):
-    """Run a comprehensive crawl across all sources"""
+def run_crawl(queries, max_results_per_query=10, state=None, checkpoint=None, deadline=None):
+    """Run a comprehensive crawl across all sources
+    
+    state is a JSON-serializable dict carried between crawls (see
+    load_crawler_state in app.py); it is updated in place. checkpoint skips
+    units that an interrupted run already finished (see CrawlCheckpoint).
+    
+    deadline is a time.monotonic() value. Sources then run cheapest and
+    highest-yield first (see plan_phases), units expected to overrun the
+    time left are deferred until every other unit has had its turn, every
+    HTTP call's timeout is capped at the remaining budget, and once it is
+    spent the crawl stops and returns what it has. Units not run or cut
+    short are reported through checkpoint.skip.
+    """
+    state = state if state is not None else {}
+    checkpoint = checkpoint if checkpoint is not None else CrawlCheckpoint()
     all_mentions = []
-    seen_urls = set()
+    seen_ids = set()
+    deferred = []
+    skipped = []
+    failed = []
+    # Google queries with no more pages; checked again for deferred units
+    exhausted_queries = set()
+    cutoff = freshness_cutoff()
     
-    logger.info(f"Starting comprehensive crawl with {len(queries)} queries...")
+    def skip(unit, reason):
+        skipped.append(unit)
+        checkpoint.skip(unit, reason)
     
-    # 1. Google Custom Search
-    logger.info("=== Phase 1: Google Custom Search ===")
-    for query in queries:
-        results = search_google(query, max_results_per_query)
+    def process_unit(unit):
+        started = time.monotonic()
+        try:
+            with UNIT_LATENCY.time(source=unit[0]):
+                results = run_crawl_unit(unit, max_results_per_query, state)
+        except requests.exceptions.RequestException as e:
+            # Not done: a resumed run fetches it again
+            update_unit_cost(state, unit[0], time.monotonic() - started, 0, finished=False)
+            remaining = remaining_budget()
+            if remaining is not None and remaining <= 0:
+                skip(unit, 'deadline')
+            else:
+                logger.warning(f"Crawl unit {unit} failed: {e}")
+                failed.append(unit)
+                checkpoint.skip(unit, 'error')
+            return [], False
         
+        mentions = []
+        stale = 0
         for result in results:
-            url = result.get('url', '')
-            if url and url not in seen_urls:
-                seen_urls.add(url)
-                mention = process_search_result(result)
-                all_mentions.append(mention)
+            # Old news is dropped before it costs a classification or a write; undated results are kept
+            published = parse_published(result.date)
+            if published is not None and published < cutoff:
+                stale += 1
+                continue
+            
+            key = mention_id(result.url) if result.url else None
+            if key and key not in seen_ids:
+                seen_ids.add(key)
+                mentions.append(process_search_result(result, key, published))
+        score_mentions(mentions)
+        if stale:
+            STALE_RESULTS.inc(stale, source=unit[0])
         
-        time.sleep(REQUEST_DELAY)
-    
-    logger.info(f"Google Search: {len(all_mentions)} mentions found")
+        # A unit still running at the deadline had requests refused; keep what it found, run it again later
+        remaining = remaining_budget()
+        finished = remaining is None or remaining > 0
+        update_unit_cost(state, unit[0], time.monotonic() - started, len(mentions), finished)
+        
+        checkpoint.complete(unit, mentions, finished)
+        if not finished:
+            skip(unit, 'deadline')
+        all_mentions.extend(mentions)
+        UNIT_MENTIONS.inc(len(mentions), source=unit[0])
+        return results, finished
     
-    # 2. NewsAPI
-    logger.info("=== Phase 2: NewsAPI.org ===")
-    initial_count = len(all_mentions)
+    logger.info(f"Starting comprehensive crawl with {len(queries)} queries...")
+    token = CRAWL_DEADLINE.set(deadline)
     
-    for query in queries:
-        results = search_newsapi(query, max_results_per_query)
+    try:
+        phases = plan_phases(state) if deadline is not None else CRAWL_PHASES
+        for number, (source, label) in enumerate(phases, start=1):
+            logger.info(f"=== Phase {number}: {label} ===")
+            initial_count = len(all_mentions)
+            
+            for unit in crawl_units(source, queries, max_results_per_query):
+                if checkpoint.is_done(unit):
+                    continue
+                
+                # Google has no more pages for this query; nothing to fetch
+                if source == 'google' and unit[1] in exhausted_queries:
+                    checkpoint.complete(unit, [])
+                    continue
+                
+                remaining = remaining_budget()
+                if remaining is not None and remaining <= 0:
+                    skip(unit, 'deadline')
+                    continue
+                
+                # Leave the time to cheaper units of later sources first
+                if remaining is not None and expected_unit_seconds(state, source) > remaining:
+                    deferred.append(unit)
+                    continue
+                
+                results, finished = process_unit(unit)
+                
+                # Only a page that came back short means Google has no more
+                if source == 'google' and finished and len(results) < 10:
+                    exhausted_queries.add(unit[1])
+                
+                # Rate limiting between paid API calls
+                if source in ('google', 'newsapi'):
+                    crawl_sleep(REQUEST_DELAY, source)
+            
+            logger.info(f"{label}: {len(all_mentions) - initial_count} new mentions found")
         
-        for result in results:
-            url = result.get('url', '')
-            if url and url not in seen_urls:
-                seen_urls.add(url)
-                mention = process_search_result(result)
-                all_mentions.append(mention)
-        
-        time.sleep(REQUEST_DELAY)
-    
-    logger.info(f"NewsAPI: {len(all_mentions) - initial_count} new mentions found")
-    
-    # 3. State PUC Sites
-    logger.info("=== Phase 3: State Public Utility Commissions ===")
-    initial_count = len(all_mentions)
-    
-    puc_results = scrape_state_puc_sites()
-    for result in puc_results:
-        url = result.get('url', '')
-        if url and url not in seen_urls:
-            seen_urls.add(url)
-            mention = process_search_result(result)
-            all_mentions.append(mention)
-    
-    logger.info(f"State PUCs: {len(all_mentions) - initial_count} new mentions found")
-    
-    # 4. Legistar City Council Agendas
-    logger.info("=== Phase 4: City Council Agendas (Legistar) ===")
-    initial_count = len(all_mentions)
-    
-    legistar_results = scrape_legistar_sites()
-    for result in legistar_results:
-        url = result.get('url', '')
-        if url and url not in seen_urls:
-            seen_urls.add(url)
-            mention = process_search_result(result)
-            all_mentions.append(mention)
-    
-    logger.info(f"Legistar: {len(all_mentions) - initial_count} new mentions found")
-    
-    # 5. FERC Filings (if implemented)
-    logger.info("=== Phase 5: FERC Filings ===")
-    initial_count = len(all_mentions)
-    
-    ferc_results = scrape_ferc_filings()
-    for result in ferc_results:
-        url = result.get('url', '')
-        if url and url not in seen_urls:
-            seen_urls.add(url)
-            mention = process_search_result(result)
-            all_mentions.append(mention)
-    
-    logger.info(f"FERC: {len(all_mentions) - initial_count} new mentions found")
-    
-    # 6. FALLBACK: If no results from any source, use demo data
-    if len(all_mentions) == 0:
-        logger.info("=== Phase 6: Generating Demo Data (No API keys configured) ===")
-        demo_results = generate_demo_data()
-        for result in demo_results:
-            url = result.get('url', '')
-            if url and url not in seen_urls:
-                seen_urls.add(url)
-                mention = process_search_result(result)
-                all_mentions.append(mention)
+        # Deferred units get whatever time is left; partial results are still kept
+        if deferred:
+            logger.info(f"=== Deferred: {len(deferred)} units expected to overrun the budget ===")
+        for unit in deferred:
+            if unit[0] == 'google' and unit[1] in exhausted_queries:
+                checkpoint.complete(unit, [])
+                continue
+            if remaining_budget() <= 0:
+                skip(unit, 'deadline')
+                continue
+            results, finished = process_unit(unit)
+            if unit[0] == 'google' and finished and len(results) < 10:
+                exhausted_queries.add(unit[1])
+            if unit[0] in ('google', 'newsapi'):
+                crawl_sleep(REQUEST_DELAY, unit[0])
+    finally:
+        CRAWL_DEADLINE.reset(token)
+    
+    # FALLBACK: If no results from any source, use demo data
+    if len(all_mentions) == 0 and checkpoint.previous_mentions == 0 and not skipped and not failed:
+        logger.info(f"=== Phase {len(CRAWL_PHASES) + 1}: Generating Demo Data (No API keys configured) ===")
+        process_unit(('demo', '', 0))
         logger.info(f"Demo Data: {len(all_mentions)} sample mentions generated")
         logger.info("💡 TIP: Add API keys to get real data! See API_SETUP_GUIDE.md")
     
     # Summary
     logger.info(f"\n{'='*60}")
-    logger.info(f"CRAWL COMPLETE")
+    logger.info(f"CRAWL COMPLETE" if not skipped else f"CRAWL STOPPED AT DEADLINE ({len(skipped)} units skipped)")
     logger.info(f"Total mentions found: {len(all_mentions)}")
-    logger.info(f"Unique URLs: {len(seen_urls)}")
+    logger.info(f"Unique URLs: {len(seen_ids)}")
+    if failed:
+        logger.info(f"Failed units, retried by the next crawl: {len(failed)}")
     logger.info(f"{'='*60}\n")
     
     return all_mentions
@@ -728,6 +1678,8 @@ def search_specific_sources():
     return results
 
 if __name__ == '__main__':
+    logging_setup.configure()
+    
     # Test the crawler
     test_queries = [
         'utility municipalization news',
@@ -738,4 +1690,4 @@ if __name__ == '__main__':
     mentions = run_crawl(test_queries, 5)
     print(f"\nFound {len(mentions)} mentions:")
     for m in mentions[:3]:
-        print(f"  - {m['title']}")
+        print(f"  - {m.title}")
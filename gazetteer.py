@@ -0,0 +1,510 @@
+"""
+US places gazetteer for location extraction
+
+States, counties and places (with FIPS codes) are stored in a compact
+array-backed index: a sorted token vocabulary plus a token trie, all in
+flat uint32 arrays that are memory-mapped from disk on first use. Matching
+walks the trie from each capitalized word, so its cost depends on the
+text, not on the size of the gazetteer.
+
+Build the full index from the Census Bureau Gazetteer files
+(https://www.census.gov/geographies/reference-files/time-series/geo/gazetteer-files.html),
+from local copies or downloaded:
+
+    python gazetteer.py build --places 2023_Gaz_place_national.txt \\
+        --counties 2023_Gaz_counties_national.txt
+    python gazetteer.py build --download
+
+The index is not in the repository; build.sh builds it at deploy time and
+runs `python gazetteer.py check`, which fails unless a full index is in
+place. Without one the bundled seed (states and a few major cities) is
+indexed in memory instead, with a warning, and /api/health reports it.
+"""
+
+import argparse
+import array
+import csv
+import functools
+import io
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import zipfile
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+SEED_PATH = os.path.join(DATA_DIR, 'gazetteer_seed.tsv')
+GAZETTEER_PATH = os.environ.get('GAZETTEER_PATH', os.path.join(DATA_DIR, 'gazetteer.idx'))
+
+CENSUS_YEAR = os.environ.get('GAZETTEER_CENSUS_YEAR', '2023')
+CENSUS_URL = 'https://www2.census.gov/geo/docs/maps-data/data/gazetteer/{year}_Gazetteer/{year}_Gaz_{kind}_national.zip'
+
+# A full index has every Census place and county; the seed has under a hundred entries
+MIN_FULL_ENTRIES = 30000
+
+KIND_STATE = 0
+KIND_COUNTY = 1
+KIND_PLACE = 2
+KINDS = {'state': KIND_STATE, 'county': KIND_COUNTY, 'place': KIND_PLACE}
+
+FLAG_PROMINENT = 1  # well known enough to stand without a state
+
+MAGIC = b'GAZ1'
+HEADER = struct.Struct('<4s7I')
+
+# Case-sensitive word tokens; "St. Louis" is St + Louis, "O'Fallon" is one token
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+
+STATE_QUALIFIER = re.compile(r',\s*([A-Z]{2})\b')
+STATE_SEPARATOR = re.compile(r',\s*')
+NEXT_WORD = re.compile(r"[ \t]+([A-Z][\w'&]*)")
+
+# A state name followed by one of these is part of another proper noun:
+# "Kansas City", "Washington County", "Virginia Beach", "Georgia Power"
+STATE_NAME_CONTINUATIONS = frozenset({
+    'City', 'County', 'Parish', 'Borough', 'Township', 'Village', 'Beach', 'Springs', 'Falls', 'Heights',
+    'Park', 'Island', 'Islands', 'Lake', 'Hills', 'Valley', 'Avenue', 'Street',
+    'Power', 'Energy', 'Electric', 'Gas', 'Light', 'Edison', 'Water', 'Natural',
+})
+
+# Trailing legal descriptions in Census place names ("Boulder city", "Honolulu CDP")
+PLACE_SUFFIX = re.compile(r"(?:\s+(?:CDP|[a-z][a-z ]*|\([a-z ]+\)))+$")
+
+COUNTY_SUFFIXES = ('County', 'Parish', 'Borough', 'Census Area', 'Municipality', 'City and Borough')
+
+Entry = namedtuple('Entry', 'kind usps fips name flags')
+Match = namedtuple('Match', 'name start end entries')
+
+def tokenize(text):
+    return TOKEN_PATTERN.finditer(text)
+
+def read_seed(path=SEED_PATH):
+    with open(path, encoding='utf-8') as handle:
+        rows = csv.DictReader((line for line in handle if not line.startswith('#')), delimiter='\t')
+        for row in rows:
+            flags = FLAG_PROMINENT if row['prominent'] == '1' else 0
+            yield Entry(KINDS[row['kind']], row['usps'], int(row['fips']), row['name'], flags)
+
+def read_census(path):
+    """Rows of a Census Gazetteer file, with the padded header names stripped"""
+    with open(path, encoding='utf-8', newline='') as handle:
+        reader = csv.reader(handle, delimiter='\t')
+        header = [name.strip() for name in next(reader)]
+        for row in reader:
+            yield dict(zip(header, (value.strip() for value in row)))
+
+def read_census_places(path):
+    for row in read_census(path):
+        name = PLACE_SUFFIX.sub('', row['NAME'])
+        if not name:
+            continue
+        entry = Entry(KIND_PLACE, row['USPS'], int(row['GEOID']), name, 0)
+        yield entry
+
+        # Consolidated city-counties are known by the city: Nashville-Davidson
+        if row['NAME'].endswith('(balance)') and '-' in name:
+            yield entry._replace(name=name.split('-', 1)[0])
+
+def read_census_counties(path):
+    for row in read_census(path):
+        # Independent cities ("Alexandria city") are already in the places file
+        if row['NAME'].endswith(COUNTY_SUFFIXES):
+            yield Entry(KIND_COUNTY, row['USPS'], int(row['GEOID']), row['NAME'], 0)
+
+def merge_entries(entries):
+    """Drop duplicate (kind, fips, name) entries, keeping any flags"""
+    merged = {}
+    for entry in entries:
+        key = (entry.kind, entry.fips, entry.name)
+        existing = merged.get(key)
+        merged[key] = entry._replace(flags=entry.flags | existing.flags) if existing else entry
+    return list(merged.values())
+
+def layout(counts):
+    """(section, typecode, length) in file order for the given header counts"""
+    n_tokens, token_bytes, n_nodes, n_edges, n_entries, name_bytes = counts
+    return [
+        ('token_offsets', 'I', n_tokens + 1),
+        ('token_blob', 'B', token_bytes),
+        ('node_edges', 'I', n_nodes + 1),
+        ('node_entries', 'I', n_nodes + 1),
+        ('edge_tokens', 'I', n_edges),
+        ('edge_targets', 'I', n_edges),
+        ('entry_fips', 'I', n_entries),
+        ('entry_names', 'I', n_entries + 1),
+        ('entry_kinds', 'B', n_entries),
+        ('entry_flags', 'B', n_entries),
+        ('entry_usps', 'B', n_entries * 2),
+        ('name_blob', 'B', name_bytes),
+    ]
+
+def padded(size):
+    return (size + 3) & ~3
+
+def build_index(entries):
+    """Serialize entries into the index format read by Gazetteer"""
+    entries = merge_entries(entries)
+    names = [[token.group() for token in tokenize(entry.name)] for entry in entries]
+
+    vocabulary = sorted({token.encode('utf-8') for tokens in names for token in tokens})
+    token_ids = {token.decode('utf-8'): index for index, token in enumerate(vocabulary)}
+
+    # Trie over token ids; node 0 is the root
+    children = [{}]
+    node_entries = [[]]
+    for index, tokens in enumerate(names):
+        if not tokens:
+            continue
+        node = 0
+        for token in tokens:
+            token_id = token_ids[token]
+            child = children[node].get(token_id)
+            if child is None:
+                child = children[node][token_id] = len(children)
+                children.append({})
+                node_entries.append([])
+            node = child
+        node_entries[node].append(index)
+
+    sections = {name: array.array(typecode) for name, typecode, _ in layout((0,) * 6)}
+
+    offset = 0
+    sections['token_offsets'].append(0)
+    for token in vocabulary:
+        offset += len(token)
+        sections['token_offsets'].append(offset)
+    token_blob = b''.join(vocabulary)
+
+    # Entries are renumbered so each node's entries are contiguous
+    order = []
+    sections['node_edges'].append(0)
+    sections['node_entries'].append(0)
+    for node, edges in enumerate(children):
+        for token_id in sorted(edges):
+            sections['edge_tokens'].append(token_id)
+            sections['edge_targets'].append(edges[token_id])
+        order.extend(node_entries[node])
+        sections['node_edges'].append(len(sections['edge_tokens']))
+        sections['node_entries'].append(len(order))
+
+    name_blob = bytearray()
+    sections['entry_names'].append(0)
+    for index in order:
+        entry = entries[index]
+        sections['entry_fips'].append(entry.fips)
+        sections['entry_kinds'].append(entry.kind)
+        sections['entry_flags'].append(entry.flags)
+        sections['entry_usps'].extend(entry.usps.encode('ascii')[:2].ljust(2))
+        name_blob += entry.name.encode('utf-8')
+        sections['entry_names'].append(len(name_blob))
+
+    sections['token_blob'] = array.array('B', token_blob)
+    sections['name_blob'] = array.array('B', name_blob)
+
+    counts = (len(vocabulary), len(token_blob), len(children), len(sections['edge_tokens']),
+              len(order), len(name_blob))
+    output = bytearray(HEADER.pack(MAGIC, 1, *counts))
+    for name, _, _ in layout(counts):
+        values = sections[name]
+        if values.itemsize > 1 and sys.byteorder == 'big':
+            values.byteswap()
+        data = values.tobytes()
+        output += data + b'\0' * (padded(len(data)) - len(data))
+    return bytes(output)
+
+class Gazetteer:
+    """Read-only view over a serialized index (bytes or a memory map)"""
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        magic, version, *counts = HEADER.unpack_from(view)
+        if magic != MAGIC or version != 1:
+            raise ValueError('Not a gazetteer index')
+
+        offset = HEADER.size
+        for name, typecode, length in layout(counts):
+            size = length * struct.calcsize(typecode)
+            section = view[offset:offset + size]
+            setattr(self, name, section.cast(typecode) if typecode != 'B' else section)
+            offset += padded(size)
+
+        self.size = len(self.entry_fips)
+        self.token_id = functools.lru_cache(maxsize=16384)(self._token_id)
+        self.states = {}
+        for index, kind in enumerate(self.entry_kinds):
+            if kind == KIND_STATE:
+                self.states[self.entry(index).usps] = index
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as handle:
+            return cls(mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def from_entries(cls, entries):
+        return cls(build_index(entries))
+
+    def _token_id(self, token):
+        """Vocabulary id of token, or -1; a binary search over the sorted blob"""
+        key = token.encode('utf-8')
+        offsets, blob = self.token_offsets, self.token_blob
+        low, high = 0, len(offsets) - 1
+        while low < high:
+            middle = (low + high) // 2
+            candidate = bytes(blob[offsets[middle]:offsets[middle + 1]])
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def child(self, node, token_id):
+        tokens = self.edge_tokens
+        low, high = self.node_edges[node], self.node_edges[node + 1]
+        while low < high:
+            middle = (low + high) // 2
+            if tokens[middle] < token_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.node_edges[node + 1] and tokens[low] == token_id:
+            return self.edge_targets[low]
+        return None
+
+    def entry(self, index):
+        usps = bytes(self.entry_usps[index * 2:index * 2 + 2]).decode('ascii')
+        name = bytes(self.name_blob[self.entry_names[index]:self.entry_names[index + 1]]).decode('utf-8')
+        return Entry(self.entry_kinds[index], usps, self.entry_fips[index], name, self.entry_flags[index])
+
+    def find(self, text):
+        """Longest gazetteer matches in text, left to right, without overlaps"""
+        tokens = list(tokenize(text))
+        matches = []
+        position = 0
+        while position < len(tokens):
+            token = tokens[position].group()
+            # Every name starts with a capital, so lowercase words can't start a match
+            if not token[0].isupper():
+                position += 1
+                continue
+
+            node, end, best = 0, position, None
+            while end < len(tokens):
+                token_id = self.token_id(tokens[end].group())
+                node = self.child(node, token_id) if token_id >= 0 else None
+                if node is None:
+                    break
+                end += 1
+                if self.node_entries[node] < self.node_entries[node + 1]:
+                    best = (node, end)
+
+            if best is None:
+                position += 1
+                continue
+
+            node, end = best
+            entries = [self.entry(index)
+                       for index in range(self.node_entries[node], self.node_entries[node + 1])]
+            matches.append(Match(entries[0].name, tokens[position].start(), tokens[end - 1].end(), entries))
+            position = end
+        return matches
+
+    def state_entries(self, text, match):
+        """match's state entries, unless the name runs on into another proper noun"""
+        following = NEXT_WORD.match(text, match.end)
+        if following and following.group(1) in STATE_NAME_CONTINUATIONS:
+            return []
+        return [entry for entry in match.entries if entry.kind == KIND_STATE]
+
+    def state_qualifier(self, text, match, matches):
+        """USPS code of a ", ST" or ", State" directly after match, if any"""
+        qualifier = STATE_QUALIFIER.match(text, match.end)
+        if qualifier and qualifier.group(1) in self.states:
+            return qualifier.group(1)
+
+        separator = STATE_SEPARATOR.match(text, match.end)
+        if separator:
+            for following in matches:
+                if following.start == separator.end():
+                    return next((entry.usps for entry in self.state_entries(text, following)), None)
+        return None
+
+    def locate(self, text):
+        """Best location in text as "Place, ST", "Place", "ST", or None
+
+        Places and counties need a state: written right after the name, or
+        mentioned elsewhere in the text. Prominent places need none; their
+        own state is added. Otherwise the first state mentioned is returned.
+        A name written with a state it is not in ("South Portland, ME" when
+        only Portland, OR is known) is the written state, never the other
+        place. A state name inside a longer proper noun ("Kansas City",
+        "Georgia Power") is not a mention of the state.
+        """
+        matches = self.find(text)
+
+        mentioned = []
+        for match in matches:
+            for entry in self.state_entries(text, match):
+                mentioned.append((match.start, entry.usps))
+        for word in re.finditer(r'\b[A-Z]{2}\b', text):
+            if word.group() in self.states:
+                mentioned.append((word.start(), word.group()))
+        mentioned.sort()
+
+        localities = [match for match in matches
+                      if any(entry.kind != KIND_STATE for entry in match.entries)]
+
+        # A place written with its state: "Decorah, Iowa", "Pueblo, CO"
+        contradicted = []
+        for match in localities:
+            usps = self.state_qualifier(text, match, matches)
+            if not usps:
+                continue
+            if any(entry.kind != KIND_STATE and entry.usps == usps for entry in match.entries):
+                return f'{match.name}, {usps}'
+            contradicted.append((match, usps))
+
+        # The written state wins over a same-named place elsewhere
+        localities = [match for match in localities
+                      if all(match is not other for other, _ in contradicted)]
+
+        # A place whose state is mentioned somewhere else in the text
+        for match in localities:
+            for start, usps in mentioned:
+                if start == match.start:
+                    continue
+                if any(entry.kind != KIND_STATE and entry.usps == usps for entry in match.entries):
+                    return f'{match.name}, {usps}'
+
+        if contradicted:
+            return contradicted[0][1]
+
+        # Prominent places stand alone in text but carry their state here,
+        # so "Boulder" and "Boulder, CO" are one location
+        for match in localities:
+            for entry in match.entries:
+                if entry.flags & FLAG_PROMINENT and entry.kind != KIND_STATE:
+                    return f'{match.name}, {entry.usps}'
+
+        # Unambiguous counties carry their state; others stand alone
+        for match in localities:
+            counties = [entry for entry in match.entries if entry.kind == KIND_COUNTY]
+            if len(counties) == 1:
+                return f'{match.name}, {counties[0].usps}'
+            if counties:
+                return match.name
+
+        if mentioned:
+            return mentioned[0][1]
+        return None
+
+_gazetteer = None
+_gazetteer_source = None
+_gazetteer_lock = threading.Lock()
+
+def get_gazetteer():
+    """The shared gazetteer, loaded on first use"""
+    global _gazetteer, _gazetteer_source
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                if os.path.exists(GAZETTEER_PATH):
+                    _gazetteer = Gazetteer.open(GAZETTEER_PATH)
+                    _gazetteer_source = 'index'
+                    logger.info(f"Loaded gazetteer with {_gazetteer.size} entries from {GAZETTEER_PATH}")
+                else:
+                    _gazetteer = Gazetteer.from_entries(read_seed())
+                    _gazetteer_source = 'seed'
+                    logger.warning(f"No gazetteer index at {GAZETTEER_PATH}; using the {_gazetteer.size}-entry "
+                                   f"seed, which knows only states and major cities (see build.sh)")
+    return _gazetteer
+
+def gazetteer_status():
+    """Where the shared gazetteer came from and its size, for /api/health"""
+    gazetteer = get_gazetteer()
+    return {'source': _gazetteer_source, 'entries': gazetteer.size}
+
+def download_census(kind, directory, year=CENSUS_YEAR):
+    """Download and unzip one Census Gazetteer national file; returns its path"""
+    import requests
+
+    url = CENSUS_URL.format(year=year, kind=kind)
+    response = requests.get(url, timeout=120)
+    response.raise_for_status()
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        name = next(name for name in archive.namelist() if name.endswith('.txt'))
+        return archive.extract(name, directory)
+
+def check_index(path=GAZETTEER_PATH):
+    """Problems with the built index at path, or [] if it looks complete"""
+    if not os.path.exists(path):
+        return [f"No gazetteer index at {path}"]
+
+    gazetteer = Gazetteer.open(path)
+    problems = []
+    if gazetteer.size < MIN_FULL_ENTRIES:
+        problems.append(f"{path} has {gazetteer.size} entries; a full index has over {MIN_FULL_ENTRIES}")
+    # Small towns are what the full index is for
+    for text, expected in (('Decorah, Iowa', 'Decorah, IA'), ('Ukiah, CA', 'Ukiah, CA')):
+        found = gazetteer.locate(text)
+        if found != expected:
+            problems.append(f"{text!r} located as {found!r}, expected {expected!r}")
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or query the gazetteer index')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='build the index from Census Gazetteer files')
+    build.add_argument('--places', help='Census Gazetteer places file (e.g. 2023_Gaz_place_national.txt)')
+    build.add_argument('--counties', help='Census Gazetteer counties file (e.g. 2023_Gaz_counties_national.txt)')
+    build.add_argument('--download', action='store_true',
+                       help=f'download the {CENSUS_YEAR} places and counties files from the Census Bureau')
+    build.add_argument('--output', default=GAZETTEER_PATH)
+
+    commands.add_parser('check', help='exit non-zero unless a full index is built')
+
+    locate = commands.add_parser('locate', help='print the location found in some text')
+    locate.add_argument('text')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        with tempfile.TemporaryDirectory() as directory:
+            places, counties = args.places, args.counties
+            if args.download:
+                places = places or download_census('place', directory)
+                counties = counties or download_census('counties', directory)
+
+            entries = list(read_seed())
+            if places:
+                entries.extend(read_census_places(places))
+            if counties:
+                entries.extend(read_census_counties(counties))
+
+        index = build_index(entries)
+        with open(args.output + '.tmp', 'wb') as handle:
+            handle.write(index)
+        os.replace(args.output + '.tmp', args.output)
+        print(f"Wrote {Gazetteer(index).size} entries ({len(index)} bytes) to {args.output}")
+    elif args.command == 'check':
+        problems = check_index()
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        if problems:
+            raise SystemExit(1)
+        print(f"Gazetteer index at {GAZETTEER_PATH} is complete")
+    else:
+        print(get_gazetteer().locate(args.text))
+
+if __name__ == '__main__':
+    main()
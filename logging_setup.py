@@ -0,0 +1,208 @@
+"""
+Non-blocking structured logging
+
+configure() routes the root logger through a bounded queue. A single
+listener thread formats and writes the records, so request and crawl
+threads never wait on stderr. When the writer falls behind, records are
+dropped and counted in log_records_dropped_total rather than blocking
+the caller.
+
+Records carry the correlation fields set with log_context: crawl_id
+during a crawl, and job_id for enrichment, backfill and retention runs.
+The crawler's worker threads copy the submitting context, so their
+records carry them too. LOG_FORMAT=json (the default) writes one JSON
+object per line; LOG_FORMAT=text writes plain lines with the fields
+appended.
+
+Messages logged once per request, page or site go to a rate_limited()
+logger. Below WARNING, each call site gets a burst of records per
+interval; the first record after a quiet spell notes how many were
+suppressed.
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import metrics
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Per call site: records let through per interval before the rest are suppressed
+LOG_RATE_INTERVAL = float(os.environ.get('LOG_RATE_INTERVAL', 10))
+LOG_RATE_BURST = int(os.environ.get('LOG_RATE_BURST', 5))
+
+DROPPED = metrics.counter('log_records_dropped_total', 'Log records dropped because the log queue was full')
+
+LOG_CONTEXT = contextvars.ContextVar('log_context', default={})
+
+# Attributes every LogRecord has; anything else came from log_context or extra=
+RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+_lock = threading.Lock()
+_handler = None
+_listener = None
+
+def new_id(prefix):
+    """Short random correlation id, e.g. enrich-1f3a9c0b2d4e"""
+    return f'{prefix}-{uuid.uuid4().hex[:12]}'
+
+@contextmanager
+def log_context(**fields):
+    """Add fields to every record logged in this context, including by threads it is copied to"""
+    token = LOG_CONTEXT.set({**LOG_CONTEXT.get(), **fields})
+    try:
+        yield
+    finally:
+        LOG_CONTEXT.reset(token)
+
+def record_fields(record):
+    return {name: value for name, value in vars(record).items() if name not in RECORD_ATTRIBUTES}
+
+class ContextFilter(logging.Filter):
+    """Copies the log_context fields onto records; runs in the thread that logs"""
+
+    def filter(self, record):
+        for name, value in LOG_CONTEXT.get().items():
+            if not hasattr(record, name):
+                setattr(record, name, value)
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """Lets burst records per interval through from each call site, below WARNING"""
+
+    def __init__(self, interval=LOG_RATE_INTERVAL, burst=LOG_RATE_BURST):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.sites = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            started, passed, suppressed = self.sites.get(site, (now, 0, 0))
+            if now - started >= self.interval:
+                started, passed = now, 0
+            if passed >= self.burst:
+                self.sites[site] = (started, passed, suppressed + 1)
+                return False
+            self.sites[site] = (started, passed + 1, 0)
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+def rate_limited(name, interval=LOG_RATE_INTERVAL, burst=LOG_RATE_BURST):
+    """Logger for repetitive per-request messages"""
+    logger = logging.getLogger(name)
+    if not any(isinstance(f, RateLimitFilter) for f in logger.filters):
+        logger.addFilter(RateLimitFilter(interval, burst))
+    return logger
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def prepare(self, record):
+        # Render the message and traceback here, while args and exc_info still refer to live objects
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.inc()
+
+class QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # The queue may be full at exit; wait for room rather than lose the stop signal
+        self.queue.put(self._sentinel)
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the context fields at the top level"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+            **record_fields(record)
+        }
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """TEXT_FORMAT lines, with the context fields appended as key=value"""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = record_fields(record)
+        if not fields:
+            return line
+        first, newline, rest = line.partition('\n')
+        pairs = ' '.join(f'{name}={value}' for name, value in fields.items())
+        return f'{first} [{pairs}]{newline}{rest}'
+
+def configure(level=LOG_LEVEL, fmt=LOG_FORMAT, stream=None):
+    """Send the root logger's records through the queue to a writer thread
+
+    Safe to call from every entry point; only the first call has any effect
+    until shutdown().
+    """
+    global _handler, _listener
+    with _lock:
+        if _listener:
+            return
+
+        writer = logging.StreamHandler(stream or sys.stderr)
+        writer.setFormatter(TextFormatter(TEXT_FORMAT) if fmt == 'text' else JsonFormatter())
+
+        _handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _handler.addFilter(ContextFilter())
+        root = logging.getLogger()
+        root.addHandler(_handler)
+        root.setLevel(level)
+
+        _listener = QueueListener(_handler.queue, writer)
+        _listener.start()
+        atexit.register(shutdown)
+
+def shutdown():
+    """Write out everything queued and stop the writer thread"""
+    global _handler, _listener
+    with _lock:
+        if not _listener:
+            return
+        logging.getLogger().removeHandler(_handler)
+        _listener.stop()
+        _handler = _listener = None
@@ -0,0 +1,85 @@
+"""
+Opt-in profiling for API requests and crawls
+Profiles are written as pstats files plus a readable summary
+"""
+
+import cProfile
+import os
+import pstats
+import re
+import tempfile
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'utility-monitor-profiles'))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))  # newest profiles kept on disk
+SUMMARY_LINES = 40
+
+# Each profile is stored as <name>.prof (pstats) and <name>.txt (summary)
+PROFILE_EXTENSIONS = ('.prof', '.txt')
+
+def start():
+    """Start a deterministic profiler on the current thread"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+def save(profiler, label):
+    """Stop a profiler and write its artifacts; returns the profile name"""
+    profiler.disable()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    safe_label = re.sub(r'[^A-Za-z0-9_-]+', '-', label).strip('-') or 'profile'
+    name = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{safe_label}-{uuid.uuid4().hex[:6]}"
+    base = os.path.join(PROFILE_DIR, name)
+
+    profiler.dump_stats(base + '.prof')
+    with open(base + '.txt', 'w') as summary:
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats('cumulative').print_stats(SUMMARY_LINES)
+
+    prune()
+    return name
+
+@contextmanager
+def profiled(label):
+    """Profile a with block; the yielded dict receives the profile 'name'"""
+    result = {}
+    profiler = start()
+    try:
+        yield result
+    finally:
+        result['name'] = save(profiler, label)
+
+def prune(keep=PROFILE_KEEP):
+    """Delete all but the newest profiles"""
+    for profile in list_profiles()[keep:]:
+        for extension in PROFILE_EXTENSIONS:
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile['name'] + extension))
+            except FileNotFoundError:
+                pass
+
+def list_profiles():
+    """List stored profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+
+    profiles = []
+    for filename in os.listdir(PROFILE_DIR):
+        if not filename.endswith('.prof'):
+            continue
+        path = os.path.join(PROFILE_DIR, filename)
+        stat = os.stat(path)
+        name = filename[:-len('.prof')]
+        profiles.append({
+            'name': name,
+            'label': name.split('-', 1)[-1].rsplit('-', 1)[0],
+            'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            'size': stat.st_size,
+            'files': [name + extension for extension in PROFILE_EXTENSIONS]
+        })
+
+    profiles.sort(key=lambda profile: profile['created_at'], reverse=True)
+    return profiles
@@ -0,0 +1,119 @@
+"""
+Compact records for crawl results and mentions
+
+A crawl holds every result and mention in memory until it finishes.
+Slotted dataclasses carry no per-instance __dict__. The categorical
+fields (source, location, utility, utility type, stage, priority,
+status) are interned, so thousands of mentions from one source or with
+one stage share a single string instead of each holding a parsed copy.
+"""
+
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from sys import intern
+from typing import List, Optional
+
+# mentions columns in Mention.to_row order
+MENTION_COLUMNS = ('id', 'title', 'url', 'snippet', 'source', 'location', 'utility', 'utility_type',
+                   'stage', 'priority', 'status', 'tags', 'classifier_version', 'score', 'captured_at',
+                   'published_at')
+
+@dataclass(slots=True)
+class RawResult:
+    """One search or scrape hit, before classification"""
+    title: str
+    url: str
+    snippet: str
+    source: str
+    date: str = ''
+
+    def __post_init__(self):
+        self.source = intern(self.source or '')
+
+@dataclass(slots=True)
+class Mention:
+    """A classified crawl result, as stored in mentions"""
+    id: str
+    title: str
+    url: str
+    snippet: str
+    source: str
+    location: str
+    utility: str
+    utility_type: str
+    stage: str
+    priority: str
+    captured_at: datetime
+    classifier_version: int
+    status: str = 'pending'
+    tags: List[str] = field(default_factory=list)
+    score: Optional[float] = None
+    published_at: Optional[datetime] = None  # naive UTC, parsed from RawResult.date
+
+    def __post_init__(self):
+        self.source = intern(self.source or '')
+        self.location = intern(self.location)
+        self.utility = intern(self.utility)
+        self.utility_type = intern(self.utility_type)
+        self.stage = intern(self.stage)
+        self.priority = intern(self.priority)
+        self.status = intern(self.status)
+
+    @classmethod
+    def from_row(cls, row):
+        """Mention from a mention_details row (a mapping with MENTION_COLUMNS keys)"""
+        values = {column: row[column] for column in MENTION_COLUMNS}
+        # Entity names come through outer joins
+        for column in ('source', 'location', 'utility', 'utility_type', 'stage'):
+            values[column] = values[column] or ''
+        return cls(**values)
+
+    def classification(self):
+        """Classifier fields, keyed like crawler.classify_text"""
+        return {
+            'location': self.location,
+            'utility': self.utility,
+            'utilityType': self.utility_type,
+            'stage': self.stage,
+            'priority': self.priority
+        }
+
+    def reclassified(self, fields, classifier_version):
+        """Copy with classify_text fields applied; the score is left to be recomputed"""
+        return replace(
+            self,
+            location=fields['location'],
+            utility=fields['utility'],
+            utility_type=fields['utilityType'],
+            stage=fields['stage'],
+            priority=fields['priority'],
+            classifier_version=classifier_version,
+            score=None
+        )
+
+    def to_row(self):
+        """Values in MENTION_COLUMNS order"""
+        return (self.id, self.title, self.url, self.snippet, self.source, self.location, self.utility,
+                self.utility_type, self.stage, self.priority, self.status, self.tags,
+                self.classifier_version, self.score, self.captured_at, self.published_at)
+
+    def to_dict(self):
+        """JSON-ready dict with the field names the frontend uses"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'url': self.url,
+            'snippet': self.snippet,
+            'source': self.source,
+            'location': self.location,
+            'utility': self.utility,
+            'utilityType': self.utility_type,
+            'stage': self.stage,
+            'priority': self.priority,
+            'classifierVersion': self.classifier_version,
+            'capturedAt': self.captured_at.isoformat(),
+            'publishedAt': self.published_at.isoformat() if self.published_at else None,
+            'status': self.status,
+            'tags': self.tags,
+            'score': self.score
+        }
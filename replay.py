@@ -0,0 +1,132 @@
+"""
+Record/replay of crawler HTTP traffic
+Lets crawls run deterministically and offline from a recorded cassette
+"""
+
+import base64
+import json
+import logging
+import os
+import threading
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that hold credentials and never go into a cassette
+SECRET_PARAMS = {'key', 'apikey', 'api_key', 'token'}
+
+# Response headers worth keeping; the rest vary per request
+KEPT_HEADERS = {'content-type', 'etag', 'last-modified', 'retry-after'}
+
+def request_key(url, params=None):
+    """Stable key for a GET: URL with sorted, credential-free query parameters"""
+    parsed = urlparse(url)
+    query = parse_qsl(parsed.query, keep_blank_values=True)
+    if params:
+        query.extend((name, str(value)) for name, value in params.items())
+    query = sorted((name, value) for name, value in query if name.lower() not in SECRET_PARAMS)
+    return urlunparse(parsed._replace(query=urlencode(query), fragment=''))
+
+def encode_body(body):
+    try:
+        return {'text': body.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'base64': base64.b64encode(body).decode('ascii')}
+
+def decode_body(entry):
+    if 'base64' in entry:
+        return base64.b64decode(entry['base64'])
+    return entry.get('text', '').encode('utf-8')
+
+def build_response(url, entry):
+    """Build a requests.Response from a cassette entry"""
+    response = requests.Response()
+    response.url = url
+    response.status_code = entry['status']
+    response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+    response._content = decode_body(entry)
+    # Marks the body as already read, so iter_content serves it from memory
+    response._content_consumed = True
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+class Cassette:
+    """Recorded responses keyed by request, replayed in recording order
+
+    In 'record' mode real requests pass through and are saved; in 'replay'
+    mode no network is used and unknown requests get a 404.
+    """
+
+    def __init__(self, path, mode):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.entries = {}
+        self._positions = {}
+        self._lock = threading.Lock()
+
+        if mode == 'replay' or os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with open(self.path) as handle:
+            self.entries = json.load(handle)
+        logger.info(f"Loaded {sum(len(v) for v in self.entries.values())} responses from {self.path}")
+
+    def save(self):
+        with self._lock:
+            entries = dict(self.entries)
+        with open(self.path, 'w') as handle:
+            json.dump(entries, handle, indent=1, sort_keys=True)
+
+    def next_entry(self, key):
+        """Next recorded response for key; the last one repeats once exhausted"""
+        with self._lock:
+            responses = self.entries.get(key)
+            if not responses:
+                return None
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            return responses[min(position, len(responses) - 1)]
+
+    def record(self, key, response):
+        entry = {
+            'status': response.status_code,
+            'headers': {name: value for name, value in response.headers.items()
+                        if name.lower() in KEPT_HEADERS},
+            **encode_body(response.content)
+        }
+        with self._lock:
+            self.entries.setdefault(key, []).append(entry)
+
+    def wrap(self, get):
+        """Wrap a requests.get-compatible callable with record or replay"""
+        def transport(url, params=None, **kwargs):
+            key = request_key(url, params)
+
+            if self.mode == 'replay':
+                entry = self.next_entry(key)
+                if entry is None:
+                    logger.debug(f"No recorded response for {key}")
+                    entry = {'status': 404, 'text': ''}
+                return build_response(url, entry)
+
+            response = get(url, params=params, **kwargs)
+            self.record(key, response)
+            return response
+
+        return transport
+
+def transport_from_env(get):
+    """Wrap get according to CRAWLER_HTTP_MODE and CRAWLER_CASSETTE"""
+    mode = os.environ.get('CRAWLER_HTTP_MODE', '').lower()
+    if not mode:
+        return get, None
+
+    cassette = Cassette(os.environ.get('CRAWLER_CASSETTE', 'crawl_cassette.json'), mode)
+    return cassette.wrap(get), cassette
@@ -0,0 +1,141 @@
+"""
+Retention for the partitioned mentions table
+
+Moves mentions reviewers marked deleted, once older than the retention
+window, into the compact mentions_archive table. Only the id, URL hash,
+source and capture time are kept; the URL hash is the mention's
+mention_keys key (crawler.url_digest of the canonical URL), which stays
+in mention_keys, so crawls never re-ingest an archived URL. Whole monthly partitions can
+be detached once they are no longer needed online. Either way the rows
+keep counting in mention_rollups, so analytics history is unchanged. Old
+mention_events rows, only needed by /api/events clients catching up, are
+deleted.
+
+Usage:
+    python retention.py --days 90
+    python retention.py --detach-before 2024-01
+"""
+
+import argparse
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+import logging_setup
+
+logger = logging.getLogger(__name__)
+
+RETENTION_DAYS = int(os.environ.get('MENTION_RETENTION_DAYS', 90))
+RETENTION_BATCH_ROWS = 5000
+EVENTS_RETENTION_DAYS = int(os.environ.get('EVENTS_RETENTION_DAYS', 7))
+
+def archive_deleted(conn, days=RETENTION_DAYS, batch_rows=RETENTION_BATCH_ROWS, pause=0.1):
+    """Move deleted mentions captured more than days ago into mentions_archive
+
+    Works in batches, one transaction each, so locks stay short. The
+    archived rows stay counted in mention_rollups. Returns the number of
+    rows archived.
+    """
+    from app import ROLLUP_ARCHIVING_SETTING
+
+    cutoff = datetime.now() - timedelta(days=days)
+    archived = 0
+
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(f"SET LOCAL {ROLLUP_ARCHIVING_SETTING} = 'on'")
+            cur.execute("""
+                WITH moved AS (
+                    DELETE FROM mentions
+                    WHERE (id, captured_at) IN (
+                        SELECT id, captured_at FROM mentions
+                        WHERE status = 'deleted' AND captured_at < %s
+                        LIMIT %s
+                    )
+                    RETURNING id, url, source_id, captured_at
+                )
+                INSERT INTO mentions_archive (id, url_hash, source, captured_at)
+                SELECT moved.id, COALESCE(keys.url_hash, sha256(convert_to(url, 'UTF8'))), entities.name,
+                       captured_at
+                FROM moved
+                LEFT JOIN mention_keys keys ON keys.mention_id = moved.id
+                LEFT JOIN entities ON entities.id = moved.source_id
+            """, (cutoff, batch_rows))
+            count = cur.rowcount
+        conn.commit()
+
+        archived += count
+        if count < batch_rows:
+            break
+        if pause:
+            time.sleep(pause)
+
+    logger.info(f"Archived {archived} deleted mentions captured before {cutoff:%Y-%m-%d}")
+    return archived
+
+def prune_events(conn, days=EVENTS_RETENTION_DAYS):
+    """Delete mention_events older than days; returns the number deleted"""
+    cutoff = datetime.now() - timedelta(days=days)
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM mention_events WHERE created_at < %s", (cutoff,))
+        count = cur.rowcount
+    conn.commit()
+
+    logger.info(f"Pruned {count} mention events from before {cutoff:%Y-%m-%d}")
+    return count
+
+def detach_partitions(conn, before, drop=False):
+    """Detach monthly partitions that end on or before the first of before's month
+
+    A detached partition stays as an ordinary table (drop it, dump it or
+    re-attach it later); with drop=True it is dropped. Its URLs stay in
+    mention_keys, so they are still deduped, and its rows stay counted in
+    mention_rollups, as archived rows do. Returns the partition names.
+    """
+    from app import month_start, partition_names
+
+    cutoff = month_start(before).strftime('%Y%m')
+    detached = []
+
+    with conn.cursor() as cur:
+        for name in sorted(partition_names(cur)):
+            if not name.startswith('mentions_p') or name[len('mentions_p'):] >= cutoff:
+                continue
+            cur.execute(f"ALTER TABLE mentions DETACH PARTITION {name}")
+            if drop:
+                cur.execute(f"DROP TABLE {name}")
+            conn.commit()
+            detached.append(name)
+            logger.info(f"{'Dropped' if drop else 'Detached'} partition {name}")
+
+    return detached
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Archive old deleted mentions and detach old partitions')
+    parser.add_argument('--days', type=int, default=RETENTION_DAYS,
+                        help='archive deleted mentions captured more than this many days ago')
+    parser.add_argument('--events-days', type=int, default=EVENTS_RETENTION_DAYS,
+                        help='delete mention events older than this many days')
+    parser.add_argument('--detach-before', help='detach partitions for months before this one (YYYY-MM)')
+    parser.add_argument('--drop', action='store_true', help='drop detached partitions instead of keeping them')
+    args = parser.parse_args(argv)
+
+    logging_setup.configure()
+
+    from app import get_db_connection, init_database
+    if not init_database():
+        raise SystemExit('Database not available')
+
+    conn = get_db_connection()
+    try:
+        with logging_setup.log_context(job_id=logging_setup.new_id('retention')):
+            archive_deleted(conn, args.days)
+            prune_events(conn, args.events_days)
+            if args.detach_before:
+                detach_partitions(conn, datetime.strptime(args.detach_before, '%Y-%m'), args.drop)
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Priority scores for the review queue
+
+A mention's score combines weighted terms in its title and snippet, how
+much its source is trusted, its stage and when it was captured:
+
+    relevance = (1 + sum of matched term weights) * source trust * stage weight
+    score = log2(relevance) + days since SCORE_EPOCH / SCORE_DOUBLING_DAYS
+
+Recency is part of the stored value rather than a decay applied at read
+time, so scores never go stale as mentions age and "top N pending by
+score" is a plain index scan. Twice the relevance is worth
+SCORE_DOUBLING_DAYS of recency.
+
+Scores are stored with the classification: after changing a weight, bump
+crawler.CLASSIFIER_VERSION and run backfill.py to rescore stored mentions.
+"""
+
+import math
+import os
+import re
+from datetime import datetime
+
+SCORE_EPOCH = datetime(2024, 1, 1)
+SCORE_DOUBLING_DAYS = float(os.environ.get('SCORE_DOUBLING_DAYS', 7))
+
+# Each term counts once per mention, however often it appears
+TERM_WEIGHTS = {
+    'ballot': 3.0,
+    'referendum': 3.0,
+    'vote': 2.5,
+    'eminent domain': 3.0,
+    'condemnation': 2.5,
+    'lawsuit': 2.5,
+    'court': 2.0,
+    'emergency': 2.5,
+    'urgent': 2.0,
+    'deadline': 2.0,
+    'approved': 2.0,
+    'authorized': 2.0,
+    'franchise': 1.5,
+    'feasibility study': 1.5,
+    'public hearing': 1.5,
+    'municipalization': 1.0,
+    'public power': 1.0,
+}
+
+# First matching pattern (case-insensitive substring of the source) wins
+SOURCE_TRUST = [
+    ('public utility commission', 1.5),
+    ('city council', 1.4),
+    ('ferc', 1.4),
+    ('.gov', 1.3),
+    ('senate', 1.2),
+    ('legislature', 1.2),
+]
+DEFAULT_SOURCE_TRUST = 1.0
+
+STAGE_WEIGHTS = {
+    'Ballot Measure': 2.0,
+    'Litigation': 1.8,
+    'Active': 1.4,
+    'Exploratory': 1.0,
+}
+
+TERM_PATTERN = re.compile('|'.join(re.escape(term) for term in sorted(TERM_WEIGHTS, key=len, reverse=True)))
+
+def term_weight(text):
+    """Sum of the weights of distinct terms found in text"""
+    return sum(TERM_WEIGHTS[term] for term in set(TERM_PATTERN.findall(text.lower())))
+
+def source_trust(source):
+    source = (source or '').lower()
+    for pattern, trust in SOURCE_TRUST:
+        if pattern in source:
+            return trust
+    return DEFAULT_SOURCE_TRUST
+
+def score(text, source, stage, captured_at):
+    """Score for one mention; captured_at is a datetime"""
+    relevance = (1 + term_weight(text)) * source_trust(source) * STAGE_WEIGHTS.get(stage, 1.0)
+    age = (captured_at.replace(tzinfo=None) - SCORE_EPOCH).total_seconds() / 86400
+    return round(math.log2(relevance) + age / SCORE_DOUBLING_DAYS, 4)
+
+def score_mentions(mentions):
+    """Set score on each records.Mention in place; returns mentions"""
+    for mention in mentions:
+        mention.score = score(f"{mention.title} {mention.snippet or ''}",
+                              mention.source, mention.stage, mention.captured_at)
+    return mentions